@@ -1,59 +1,44 @@
 
 # libraries imports
-import yaml
+# llama_index, gradio and the Gemini SDK take seconds to import, so they are
+# only imported when the workflow is first built (see ShoppingAgent.build)
+import time
 import asyncio
 from datetime import datetime
-from llama_index.core.workflow import Context
-from src.llms.gemini_2_flash import create_gemini
-from llama_index.core.agent.workflow import AgentWorkflow, ReActAgent, FunctionAgent
-from llama_index.core.callbacks import CallbackManager, LlamaDebugHandler
-from llama_index.core.tools import QueryEngineTool
-from llama_index.core.agent.workflow import AgentWorkflow, ToolCallResult, AgentStream
-
-
-# Custom imports
-from src.tools.web_search import search_tool
-from src.tools.visit_webpage import visit_webpage
-from src.tools.query_on_url import Get_info_from_url_tool
+from uuid import uuid4
 from dotenv import load_dotenv
 import os
 
 # Load environment variables
 load_dotenv()
 
-
-class CustomDebugHandler(LlamaDebugHandler):
-    """Custom debug handler for better traceability"""
-
-    def __init__(self):
-        super().__init__()
-        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-    def on_event_start(self, event_type, payload=None, event_id="", **kwargs):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"\n🚀 [{timestamp}] Event Started: {event_type}")
-        if payload:
-            print(f"   📋 Payload: {payload}")
-        super().on_event_start(event_type, payload, event_id, **kwargs)
-
-    def on_event_end(self, event_type, payload=None, event_id="", **kwargs):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"\n✅ [{timestamp}] Event Completed: {event_type}")
-        super().on_event_end(event_type, payload, event_id, **kwargs)
+# Tools every searching agent gets, resolved lazily by src.tools.registry
+SEARCH_TOOLS = [
+    "duckduckgo_full_search", "visit_webpage", "Get_info_from_url",
+    "visit_webpages", "multi_search", "get_product_info_batch", "catalog_search",
+]
+# Tools of the agents that shortlist products against the budget
+PRICE_TOOLS = ["filter_by_budget"]
+# Tools of the agents that plan multi-part requests (src/agents/fanout.py)
+PLANNER_TOOLS = ["parallel_product_hunt"]
+# Agents configured in src/agents/prompts.yaml
+AGENT_KEYS = ["manager_agent", "shopping_researcher_agent", "product_hunter_agent",
+              "product_investigator_agent", "trivial_search_agent"]
 
 
 def create_callback_manager():
     """Create a callback manager with custom handlers"""
-    debug_handler = CustomDebugHandler()
-    callback_manager = CallbackManager([debug_handler])
-    return callback_manager
+    from src.agents.callbacks import create_callback_manager
+
+    return create_callback_manager()
 
 
 def get_agent_name_enhanced(ev, workflow):
     """Enhanced agent name detection with multiple fallback strategies"""
 
-    # Strategy 1: Direct attribute check
-    for attr in ['agent_name', 'name', 'sender', 'agent']:
+    # Strategy 1: Direct attribute check (AgentInput/AgentStream/AgentOutput
+    # carry the running agent as `current_agent_name`)
+    for attr in ['current_agent_name', 'agent_name', 'name', 'sender', 'agent']:
         if hasattr(ev, attr):
             value = getattr(ev, attr)
             if value and isinstance(value, str):
@@ -96,117 +81,241 @@ def format_output_message(agent_name, message_type, content, timestamp=None):
     return f"\n{separator}\n{header}\n{separator}\n{content}\n{separator}\n"
 
 
-def load_config(file_path):
-    """Load configuration from a YAML file."""
-    try:
-        with open(file_path, 'r') as file:
-            return yaml.safe_load(file)
-    except Exception as e:
-        print(f"Error loading config file: {e}")
-        return {}
-
-
 class ShoppingAgent:
     """Base class for shopping agents with common functionality"""
 
-    def __init__(self, llm):
-        self.callback_manager = create_callback_manager()
+    def __init__(self, llm=None, llm_factory=None, budget=None, memory=None, router=None):
+        """
+        Args:
+            llm: The LLM shared by every agent.
+            llm_factory: Called on first use when no `llm` is given. By
+                default each agent gets the model declared for it in
+                prompts.yaml, from the shared pool (src/llms/pool.py).
+            budget (BudgetLimits): Caps applied to every query,
+                defaults to `BudgetLimits()`.
+            memory (ConversationMemory): Token-bounded history of `query()`'s
+                conversation, defaults to `ConversationMemory()`.
+            router: Picks the agent that starts each turn without an LLM
+                call, defaults to `RuleRouter()`; pass False to always start
+                at the manager.
+        """
+        from src.agents.memory import ConversationMemory
+        from src.agents.prompts import load_prompts
+        from src.agents.router import RouterStats, RuleRouter
+
+        # Scopes the pages prefetched during `query()` turns (src/tools/prefetch.py)
+        self.id = uuid4().hex
         self.llm = llm
+        self.llm_factory = llm_factory
+        self.budget = budget
+        self.memory = memory or ConversationMemory()
+        self.router = RuleRouter() if router is None else router
+        self.router_stats = RouterStats()
+        self.handler = None
+        self.last_route = None
+        # Parsed once per process and shared by every instance (src/agents/prompts.py)
+        self.prompts = load_prompts()
+        self.workflow = None
+        self.ctx = None
+
+    @property
+    def chat_history(self):
+        """The recent turns kept verbatim, as role/content dicts."""
+        return self.memory.as_dicts()
+
+    def build(self):
+        """Build the LLM, the agents and the workflow, once."""
+        if self.workflow is not None:
+            return self.workflow
+
+        from llama_index.core.workflow import Context
+        from llama_index.core.agent.workflow import AgentWorkflow, ReActAgent
+        from src.tools.registry import get_tools
+        from src.agents.fanout import FANOUT_AGENTS, FanOut
+        from src.agents.prompts import compiled_formatter
+
+        # A given LLM (or factory) serves every agent; otherwise each agent
+        # gets the model tier prompts.yaml declares, shared process-wide
+        # through the LLM pool
+        self.llms = {}
+        if self.llm is None and self.llm_factory is not None:
+            self.llm = self.llm_factory()
+        if self.llm is None:
+            from src.llms.pool import get_llm_pool
+
+            pool = get_llm_pool()
+            self.llms = {key: pool.llm(self.prompts[key].model) for key in AGENT_KEYS}
+            self.llm = pool.llm()
         self.callback_manager = create_callback_manager()
-        self.config = load_config('src/agents/prompts.yaml')
-        self.chat_history = []
-        self.manager_agent = ReActAgent(
-            name=self.config["manager_agent"]["name"],
-            description=self.config["manager_agent"]["description"],
-            system_prompt=self.config["manager_agent"]["system_prompt"],
-            tools=[],
-            llm=llm,
-            callback_manager=self.callback_manager,
-        )
-        self.product_hunter_agent = ReActAgent(
-            name=self.config["product_hunter_agent"]["name"],
-            description=self.config["product_hunter_agent"]["description"],
-            system_prompt=self.config["product_hunter_agent"]["system_prompt"],
-            # tools=[search_tool, visit_webpage],
-            tools=[search_tool, visit_webpage, Get_info_from_url_tool],
-            llm=llm,
-            callback_manager=self.callback_manager,
-        )
-
-        self.trivial_search_agent = ReActAgent(
-            name=self.config["trivial_search_agent"]["name"],
-            description=self.config["trivial_search_agent"]["description"],
-            system_prompt=self.config["trivial_search_agent"]["system_prompt"],
-            # tools=[search_tool, visit_webpage],
-
-            tools=[search_tool, visit_webpage, Get_info_from_url_tool],
-            llm=llm,
-            callback_manager=self.callback_manager,
-        )
-
-        self.shopping_researcher_agent = ReActAgent(
-            name=self.config["shopping_researcher_agent"]["name"],
-            description=self.config["shopping_researcher_agent"]["description"],
-            system_prompt=self.config["shopping_researcher_agent"]["system_prompt"],
-            # tools=[search_tool, visit_webpage],
-            tools=[search_tool, visit_webpage, Get_info_from_url_tool],
-            llm=llm,
-            callback_manager=self.callback_manager,
-        )
 
-        self.product_investigator_agent = ReActAgent(
-            name=self.config["product_investigator_agent"]["name"],
-            description=self.config["product_investigator_agent"]["description"],
-            system_prompt=self.config["product_investigator_agent"]["system_prompt"],
-            # tools=[search_tool, visit_webpage],
-            tools=[search_tool, visit_webpage, Get_info_from_url_tool],
-            llm=llm,
-            callback_manager=self.callback_manager,
-        )
+        def make_agent(key, tools):
+            prompt = self.prompts[key]
+            # The system header and tool schemas are rendered once and sent
+            # as a marked, byte-identical prefix on every step
+            return ReActAgent(
+                name=prompt.name,
+                description=prompt.description,
+                system_prompt=prompt.system_prompt,
+                formatter=compiled_formatter(prompt),
+                tools=get_tools(tools),
+                llm=self.llms.get(key, self.llm),
+                callback_manager=self.callback_manager,
+            )
+
+        self.manager_agent = make_agent("manager_agent", PLANNER_TOOLS)
+        self.product_hunter_agent = make_agent("product_hunter_agent", SEARCH_TOOLS + PRICE_TOOLS)
+        self.trivial_search_agent = make_agent("trivial_search_agent", SEARCH_TOOLS)
+        self.shopping_researcher_agent = make_agent("shopping_researcher_agent", SEARCH_TOOLS + PLANNER_TOOLS)
+        self.product_investigator_agent = make_agent("product_investigator_agent", SEARCH_TOOLS + PRICE_TOOLS)
+        self.agents = [self.manager_agent, self.shopping_researcher_agent, self.product_hunter_agent,
+                       self.product_investigator_agent, self.trivial_search_agent]
         self.workflow = AgentWorkflow(
-            agents=[self.manager_agent, self.shopping_researcher_agent, self.product_hunter_agent,
-                    self.product_investigator_agent, self.trivial_search_agent],
+            agents=self.agents,
             root_agent="manager_agent",
         )
         self.ctx = Context(self.workflow)
+        # Independent parts of a request run on their own single-agent
+        # workflows at the same time
+        self.fanout = FanOut({
+            name: AgentWorkflow(agents=[make_agent(name, SEARCH_TOOLS + PRICE_TOOLS)], root_agent=name)
+            for name in FANOUT_AGENTS
+        })
 
-        if hasattr(llm, 'callback_manager'):
-            self.llm.callback_manager = self.callback_manager
+        for llm in {id(llm): llm for llm in [self.llm, *self.llms.values()]}.values():
+            if hasattr(llm, 'callback_manager'):
+                llm.callback_manager = self.callback_manager
+        return self.workflow
 
-    async def query(self, prompt):
+    async def query(self, prompt, on_event=None):
         """
         Run the shopping assistant workflow and maintain chat history.
 
         Args:
             prompt (str): The user's input query
+            on_event: Called with every workflow event as it arrives (see
+                `run_turn`)
 
         Returns:
             str: The agent's response
         """
-        # Add user prompt to chat history
-        self.chat_history.append({
-            "role": "user",
-            "content": prompt,
-        })
+        self.build()
+        return await self.run_turn(prompt, self.ctx, self.memory, owner=self, on_event=on_event)
 
-        # Update context with current chat history
-        self.ctx.chat_history = self.chat_history
+    def close(self):
+        """
+        Ends the `query()` conversation: pages still being prefetched for it
+        are cancelled.
 
-        # Run the workflow
-        resp = await self.workflow.run(
-            user_msg=prompt,
-            ctx=self.ctx
-        )
+        Returns:
+            int: How many prefetches were cancelled.
+        """
+        from src.tools.prefetch import get_prefetcher
 
-        # Add agent response to chat history
-        self.chat_history.append({
-            "role": "assistant",
-            "content": str(resp),
-        })
+        return get_prefetcher().cancel(self.id)
+
+    async def route(self, prompt, ctx):
+        """
+        Starts the next run of `ctx` at the agent the router picks for `prompt`.
+
+        When the router is unsure the run starts at the manager, rather than
+        at whichever agent answered the previous turn.
+
+        Args:
+            prompt (str): The user's input query
+            ctx (Context): The conversation's workflow context
 
-        # Update context again with new chat history
-        self.ctx.chat_history = self.chat_history
+        Returns:
+            Route: The router's decision, or None without a router
+        """
+        from src.agents.router import MANAGER_AGENT
+
+        if not self.router:
+            return None
+        started = time.perf_counter()
+        route = self.router.route(prompt)
+        self.router_stats.record(route, time.perf_counter() - started)
+        agent = route.agent if route.agent in self.workflow.agents else MANAGER_AGENT
+        await ctx.store.set("current_agent_name", agent)
+        return route
+
+    async def run_turn(self, prompt, ctx, memory, owner=None, on_event=None):
+        """
+        Run one turn of a conversation on the shared workflow.
+
+        Only `ctx` and `memory` belong to the conversation, so many
+        conversations can run on one built ShoppingAgent at once
+        (see src/agents/sessions.py).
+
+        Args:
+            prompt (str): The user's input query
+            ctx (Context): The conversation's workflow context
+            memory (ConversationMemory): The conversation's memory; the
+                turn is added to it
+            owner: Gets the router's decision as `owner.last_route` and the
+                running handler as `owner.handler`, so live budget counters
+                are readable from `owner.handler.budget`
+            on_event: Called with every workflow event as it arrives, e.g.
+                to stream the turn to a client (see server.py)
 
+        Returns:
+            str: The agent's response
+        """
+        self.build()
+
+        # The workflow's memory is replaced by the bounded history (pinned
+        # facts, rolling summary, recent turns), so each turn sends about
+        # the same number of tokens however long the conversation is
+        chat_history = memory.messages(prompt)
+
+        # Run the workflow under the budget governor; spans go to the
+        # process tracer when tracing is enabled
+        from src.agents.budget import BudgetGovernor, use_budget
+        from src.agents.fanout import use_fanout
+        from src.agents.tracing import get_tracer
+        from src.tools.ranking import set_focus
+        from src.tools.prefetch import set_scope
+        from src.tools.dedupe import reset_seen
+
+        tracer = get_tracer()
+        # Simple requests skip the manager's handoff call (src/agents/router.py)
+        route = await self.route(prompt, ctx)
+        if owner is not None:
+            owner.last_route = route
+        manager_timer = self.router_stats.watch()
+        # Tool observations are ranked against the request and the agent's
+        # latest thought (see src/tools/ranking.py)
+        focus = set_focus(prompt)
+        # Pages prefetched for this turn belong to the session (src/tools/prefetch.py)
+        set_scope(getattr(owner, "id", None))
+        # Pages already given to one agent this turn are not repeated in full
+        reset_seen()
+        # Tool calls of this run (a fan-out's sub-agents) charge the same budget
+        governor = use_budget(BudgetGovernor(self.budget))
+        use_fanout(self.fanout, on_event=on_event)
+        # Spans of this run are kept apart from other sessions' runs
+        tracer.begin_run()
+        handler = self.workflow.run(
+            user_msg=prompt,
+            chat_history=chat_history,
+            ctx=ctx
+        )
+        if owner is not None:
+            owner.handler = handler
+        try:
+            async for ev in governor.stream(handler):
+                tracer.observe(ev)
+                focus.observe(ev)
+                manager_timer.observe(ev)
+                if on_event is not None:
+                    on_event(ev)
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. its client disconnected): stop the
+            # run and the tool calls it has in flight
+            await handler.cancel_run()
+            raise
+        resp = await governor.result(handler)
+
+        await memory.add_turn(prompt, str(resp))
         return resp
 
 
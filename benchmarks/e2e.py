@@ -0,0 +1,217 @@
+"""
+Offline end-to-end benchmark of the full ShoppingAgent workflow.
+
+Search, web pages and the LLM are replaced by local stand-ins (see
+benchmarks/fakes.py), so runs are reproducible and cost nothing. Every prompt
+in the corpus is run `--repeats` times and the report holds per-query latency
+percentiles, LLM calls, tool calls, tokens and bytes fetched, as JSON.
+
+    python benchmarks/e2e.py --repeats 5 --output bench.json
+    python benchmarks/e2e.py --llm replay --llm-cache recorded.sqlite
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yaml  # noqa: E402
+from fakes import FakeSearchBackend, FixtureServer, ScriptedLLM  # noqa: E402
+from src.agents.event_sink import EventRecorder, JsonlEventSink  # noqa: E402
+
+SCHEMA_VERSION = 1
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = (len(ordered) - 1) * q
+    low, high = int(index), min(int(index) + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (index - low)
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": percentile(samples, 0.50),
+        "p90": percentile(samples, 0.90),
+        "p99": percentile(samples, 0.99),
+        "max": max(samples),
+    }
+
+
+def make_llm(args):
+    if args.llm == "scripted":
+        return ScriptedLLM(first_token_latency=args.first_token_latency, token_latency=args.token_latency)
+
+    from src.llms.cached_llm import CachingLLM
+
+    if args.llm == "replay":
+        return CachingLLM(llm=ScriptedLLM(), mode="replay", cache_path=args.llm_cache)
+    from src.llms.gemini_2_flash import create_gemini
+
+    return create_gemini(cache_mode="record") if args.llm_cache is None else CachingLLM(
+        llm=create_gemini(cache_mode="off"), mode="record", cache_path=args.llm_cache,
+    )
+
+
+def reset_caches(cache_dir: str) -> None:
+    """Points the page and search caches and the catalog at a fresh directory, so every run is cold."""
+    from src.tools import catalog, page_cache, prefetch, search_cache
+
+    prefetch.get_prefetcher().cancel_all()
+
+    page_cache._page_cache = page_cache.PageCache(path=os.path.join(cache_dir, "pages.sqlite"))
+    search_cache._search_cache = search_cache.SearchCache(path=os.path.join(cache_dir, "search.sqlite"))
+    catalog._catalog = catalog.ProductCatalog(path=os.path.join(cache_dir, "catalog.sqlite"))
+
+
+async def run_query(agent_factory, prompt: str, recorder=None) -> dict:
+    from src.tools.http_client import transfer_stats
+
+    agent = agent_factory()
+    agent.build()
+    bytes_before = transfer_stats["bytes"]
+    requests_before = transfer_stats["requests"]
+
+    started = time.perf_counter()
+    first_token = None
+
+    def on_event(ev):
+        nonlocal first_token
+        if first_token is None and getattr(ev, "delta", None):
+            first_token = time.perf_counter() - started
+        if recorder is not None:
+            recorder.emit(ev)
+
+    # The same path as main.py and every server session (ShoppingAgent.run_turn)
+    response = await agent.query(prompt, on_event=on_event)
+    latency = time.perf_counter() - started
+    governor = agent.handler.budget
+    route = agent.last_route
+
+    totals = governor.snapshot()["total"]
+    return {
+        "latency_seconds": latency,
+        "first_token_seconds": first_token,
+        "llm_calls": totals["llm_calls"],
+        "tool_calls": totals["tool_calls"],
+        "handoffs": totals["handoffs"],
+        "input_tokens": totals["input_tokens"],
+        "output_tokens": totals["output_tokens"],
+        "bytes_fetched": transfer_stats["bytes"] - bytes_before,
+        "http_requests": transfer_stats["requests"] - requests_before,
+        "stopped_reason": governor.stopped_reason,
+        "routed_to": route.agent if route else None,
+        "answer_chars": len(str(response)),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main_async(args) -> dict:
+    from ShoppingAgent import ShoppingAgent
+    from src.tools import web_search
+    from src.tools.http_client import rate_limiter
+    from src.tools.prefetch import get_prefetcher
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = yaml.safe_load(f)
+    if args.only:
+        corpus = [item for item in corpus if item["id"] in args.only]
+
+    llm = make_llm(args)
+    sink = JsonlEventSink(args.events) if args.events else None
+    report = {"schema_version": SCHEMA_VERSION, "revision": git_revision(),
+              "python": platform.python_version(), "llm": args.llm,
+              "repeats": args.repeats, "warm_caches": args.warm, "prefetch": args.prefetch, "router": args.router, "queries": {}}
+
+    with FixtureServer(port=args.port) as server, tempfile.TemporaryDirectory() as cache_root:
+        search_backend = FakeSearchBackend(server.base_url)
+        web_search.set_search_backend(search_backend)
+        # Local stand-ins need no politeness delay
+        rate_limiter.configure("127.0.0.1", rate=1000, burst=100)
+        rate_limiter.configure(web_search.SEARCH_DOMAIN, rate=1000, burst=100)
+        get_prefetcher().enabled = args.prefetch
+
+        def agent_factory():
+            return ShoppingAgent(llm=llm, router=None if args.router else False)
+
+        for item in corpus:
+            runs = []
+            for repeat in range(args.repeats):
+                if not args.warm or repeat == 0:
+                    reset_caches(os.path.join(cache_root, f"{item['id']}-{repeat}"))
+                recorder = EventRecorder([sink], session_id=f"{item['id']}-{repeat}") if sink else None
+                runs.append(await run_query(agent_factory, item["prompt"], recorder))
+
+            numeric = [key for key, value in runs[0].items() if isinstance(value, (int, float))]
+            report["queries"][item["id"]] = {
+                "prompt": item["prompt"],
+                "runs": runs,
+                "summary": {
+                    key: summarize([run[key] for run in runs if run[key] is not None])
+                    for key in numeric
+                },
+            }
+
+    if sink is not None:
+        await sink.aclose()
+    latencies = [run["latency_seconds"] for query in report["queries"].values() for run in query["runs"]]
+    report["overall"] = {"latency_seconds": summarize(latencies)}
+    if args.prefetch:
+        report["overall"]["prefetch"] = get_prefetcher().snapshot()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(__file__), "corpus.yaml"))
+    parser.add_argument("--only", nargs="*", help="Only run these corpus ids")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--warm", action="store_true", help="Keep page/search caches between repeats")
+    parser.add_argument("--llm", choices=["scripted", "replay", "record"], default="scripted",
+                        help="scripted: local ReAct script; replay: serve a recorded run from --llm-cache; "
+                             "record: call Gemini and record every completion")
+    parser.add_argument("--llm-cache", help="SQLite file for --llm replay/record")
+    parser.add_argument("--first-token-latency", type=float, default=0.0,
+                        help="Simulated seconds before the scripted LLM's first token")
+    parser.add_argument("--token-latency", type=float, default=0.0,
+                        help="Simulated seconds between the scripted LLM's tokens")
+    parser.add_argument("--port", type=int, default=8799,
+                        help="Fixture server port; keep it fixed so recorded LLM runs replay (0 = any)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--no-router", dest="router", action="store_false",
+                        help="Always start at the manager agent (no local routing)")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="Prefetch the top search results in the background (src/tools/prefetch.py)")
+    parser.add_argument("--events", help="Append every run's workflow events to this JSONL log")
+    args = parser.parse_args()
+    if args.llm == "replay" and not args.llm_cache:
+        parser.error("--llm replay needs --llm-cache")
+
+    report = asyncio.run(main_async(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
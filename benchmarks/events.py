@@ -0,0 +1,28 @@
+"""
+Summarizes JSONL event logs written by main.py or `benchmarks/e2e.py --events`.
+
+    python benchmarks/events.py agent_output_20250610_190558.jsonl
+"""
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.agents.event_sink import load_events, summarize_events  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("logs", nargs="+", help="JSONL event logs")
+    args = parser.parse_args()
+
+    sessions = {}
+    for path in args.logs:
+        sessions.update(summarize_events(load_events(path)))
+    print(json.dumps(sessions, indent=2))
+
+
+if __name__ == "__main__":
+    main()
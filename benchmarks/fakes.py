@@ -0,0 +1,178 @@
+"""
+Local stand-ins for the benchmark: a fixture HTTP server for retailer pages,
+a fake DuckDuckGo backend and a scripted ReAct LLM.
+"""
+import os
+import re
+import json
+import asyncio
+import threading
+import http.server
+from typing import Any, Sequence
+from llama_index.core.llms import (
+    ChatMessage,
+    ChatResponse,
+    CompletionResponse,
+    CustomLLM,
+    LLMMetadata,
+    MessageRole,
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class FixtureServer:
+    """Serves benchmarks/fixtures/pages on 127.0.0.1 from a background thread."""
+
+    def __init__(self, directory: str = os.path.join(FIXTURES, "pages"), port: int = 0):
+        directory = os.path.abspath(directory)
+
+        class Handler(http.server.SimpleHTTPRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=directory, **kwargs)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FixtureServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeSearchBackend:
+    """
+    Answers searches from fixtures/search.json by keyword overlap, with result
+    links pointing at the fixture server.
+    """
+
+    def __init__(self, base_url: str, path: str = os.path.join(FIXTURES, "search.json")):
+        with open(path, encoding="utf-8") as f:
+            self.entries = json.load(f)
+        self.base_url = base_url
+        self.calls = 0
+
+    def duckduckgo_full_search(self, query: str, max_results: int = 10) -> list[dict]:
+        self.calls += 1
+        words = set(re.findall(r"[a-z0-9]+", query.lower()))
+        best = max(self.entries, key=lambda entry: len(words & set(entry["keywords"])))
+        return [
+            dict(result, href=self.base_url + result["href"])
+            for result in best["results"][:max_results]
+        ]
+
+
+# System prompt markers -> agent role in the script
+AGENT_MARKERS = {
+    "You are the Manager Agent": "manager",
+    "You are the Researcher Agent": "researcher",
+    "You are the Product Hunter Agent": "worker",
+    "You are the Trivial Search Agent": "worker",
+    "You are the Product Investigator Agent": "worker",
+}
+
+
+def _react(thought: str, action: str = None, action_input: dict = None, answer: str = None) -> str:
+    if answer is not None:
+        return f"Thought: {thought}\nAnswer: {answer}"
+    return f"Thought: {thought}\nAction: {action}\nAction Input: {json.dumps(action_input)}"
+
+
+class ScriptedLLM(CustomLLM):
+    """
+    A deterministic ReAct "model" that drives the real workflow end to end.
+
+    The manager hands off to the product hunter, which searches, visits the
+    top results in one batch call and answers with the products it saw. The
+    researcher splits PC builds into parts for parallel_product_hunt and
+    answers with the parts' products.
+    `first_token_latency` and `token_latency` simulate provider latency.
+    """
+
+    first_token_latency: float = 0.0
+    token_latency: float = 0.0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="scripted-react", is_chat_model=False)
+
+    def script(self, prompt: str) -> str:
+        role = next((r for marker, r in AGENT_MARKERS.items() if marker in prompt), "worker")
+        conversation = prompt.rsplit("## Current Conversation", 1)[-1]
+        request = re.search(r"^user: (.*)", conversation, re.MULTILINE)
+        request = request.group(1).strip() if request else ""
+        actions = re.findall(r"Action: (\w+)", conversation)
+        last_action = actions[-1] if actions else None
+        observation = conversation.rsplit("Observation:", 1)[-1] if "Observation:" in conversation else ""
+
+        if role == "manager" and last_action is None:
+            return _react(
+                "This is a product request, the product hunter should handle it.",
+                "handoff", {"to_agent": "product_hunter_agent", "reason": request[:200]},
+            )
+        if role == "researcher" and last_action is None and "parallel_product_hunt" in prompt and "build" in request.lower():
+            parts = ["Gaming graphics card (GPU) in stock in Egypt", "Desktop processor (CPU) in stock in Egypt",
+                     "16GB RAM kit and 1TB NVMe SSD in stock in Egypt"]
+            return _react("The parts are independent, I will hunt them in parallel.",
+                          "parallel_product_hunt", {"subtasks": parts})
+        if last_action == "parallel_product_hunt":
+            lines = re.findall(r"^- .+ - [\d,]+ EGP - http\S+$", observation, re.MULTILINE)
+            return _react("I have every part.", answer="\n".join(lines) or "I could not find matching products.")
+        if last_action in (None, "handoff"):
+            return _react("I need to search for vendors.", "duckduckgo_full_search", {"query": request[:200]})
+        if last_action == "duckduckgo_full_search":
+            urls = re.findall(r"'href': '([^']+)'", observation)[:3]
+            return _react("I should check the result pages together.", "visit_webpages", {"urls": urls})
+
+        products = re.findall(r"\[([^\]]+)\]\((http[^)]+/product/[^)]+)\)\s*([\d,]+ EGP)", observation)
+        lines = [f"- {name} - {price} - {url}" for name, url, price in products[:5]]
+        return _react(
+            "I can answer without using any more tools.",
+            answer="\n".join(lines) or "I could not find matching products.",
+        )
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(text=self.script(prompt))
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        text = self.script(prompt)
+
+        def gen():
+            yield CompletionResponse(text=text, delta=text)
+
+        return gen()
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        text = self.script(self.messages_to_prompt(messages))
+        words = re.findall(r"\S+\s*", text)
+
+        async def gen():
+            await asyncio.sleep(self.first_token_latency)
+            response = ""
+            for word in words:
+                response += word
+                yield ChatResponse(
+                    message=ChatMessage(role=MessageRole.ASSISTANT, content=response),
+                    delta=word,
+                )
+                if self.token_latency:
+                    await asyncio.sleep(self.token_latency)
+
+        return gen()
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        last = None
+        async for last in await self.astream_chat(messages, **kwargs):
+            pass
+        return ChatResponse(message=last.message if last else ChatMessage(role=MessageRole.ASSISTANT, content=""))
@@ -0,0 +1,155 @@
+"""
+Local load test of the HTTP front-end (server.py).
+
+The server runs in-process on the offline stand-ins of benchmarks/fakes.py
+(fixture pages, fake search, scripted LLM with simulated provider latency),
+and `--clients` concurrent clients each stream `--requests` turns from it.
+The report holds time to first byte, time to first streamed token and total
+turn latency percentiles, the status codes seen and the server's /metrics.
+
+    python benchmarks/load.py --clients 50 --requests 4 --first-token-latency 0.5
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yaml  # noqa: E402
+from aiohttp import ClientSession, ClientTimeout, web  # noqa: E402
+from e2e import reset_caches, summarize  # noqa: E402
+from fakes import FakeSearchBackend, FixtureServer, ScriptedLLM  # noqa: E402
+
+
+async def stream_turn(session: ClientSession, url: str, prompt: str, disconnect_after: float = None) -> dict:
+    """Streams one turn, timing the first byte, the first delta and the end of the stream."""
+    started = time.perf_counter()
+    result = {"status": None, "first_byte": None, "first_token": None, "latency": None, "events": Counter()}
+    async with session.post(url, json={"prompt": prompt}) as response:
+        result["status"] = response.status
+        if response.status != 200:
+            return result
+        event = None
+        async for line in response.content:
+            now = time.perf_counter() - started
+            if result["first_byte"] is None:
+                result["first_byte"] = now
+            line = line.decode().rstrip("\n")
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                result["events"][event] += 1
+                if event == "delta" and result["first_token"] is None:
+                    result["first_token"] = now
+            if disconnect_after is not None and now >= disconnect_after:
+                result["status"] = "disconnected"
+                return result
+            if event == "done":
+                break
+    result["latency"] = time.perf_counter() - started
+    return result
+
+
+async def client(session: ClientSession, url: str, prompts: list[str], requests: int,
+                 disconnect_rate: float, rng: random.Random) -> list[dict]:
+    results = []
+    for _ in range(requests):
+        disconnect_after = rng.uniform(0.05, 0.5) if rng.random() < disconnect_rate else None
+        results.append(await stream_turn(session, url, rng.choice(prompts), disconnect_after))
+    return results
+
+
+async def main_async(args) -> dict:
+    from ShoppingAgent import ShoppingAgent
+    from server import create_app
+    from src.tools import web_search
+    from src.tools.http_client import rate_limiter
+
+    with open(args.corpus, encoding="utf-8") as f:
+        prompts = [item["prompt"] for item in yaml.safe_load(f)]
+
+    with FixtureServer() as fixtures, tempfile.TemporaryDirectory() as cache_root:
+        web_search.set_search_backend(FakeSearchBackend(fixtures.base_url))
+        rate_limiter.configure("127.0.0.1", rate=10000, burst=10000)
+        rate_limiter.configure(web_search.SEARCH_DOMAIN, rate=10000, burst=10000)
+        reset_caches(cache_root)
+
+        llm = ScriptedLLM(first_token_latency=args.first_token_latency, token_latency=args.token_latency)
+        app = create_app(ShoppingAgent(llm=llm), max_concurrent_runs=args.max_concurrent_runs,
+                         max_queued_runs=args.max_queued_runs)
+        runner = web.AppRunner(app, handler_cancellation=True)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        base_url = f"http://127.0.0.1:{port}"
+
+        rng = random.Random(args.seed)
+        started = time.perf_counter()
+        try:
+            async with ClientSession(timeout=ClientTimeout(total=None)) as session:
+                per_client = await asyncio.gather(*(
+                    client(session, f"{base_url}/v1/query", prompts, args.requests, args.disconnect_rate,
+                           random.Random(rng.random()))
+                    for _ in range(args.clients)
+                ))
+                # Let cancelled turns unwind before reading the counters
+                await asyncio.sleep(0.2)
+                async with session.get(f"{base_url}/metrics") as response:
+                    metrics = await response.json()
+        finally:
+            await runner.cleanup()
+        wall = time.perf_counter() - started
+
+    results = [result for results in per_client for result in results]
+    completed = [result for result in results if result["latency"] is not None]
+    report = {
+        "clients": args.clients,
+        "requests": len(results),
+        "first_token_latency": args.first_token_latency,
+        "wall_seconds": wall,
+        "turns_per_second": len(completed) / wall if wall else None,
+        "status": dict(Counter(str(result["status"]) for result in results)),
+        "events": dict(sum((result["events"] for result in results), Counter())),
+        "server": metrics,
+    }
+    for key in ("first_byte", "first_token", "latency"):
+        samples = [result[key] for result in results if result[key] is not None]
+        report[f"{key}_seconds"] = summarize(samples) if samples else None
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(__file__), "corpus.yaml"))
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent streaming clients")
+    parser.add_argument("--requests", type=int, default=3, help="Turns per client, one after another")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0,
+                        help="Share of turns whose client hangs up mid-stream")
+    parser.add_argument("--first-token-latency", type=float, default=0.3,
+                        help="Simulated seconds before the scripted LLM's first token")
+    parser.add_argument("--token-latency", type=float, default=0.0,
+                        help="Simulated seconds between the scripted LLM's tokens")
+    parser.add_argument("--max-concurrent-runs", type=int, default=16)
+    parser.add_argument("--max-queued-runs", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Startup benchmark: import time, construction time and time-to-first-token.
+
+Every measurement runs in a fresh interpreter so module caches do not hide
+import costs. By default the LLM is LlamaIndex's MockLLM, so time-to-first-token
+measures our own startup path; pass `--llm gemini` to include the real client.
+
+    python benchmarks/startup.py --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+FIRST_TOKEN_SNIPPET = """
+import time
+started = time.perf_counter()
+import asyncio
+from ShoppingAgent import ShoppingAgent
+
+def make_llm():
+    if {llm!r} == "gemini":
+        from src.llms.gemini_2_flash import create_gemini
+        return create_gemini()
+    from llama_index.core.llms import MockLLM
+    return MockLLM(max_tokens=32)
+
+async def main():
+    agent = ShoppingAgent(llm_factory=make_llm)
+    constructed = time.perf_counter()
+    workflow = agent.build()
+    built = time.perf_counter()
+    from llama_index.core.agent.workflow import AgentStream
+    handler = workflow.run(user_msg="I want a wired gaming headset around 1000 EGP.", ctx=agent.ctx)
+    first_token = None
+    async for ev in handler.stream_events():
+        if isinstance(ev, AgentStream) and ev.delta:
+            first_token = time.perf_counter()
+            break
+    await handler.cancel_run()
+    return constructed, built, first_token
+
+constructed, built, first_token = asyncio.run(main())
+print(constructed - started, built - started, (first_token or float("nan")) - started)
+"""
+
+
+def run_snippet(code: str) -> list[float]:
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()[-1]
+    return [float(value) for value in output.split()]
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "max": max(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--llm", choices=["mock", "gemini"], default="mock")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    for module in ["ShoppingAgent", "main"]:
+        samples = [run_snippet(IMPORT_SNIPPET.format(module=module))[0] for _ in range(args.runs)]
+        results[f"import_{module}_seconds"] = summarize(samples)
+
+    runs = [run_snippet(FIRST_TOKEN_SNIPPET.format(llm=args.llm)) for _ in range(args.runs)]
+    results["construct_seconds"] = summarize([run[0] for run in runs])
+    results["build_workflow_seconds"] = summarize([run[1] for run in runs])
+    results["time_to_first_token_seconds"] = summarize([run[2] for run in runs])
+    results["llm"] = args.llm
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+HTTP front-end for the shopping agent: every turn is streamed over Server-Sent Events.
+
+    python server.py --port 8080
+    curl -N localhost:8080/v1/query -d '{"prompt": "A wired gaming headset under 1000 EGP"}'
+
+Endpoints:
+    POST   /v1/query                 One-off turn in a new session ({"prompt", "session_id"?})
+    POST   /v1/sessions              Open a session, returns {"session_id"}
+    POST   /v1/sessions/{id}/query   Next turn of a session ({"prompt"})
+    DELETE /v1/sessions/{id}         Close a session
+    GET    /healthz                  Liveness and load
+    GET    /metrics                  Counters, latency histograms, router/session/LLM/cache stats
+
+A turn streams `session`, then `delta`, `llm_input`, `llm_output`, `tool_call`
+and `tool_result` events as the workflow produces them (the records of
+src/agents/event_sink.py), and ends with `answer` or `error`, then `done`.
+"""
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+from typing import Any, Callable, Optional
+
+from aiohttp import web
+
+from src.agents.event_sink import EventRecorder
+from src.agents.sessions import MAX_CONCURRENT_RUNS, MAX_SESSIONS, SessionLimitError, SessionManager
+from src.agents.tracing import LatencyHistogram
+
+
+# Turns waiting for a run slot before new ones are turned away
+MAX_QUEUED_RUNS = 64
+# Open event streams before new ones are turned away
+MAX_STREAMS = 256
+# Records buffered for one slow client (deltas are merged first); past
+# this the client is considered gone and its turn is cancelled
+STREAM_BUFFER_RECORDS = 2000
+HEARTBEAT_SECONDS = 15
+RETRY_AFTER_SECONDS = 2
+
+
+class SseStream:
+    """
+    Event sink buffering one connection's records until the client reads them.
+
+    While the client keeps up every record is sent as it arrives. When it
+    falls behind, consecutive deltas of one agent are merged into a single
+    record, so the buffer grows with the number of events rather than
+    tokens; if it still exceeds `max_records` the turn is cancelled through
+    `on_overflow`.
+    """
+
+    def __init__(self, max_records: int = STREAM_BUFFER_RECORDS, on_overflow: Optional[Callable[[], Any]] = None):
+        self.max_records = max_records
+        self.on_overflow = on_overflow
+        self.records: deque = deque()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.overflowed = False
+
+    def emit(self, record: dict) -> None:
+        if self.closed:
+            return
+        last = self.records[-1] if self.records else None
+        if record["type"] == "delta" and last is not None and last["type"] == "delta" and last["agent"] == record["agent"]:
+            last["text"] += record["text"]
+        else:
+            self.records.append(dict(record))
+            if len(self.records) > self.max_records and not self.overflowed:
+                self.overflowed = True
+                if self.on_overflow is not None:
+                    self.on_overflow()
+        self.ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self.ready.set()
+
+    async def aclose(self) -> None:
+        self.close()
+
+    async def batches(self, heartbeat: float = HEARTBEAT_SECONDS):
+        """Yields the buffered records as they arrive, or None after `heartbeat` seconds of silence."""
+        while True:
+            try:
+                await asyncio.wait_for(self.ready.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            self.ready.clear()
+            batch = list(self.records)
+            self.records.clear()
+            if batch:
+                yield batch
+            if self.closed and not self.records:
+                return
+
+
+def sse_frame(record: dict) -> bytes:
+    return f"event: {record['type']}\ndata: {json.dumps(record, ensure_ascii=False, default=str)}\n\n".encode()
+
+
+class ShoppingServer:
+    """Serves a SessionManager over HTTP, with admission control and metrics."""
+
+    def __init__(self, manager: SessionManager, max_queued_runs: int = MAX_QUEUED_RUNS,
+                 max_streams: int = MAX_STREAMS):
+        self.manager = manager
+        self.max_queued_runs = max_queued_runs
+        self.max_streams = max_streams
+        self.streams = 0
+        self.counters = {"requests": 0, "completed": 0, "rejected": 0, "disconnected": 0,
+                         "overflowed": 0, "errors": 0}
+        self.histograms = {"first_byte": LatencyHistogram(), "first_token": LatencyHistogram(),
+                           "turn": LatencyHistogram()}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.post("/v1/query", self.query),
+            web.post("/v1/sessions", self.create_session),
+            web.post("/v1/sessions/{session_id}/query", self.query),
+            web.delete("/v1/sessions/{session_id}", self.close_session),
+            web.get("/healthz", self.health),
+            web.get("/metrics", self.metrics),
+        ])
+        app.on_startup.append(self._start)
+        app.on_cleanup.append(self._cleanup)
+        return app
+
+    async def _start(self, app: web.Application) -> None:
+        self.manager.start()
+
+    async def _cleanup(self, app: web.Application) -> None:
+        from src.tools.http_client import close_client
+
+        await self.manager.aclose()
+        await close_client()
+
+    # Admission control
+
+    def _reject(self, reason: str) -> web.Response:
+        self.counters["rejected"] += 1
+        return web.json_response({"error": reason}, status=503,
+                                 headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+    def _overloaded(self) -> Optional[str]:
+        if self.streams >= self.max_streams:
+            return f"Too many open streams ({self.streams}), try again shortly."
+        if self.manager.stats["waiting"] >= self.max_queued_runs:
+            return f"Too many queued turns ({self.manager.stats['waiting']}), try again shortly."
+        return None
+
+    # Handlers
+
+    async def create_session(self, request: web.Request) -> web.Response:
+        try:
+            session_id = self.manager.create()
+        except SessionLimitError as e:
+            return self._reject(str(e))
+        return web.json_response({"session_id": session_id}, status=201)
+
+    async def close_session(self, request: web.Request) -> web.Response:
+        await self.manager.close(request.match_info["session_id"])
+        return web.Response(status=204)
+
+    async def query(self, request: web.Request) -> web.StreamResponse:
+        started = time.perf_counter()
+        self.counters["requests"] += 1
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.json_response({"error": "The body must be JSON."}, status=400)
+        prompt = body.get("prompt") if isinstance(body, dict) else None
+        if not isinstance(prompt, str) or not prompt.strip():
+            return web.json_response({"error": "A non-empty \"prompt\" is required."}, status=400)
+
+        reason = self._overloaded()
+        if reason is not None:
+            return self._reject(reason)
+        session_id = request.match_info.get("session_id") or body.get("session_id")
+        try:
+            session = await self.manager.aget(session_id or self.manager.create())
+        except SessionLimitError as e:
+            return self._reject(str(e))
+        if session.busy:
+            return web.json_response({"error": "This session is already running a turn."}, status=409)
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        await response.prepare(request)
+        self.streams += 1
+        stream = SseStream()
+        recorder = EventRecorder([stream], session_id=session.id)
+        turn = asyncio.ensure_future(self.manager.query(session.id, prompt, on_event=recorder.emit))
+        turn.add_done_callback(lambda _: stream.close())
+        stream.on_overflow = turn.cancel
+        try:
+            # The first byte goes out before the turn waits for a run slot
+            await response.write(sse_frame({"type": "session", "session": session.id}))
+            self.histograms["first_byte"].record(time.perf_counter() - started)
+            first_token = True
+            async for batch in stream.batches():
+                if batch is None:
+                    await response.write(b": ping\n\n")
+                    continue
+                if first_token and any(record["type"] == "delta" for record in batch):
+                    first_token = False
+                    self.histograms["first_token"].record(time.perf_counter() - started)
+                await response.write(b"".join(sse_frame(record) for record in batch))
+
+            if stream.overflowed:
+                self.counters["overflowed"] += 1
+                final = {"type": "error", "error": "The client fell too far behind, the turn was cancelled."}
+            else:
+                try:
+                    final = {"type": "answer", "text": str(turn.result())}
+                    self.counters["completed"] += 1
+                except Exception as e:
+                    self.counters["errors"] += 1
+                    final = {"type": "error", "error": f"{type(e).__name__}: {e}"}
+            await response.write(sse_frame(final) + sse_frame({"type": "done"}))
+            self.histograms["turn"].record(time.perf_counter() - started)
+        except (ConnectionResetError, asyncio.CancelledError):
+            # The client went away: cancelling the turn stops its workflow
+            # and the tool calls in flight (see ShoppingAgent.run_turn)
+            self.counters["disconnected"] += 1
+            raise
+        finally:
+            self.streams -= 1
+            if not turn.done():
+                turn.cancel()
+                await asyncio.gather(turn, return_exceptions=True)
+        return response
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "status": "ok",
+            "streams": self.streams,
+            "running": self.manager.stats["running"],
+            "waiting": self.manager.stats["waiting"],
+        })
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        from src.agents.prompts import get_prompt_stats
+        from src.llms.pool import get_llm_pool
+        from src.tools.prefetch import get_prefetcher
+        from src.tools.singleflight import get_singleflight
+
+        agent = self.manager.agent
+        return web.json_response({
+            "server": dict(self.counters, streams=self.streams),
+            "latency_seconds": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+            "sessions": self.manager.snapshot(),
+            "router": agent.router_stats.snapshot(),
+            "fanout": dict(agent.fanout.counters) if getattr(agent, "fanout", None) else None,
+            "llm": get_llm_pool().snapshot(),
+            "prompts": get_prompt_stats().snapshot(),
+            "prefetch": get_prefetcher().snapshot(),
+            "singleflight": get_singleflight().snapshot(),
+        })
+
+
+def create_app(agent: Any = None, max_sessions: int = MAX_SESSIONS,
+               max_concurrent_runs: int = MAX_CONCURRENT_RUNS, max_queued_runs: int = MAX_QUEUED_RUNS,
+               max_streams: int = MAX_STREAMS, snapshots: Optional[str] = None) -> web.Application:
+    """
+    Builds the aiohttp application around one shared ShoppingAgent.
+
+    Args:
+        agent (ShoppingAgent): The agent to serve, `ShoppingAgent()` by default.
+        max_sessions (int): Sessions kept in memory.
+        max_concurrent_runs (int): Turns running at once.
+        max_queued_runs (int): Turns waiting for a slot before 503s.
+        max_streams (int): Open event streams before 503s.
+        snapshots (str): SQLite file sessions are snapshotted to after each
+            turn, so they survive restarts and can move between workers.
+    """
+    if agent is None:
+        from ShoppingAgent import ShoppingAgent
+
+        agent = ShoppingAgent()
+    agent.build()
+    store = None
+    if snapshots:
+        from src.agents.snapshots import SessionStore
+
+        store = SessionStore(snapshots)
+    manager = SessionManager(agent, max_sessions=max_sessions, max_concurrent_runs=max_concurrent_runs,
+                             store=store)
+    return ShoppingServer(manager, max_queued_runs=max_queued_runs, max_streams=max_streams).app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the shopping agent over HTTP (Server-Sent Events).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--max-concurrent-runs", type=int, default=MAX_CONCURRENT_RUNS)
+    parser.add_argument("--max-queued-runs", type=int, default=MAX_QUEUED_RUNS)
+    parser.add_argument("--max-streams", type=int, default=MAX_STREAMS)
+    parser.add_argument("--snapshots", help="SQLite file to snapshot sessions to (shared by workers on one host)")
+    args = parser.parse_args()
+
+    app = create_app(max_sessions=args.max_sessions, max_concurrent_runs=args.max_concurrent_runs,
+                     max_queued_runs=args.max_queued_runs, max_streams=args.max_streams,
+                     snapshots=args.snapshots)
+    # A client disconnecting cancels its handler, and with it the turn
+    web.run_app(app, host=args.host, port=args.port, handler_cancellation=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import time
+import asyncio
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Optional
+
+
+# Rough characters per token, used when the provider reports no usage
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class BudgetLimits:
+    """Caps for one workflow run. `None` disables a cap."""
+
+    max_llm_calls: Optional[int] = 50
+    max_input_tokens: Optional[int] = 500_000
+    max_output_tokens: Optional[int] = 50_000
+    max_tool_calls: Optional[int] = 80
+    max_handoffs: Optional[int] = 10
+    max_seconds: Optional[float] = 600
+    # Agent name -> caps that apply to that agent only
+    per_agent: dict[str, "BudgetLimits"] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BudgetLimits":
+        data = dict(data or {})
+        per_agent = {name: cls.from_dict(limits) for name, limits in data.pop("per_agent", {}).items()}
+        return cls(**data, per_agent=per_agent)
+
+
+@dataclass
+class BudgetCounters:
+    llm_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    tool_calls: int = 0
+    handoffs: int = 0
+
+    def exceeded(self, limits: BudgetLimits, **pending: int) -> Optional[str]:
+        """Returns the name of the first cap that is (or, with `pending` added, would be) exceeded."""
+        for name, value in asdict(self).items():
+            limit = getattr(limits, f"max_{name}")
+            if limit is not None and value + pending.get(name, 0) > limit:
+                return name
+        return None
+
+
+def _estimate_tokens(messages: list) -> int:
+    return sum(len(str(message.content or "")) for message in messages) // CHARS_PER_TOKEN
+
+
+def _usage(raw: Any) -> tuple[Optional[int], Optional[int]]:
+    """Reads (input, output) token usage from a provider response, if reported."""
+    if not isinstance(raw, dict):
+        return None, None
+    usage = raw.get("usage_metadata") or raw.get("usage") or {}
+    if not isinstance(usage, dict):
+        return None, None
+    prompt = usage.get("prompt_token_count", usage.get("prompt_tokens"))
+    output = usage.get("candidates_token_count", usage.get("completion_tokens"))
+    return prompt, output
+
+
+class BudgetGovernor:
+    """
+    Enforces BudgetLimits on a running AgentWorkflow.
+
+    Wrap the handler's event stream with `stream()` (or just `await run()`):
+    every LLM call, tool call and handoff is counted globally and per agent,
+    and when a cap is reached the run is cancelled and `result()` returns the
+    best answer produced so far instead of raising.
+    """
+
+    def __init__(self, limits: Optional[BudgetLimits] = None, total: Optional[BudgetCounters] = None,
+                 per_agent: Optional[dict[str, BudgetCounters]] = None):
+        """
+        Args:
+            limits (BudgetLimits): The caps, defaults to `BudgetLimits()`.
+            total (BudgetCounters): Global counters to share with other
+                governors, e.g. the parent run of a fan-out; fresh by default.
+            per_agent (dict): Per-agent counters to share the same way.
+        """
+        self.limits = limits or BudgetLimits()
+        self.total = total if total is not None else BudgetCounters()
+        self.per_agent: dict[str, BudgetCounters] = per_agent if per_agent is not None else {}
+        self.started: Optional[float] = None
+        self.stopped_reason: Optional[str] = None
+        self.best_answer: Optional[str] = None
+        self.last_response: Optional[str] = None
+        self.last_agent: Optional[str] = None
+        self.pending_input_tokens = 0
+
+    def _counters(self, agent: str) -> list[BudgetCounters]:
+        return [self.total, self.per_agent.setdefault(agent, BudgetCounters())]
+
+    def _check(self, agent: str, **pending: int) -> bool:
+        reason = self.total.exceeded(self.limits, **pending)
+        if reason is None and agent in self.limits.per_agent:
+            counters = self.per_agent.setdefault(agent, BudgetCounters())
+            reason = counters.exceeded(self.limits.per_agent[agent], **pending)
+            if reason is not None:
+                reason = f"{agent}.{reason}"
+        if reason is not None and self.stopped_reason is None:
+            self.stopped_reason = reason
+        return self.stopped_reason is not None
+
+    def observe(self, ev: Any) -> bool:
+        """
+        Counts one workflow event.
+
+        LLM and tool calls are checked on the events emitted right before
+        they run. The stream is read while the workflow keeps going, so the
+        call behind the event may already be under way: a spent budget
+        stops the run after at most one extra call.
+
+        Returns:
+            bool: True when the run should stop.
+        """
+        from llama_index.core.agent.workflow import AgentInput, AgentOutput, ToolCall
+
+        if isinstance(ev, AgentInput):
+            agent = self.last_agent = ev.current_agent_name
+            if self._check(agent, llm_calls=1):
+                return True
+            self.pending_input_tokens = _estimate_tokens(ev.input)
+            for counters in self._counters(agent):
+                counters.llm_calls += 1
+        elif isinstance(ev, AgentOutput):
+            agent = self.last_agent = ev.current_agent_name
+            content = ev.response.content or ""
+            prompt, output = _usage(ev.raw)
+            for counters in self._counters(agent):
+                counters.input_tokens += prompt if prompt is not None else self.pending_input_tokens
+                counters.output_tokens += output if output is not None else len(content) // CHARS_PER_TOKEN
+            self.pending_input_tokens = 0
+            if content.strip():
+                self.last_response = content
+                if not ev.tool_calls:
+                    self.best_answer = content
+            return self._check(agent)
+        elif isinstance(ev, ToolCall):
+            agent = self.last_agent or "unknown"
+            handoff = int(ev.tool_name == "handoff")
+            if self._check(agent, tool_calls=1, handoffs=handoff):
+                return True
+            for counters in self._counters(agent):
+                counters.tool_calls += 1
+                counters.handoffs += handoff
+        return self.stopped_reason is not None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started if self.started is not None else 0.0
+
+    def child(self) -> "BudgetGovernor":
+        """
+        A governor for a sub-run of this run, e.g. one part of a fan-out.
+
+        It charges this run's total and per-agent counters, and its time cap
+        is what is left of this run's, so sub-runs can neither outspend nor
+        outlast the turn they belong to.
+        """
+        limits = self.limits
+        if limits.max_seconds is not None:
+            limits = replace(limits, max_seconds=max(0.0, limits.max_seconds - self.elapsed()))
+        return BudgetGovernor(limits, total=self.total, per_agent=self.per_agent)
+
+    def snapshot(self) -> dict:
+        """Live counters, safe to read while the run is in progress."""
+        return {
+            "elapsed_seconds": self.elapsed(),
+            "stopped_reason": self.stopped_reason,
+            "total": asdict(self.total),
+            "per_agent": {name: asdict(counters) for name, counters in self.per_agent.items()},
+        }
+
+    def _on_deadline(self, handler: Any) -> None:
+        if self.stopped_reason is None:
+            self.stopped_reason = "seconds"
+        asyncio.ensure_future(handler.cancel_run())
+
+    async def stream(self, handler: Any):
+        """
+        Yields the handler's events while enforcing the limits.
+
+        The handler gets a `budget` attribute pointing at this governor so
+        callers can read live counters from it.
+        """
+        handler.budget = self
+        self.started = time.monotonic()
+        deadline = None
+        if self.limits.max_seconds is not None:
+            deadline = asyncio.get_running_loop().call_later(
+                self.limits.max_seconds, self._on_deadline, handler
+            )
+        try:
+            async for ev in handler.stream_events():
+                stop = self.observe(ev)
+                yield ev
+                if stop:
+                    await handler.cancel_run()
+                    break
+        finally:
+            if deadline is not None:
+                deadline.cancel()
+
+    async def result(self, handler: Any) -> Any:
+        """The workflow result, or the best answer so far if a cap stopped the run."""
+        if self.stopped_reason is None:
+            return await handler
+
+        from llama_index.core.llms import ChatMessage
+        from llama_index.core.agent.workflow import AgentOutput
+
+        answer = self.best_answer or self.last_response or "No answer was produced."
+        note = f"\n\n(Stopped early: the {self.stopped_reason} budget was reached.)"
+        return AgentOutput(
+            response=ChatMessage(role="assistant", content=answer + note),
+            current_agent_name=self.last_agent or "unknown",
+            tool_calls=[],
+        )
+
+    async def run(self, handler: Any) -> Any:
+        """Drains the handler's events under the limits and returns `result()`."""
+        async for _ in self.stream(handler):
+            pass
+        return await self.result(handler)
+
+
+# The governor of the workflow run in progress, set before `workflow.run` so
+# that its tool calls (e.g. a fan-out, see src/agents/fanout.py) can charge
+# their own LLM and tool calls to the same budget
+_governor: ContextVar[Optional[BudgetGovernor]] = ContextVar("budget_governor", default=None)
+
+
+def use_budget(governor: BudgetGovernor) -> BudgetGovernor:
+    _governor.set(governor)
+    return governor
+
+
+def current_budget() -> Optional[BudgetGovernor]:
+    return _governor.get()
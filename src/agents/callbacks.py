@@ -0,0 +1,44 @@
+from datetime import datetime
+from llama_index.core.callbacks import CallbackManager
+from llama_index.core.callbacks.base_handler import BaseCallbackHandler
+
+from src.agents.tracing import get_tracer
+
+
+class CustomDebugHandler(BaseCallbackHandler):
+    """
+    Records llama_index callback events as tracing spans.
+
+    Replaces the old handler that printed every event and its payload to
+    stdout; with tracing disabled every hook returns immediately.
+    """
+
+    def __init__(self):
+        super().__init__(event_starts_to_ignore=[], event_ends_to_ignore=[])
+        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.tracer = get_tracer()
+        self.open_spans = {}
+
+    def on_event_start(self, event_type, payload=None, event_id="", parent_id="", **kwargs):
+        if self.tracer.enabled:
+            name = str(getattr(event_type, "value", event_type))
+            self.open_spans[event_id] = self.tracer.start("callback", name)
+        return event_id
+
+    def on_event_end(self, event_type, payload=None, event_id="", **kwargs):
+        span = self.open_spans.pop(event_id, None)
+        if span is not None:
+            self.tracer.finish(span)
+
+    def start_trace(self, trace_id=None):
+        pass
+
+    def end_trace(self, trace_id=None, trace_map=None):
+        pass
+
+
+def create_callback_manager():
+    """Create a callback manager with custom handlers"""
+    debug_handler = CustomDebugHandler()
+    callback_manager = CallbackManager([debug_handler])
+    return callback_manager
@@ -0,0 +1,292 @@
+import sys
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Iterator, Optional
+
+
+# Bump when a record's fields change meaning; readers check it
+EVENT_SCHEMA_VERSION = 1
+# Characters of a tool's output kept in the log and on the console
+OUTPUT_PREVIEW_CHARS = 500
+# Records a JSONL sink holds while its writes are not keeping up (or
+# failing); past this new records are dropped and counted
+MAX_BUFFERED_RECORDS = 10000
+
+logger = logging.getLogger(__name__)
+
+
+def event_record(ev: Any, agent: Optional[str]) -> Optional[dict]:
+    """
+    Converts one workflow event into a log record.
+
+    Args:
+        ev: An event from `handler.stream_events()`.
+        agent (str): The agent to attribute it to when the event has no name.
+
+    Returns:
+        dict: The record, or None for events that are not logged.
+    """
+    kind = type(ev).__name__
+    if kind == "AgentStream":
+        if not ev.delta:
+            return None
+        return {"type": "delta", "agent": ev.current_agent_name, "text": ev.delta}
+    if kind == "AgentInput":
+        from src.agents.prompts import split_tokens
+
+        static, dynamic = split_tokens(ev.input)
+        return {"type": "llm_input", "agent": ev.current_agent_name, "messages": len(ev.input),
+                "static_tokens": static, "dynamic_tokens": dynamic}
+    if kind == "AgentOutput":
+        return {
+            "type": "llm_output",
+            "agent": ev.current_agent_name,
+            "text": ev.response.content or "",
+            "tool_calls": [call.tool_name for call in ev.tool_calls or []],
+        }
+    if kind == "ToolCall":
+        return {"type": "tool_call", "agent": agent, "tool": ev.tool_name, "input": ev.tool_kwargs}
+    if kind == "ToolCallResult":
+        output = str(ev.tool_output)
+        return {
+            "type": "tool_result",
+            "agent": agent,
+            "tool": ev.tool_name,
+            "input": ev.tool_kwargs,
+            "output": output[:OUTPUT_PREVIEW_CHARS],
+            "output_chars": len(output),
+            "error": bool(getattr(ev.tool_output, "is_error", False)),
+        }
+    return None
+
+
+def _coalesce(records: list[dict]) -> list[dict]:
+    """Merges runs of deltas from the same agent into one record, so log size tracks text, not tokens."""
+    merged: list[dict] = []
+    for record in records:
+        last = merged[-1] if merged else None
+        if (record["type"] == "delta" and last is not None and last["type"] == "delta"
+                and last["agent"] == record["agent"] and last["session"] == record["session"]):
+            last["text"] += record["text"]
+            last["n"] = last.get("n", 1) + 1
+        else:
+            merged.append(dict(record))
+    return merged
+
+
+class JsonlEventSink:
+    """
+    Appends records to a JSONL file in batches, off the event loop.
+
+    `emit()` only appends to an in-memory buffer. A background task wakes
+    every `flush_interval` seconds (or as soon as `batch_size` records are
+    waiting), merges consecutive deltas and writes the batch from a worker
+    thread, so streaming faster does not make logging slower.
+
+    A failed write (disk full, bad path) is logged and its batch dropped;
+    the sink keeps trying with later batches, and holds at most
+    `max_buffered` records in the meantime.
+    """
+
+    def __init__(self, path: str, batch_size: int = 256, flush_interval: float = 0.5,
+                 max_buffered: int = MAX_BUFFERED_RECORDS):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.buffer: list[dict] = []
+        self.records_written = 0
+        self.records_dropped = 0
+        self.write_errors = 0
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.closed = False
+
+    def emit(self, record: dict) -> None:
+        if len(self.buffer) >= self.max_buffered:
+            self.records_dropped += 1
+            return
+        self.buffer.append(record)
+        if self.task is None:
+            self.wakeup = asyncio.Event()
+            self.task = asyncio.get_running_loop().create_task(self._run())
+        elif len(self.buffer) >= self.batch_size:
+            self.wakeup.set()
+
+    async def _run(self) -> None:
+        while not self.closed:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    def _write(self, batch: list[dict]) -> int:
+        lines = [json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+                 for record in _coalesce(batch)]
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return len(lines)
+
+    async def flush(self) -> None:
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        try:
+            self.records_written += await asyncio.to_thread(self._write, batch)
+        except OSError as e:
+            self.write_errors += 1
+            self.records_dropped += len(batch)
+            logger.warning("Could not write %d event records to %s: %s", len(batch), self.path, e)
+
+    async def aclose(self) -> None:
+        self.closed = True
+        if self.task is not None:
+            self.wakeup.set()
+            await self.task
+        await self.flush()
+
+
+class ConsoleRenderer:
+    """
+    Prints records for a human, at most once every `interval` seconds.
+
+    Deltas are buffered and printed together; tool results are printed as a
+    block with their output already truncated by `event_record`.
+    """
+
+    def __init__(self, interval: float = 0.1, stream=None, show_deltas: bool = True):
+        self.interval = interval
+        self.stream = stream or sys.stdout
+        self.show_deltas = show_deltas
+        self.pending: list[str] = []
+        self.pending_agent: Optional[str] = None
+        self.last_render = 0.0
+
+    def _render_pending(self) -> None:
+        if self.pending:
+            self.stream.write(f"[{self.pending_agent}] 💭: {''.join(self.pending)}")
+            self.stream.flush()
+            self.pending = []
+        self.last_render = time.monotonic()
+
+    def emit(self, record: dict) -> None:
+        kind = record["type"]
+        if kind == "delta":
+            if not self.show_deltas:
+                return
+            if record["agent"] != self.pending_agent:
+                self._render_pending()
+                self.pending_agent = record["agent"]
+            self.pending.append(record["text"])
+            if time.monotonic() - self.last_render >= self.interval:
+                self._render_pending()
+        elif kind == "tool_result":
+            self._render_pending()
+            separator = "=" * 60
+            more = "..." if record["output_chars"] > len(record["output"]) else ""
+            self.stream.write(
+                f"\n{separator}\n[{datetime.fromtimestamp(record['ts']).strftime('%H:%M:%S')}] "
+                f"{record['agent']} - TOOL EXECUTION\n{separator}\n"
+                f"🛠 Tool: {record['tool']}\n📥 Input: {record['input']}\n"
+                f"📤 Output: {record['output']}{more}\n{separator}\n"
+            )
+            self.stream.flush()
+
+    async def aclose(self) -> None:
+        self._render_pending()
+
+
+class EventRecorder:
+    """
+    Converts workflow events once and fans the records out to sinks.
+
+    Every record gets the schema version, a timestamp, a per-recorder
+    sequence number and the session id. Tool events carry no agent name, so
+    they are attributed to the last agent that produced an LLM event.
+
+    Usage:
+        recorder = EventRecorder([JsonlEventSink("run.jsonl"), ConsoleRenderer()])
+        async for ev in handler.stream_events():
+            recorder.emit(ev)
+        await recorder.aclose()
+    """
+
+    def __init__(self, sinks: list, session_id: Optional[str] = None):
+        self.sinks = sinks
+        self.session_id = session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.seq = 0
+        self.agent: Optional[str] = None
+
+    def log(self, kind: str, **fields: Any) -> None:
+        """Emits a record that does not come from a workflow event (session start, result...)."""
+        self._dispatch(dict(fields, type=kind))
+
+    def emit(self, ev: Any) -> None:
+        record = event_record(ev, self.agent)
+        if record is None:
+            return
+        if record["type"] in ("llm_input", "llm_output", "delta"):
+            self.agent = record["agent"]
+        self._dispatch(record)
+
+    def _dispatch(self, record: dict) -> None:
+        self.seq += 1
+        record = {"v": EVENT_SCHEMA_VERSION, "ts": time.time(), "seq": self.seq,
+                  "session": self.session_id, **record}
+        for sink in self.sinks:
+            sink.emit(record)
+
+    async def aclose(self) -> None:
+        for sink in self.sinks:
+            await sink.aclose()
+
+
+def load_events(path: str) -> Iterator[dict]:
+    """Reads records back from a JSONL event log, skipping newer schema versions."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record.get("v", 0) <= EVENT_SCHEMA_VERSION:
+                    yield record
+
+
+def summarize_events(records) -> dict:
+    """
+    Replays an event log into per-session metrics.
+
+    Returns:
+        dict: Session id -> duration, LLM calls, static (prompt prefix) and
+            dynamic input tokens, tool calls per tool, handoffs, streamed
+            characters and tool output characters.
+    """
+    sessions: dict[str, dict] = {}
+    for record in records:
+        session = sessions.setdefault(record["session"], {
+            "first_ts": record["ts"], "last_ts": record["ts"], "llm_calls": 0, "tool_calls": 0,
+            "handoffs": 0, "tools": {}, "streamed_chars": 0, "tool_output_chars": 0, "tool_errors": 0,
+            "static_tokens": 0, "dynamic_tokens": 0,
+        })
+        session["last_ts"] = max(session["last_ts"], record["ts"])
+        kind = record["type"]
+        if kind == "llm_input":
+            session["llm_calls"] += 1
+            session["static_tokens"] += record.get("static_tokens", 0)
+            session["dynamic_tokens"] += record.get("dynamic_tokens", 0)
+        elif kind == "delta":
+            session["streamed_chars"] += len(record["text"])
+        elif kind == "tool_call":
+            session["tool_calls"] += 1
+            session["handoffs"] += record["tool"] == "handoff"
+            session["tools"][record["tool"]] = session["tools"].get(record["tool"], 0) + 1
+        elif kind == "tool_result":
+            session["tool_output_chars"] += record["output_chars"]
+            session["tool_errors"] += record["error"]
+    for session in sessions.values():
+        session["duration_seconds"] = session.pop("last_ts") - session.pop("first_ts")
+    return sessions
@@ -0,0 +1,150 @@
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+
+# Sub-agents running at once for one fan-out call, and subtasks per call
+FANOUT_CONCURRENCY = 4
+MAX_SUBTASKS = 8
+# Agents a fan-out may run; each gets its own single-agent workflow
+FANOUT_AGENTS = ("product_hunter_agent", "product_investigator_agent")
+
+
+class FanOut:
+    """
+    Runs independent subtasks of one request on isolated sub-agents at once.
+
+    Each subtask gets a fresh `Context` on a single-agent workflow (no
+    handoffs, no shared chat history), so "CPU", "GPU" and "RAM" searches
+    do not wait for each other. At most `concurrency` run at a time, and
+    every sub-run is governed by the parent run's limits while charging its
+    calls to the parent's counters and ending by the parent's deadline, so a
+    fan-out cannot spend more than the turn it belongs to. Sub-run events go
+    to the turn's `on_event` hook (see `use_fanout`). A multi-part request
+    then takes about as long as its slowest part instead of the sum of all
+    parts.
+    """
+
+    def __init__(self, workflows: dict[str, Any], concurrency: int = FANOUT_CONCURRENCY):
+        """
+        Args:
+            workflows (dict): Agent name -> a single-agent AgentWorkflow.
+            concurrency (int): Sub-runs in flight at once.
+        """
+        self.workflows = workflows
+        self.concurrency = concurrency
+        self.counters = {"fanouts": 0, "subtasks": 0, "failed": 0, "stopped": 0}
+
+    async def run_one(self, agent: str, subtask: str, request: str) -> str:
+        from llama_index.core.workflow import Context
+        from src.agents.budget import BudgetGovernor, current_budget
+        from src.agents.tracing import get_tracer
+        from src.tools.dedupe import reset_seen
+        from src.tools.ranking import set_focus
+
+        workflow = self.workflows[agent]
+        prompt = subtask if not request else (
+            f"{subtask}\n\n(This is one part of a larger request, handle only this part. "
+            f"The full request was: {request})"
+        )
+        # The sub-run ranks and deduplicates its pages on its own
+        focus = set_focus(subtask)
+        reset_seen()
+        parent = current_budget()
+        governor = parent.child() if parent is not None else BudgetGovernor()
+        on_event = _on_event.get()
+        tracer = get_tracer()
+        with tracer.span("fanout", agent, subtask=subtask[:80]):
+            # The sub-run's LLM calls and tool spans are its own, not the parent's
+            tracer.begin_run()
+            handler = workflow.run(user_msg=prompt, ctx=Context(workflow))
+            try:
+                async for ev in governor.stream(handler):
+                    tracer.observe(ev)
+                    focus.observe(ev)
+                    # Concurrent sub-runs would interleave their token deltas
+                    # into one text; their llm_output events carry it whole
+                    if on_event is not None and type(ev).__name__ != "AgentStream":
+                        on_event(ev)
+                response = await governor.result(handler)
+            except asyncio.CancelledError:
+                await handler.cancel_run()
+                raise
+        if governor.stopped_reason is not None:
+            self.counters["stopped"] += 1
+        return str(response)
+
+    async def run(self, subtasks: list[str], agent: str, request: str = "") -> list:
+        """
+        Runs every subtask on its own `agent` sub-run, `concurrency` at a time.
+
+        Returns:
+            list: Each subtask's answer, or the exception it raised, in order.
+        """
+        from src.tools.batch import gather_bounded
+
+        self.counters["fanouts"] += 1
+        self.counters["subtasks"] += len(subtasks)
+        results = await gather_bounded(subtasks, lambda subtask: self.run_one(agent, subtask, request),
+                                       limit=self.concurrency)
+        self.counters["failed"] += sum(isinstance(result, Exception) for result in results)
+        return results
+
+
+# Set per workflow run by ShoppingAgent.run_turn, read by the tool below
+_fanout: ContextVar[Optional[FanOut]] = ContextVar("fanout", default=None)
+_on_event: ContextVar[Optional[Callable[[Any], Any]]] = ContextVar("fanout_on_event", default=None)
+
+
+def use_fanout(fanout: FanOut, on_event: Optional[Callable[[Any], Any]] = None) -> None:
+    """Makes `fanout` available to this run's tool calls; its sub-run events go to `on_event`."""
+    _fanout.set(fanout)
+    _on_event.set(on_event)
+
+
+async def parallel_product_hunt(subtasks: list[str], agent: str = "product_hunter_agent") -> str:
+    """
+    Hands several independent parts of the request to separate agents that work at the same time.
+
+    Args:
+        subtasks (list[str]): Self-contained tasks, one per part, each with
+            its own constraints, e.g. ["AM5 CPU for 1080p gaming, about
+            10k EGP, in stock in Egypt", "16GB DDR5 RAM kit, about 3k EGP"].
+        agent (str): "product_hunter_agent" to find products to buy, or
+            "product_investigator_agent" to check given products.
+
+    Returns:
+        str: Every part's answer under its own heading, in the order given.
+    """
+    from src.tools.ranking import get_focus
+
+    fanout = _fanout.get()
+    if fanout is None:
+        return "Parallel hunting is not available here, hand off to product_hunter_agent instead."
+    if agent not in fanout.workflows:
+        return f"Unknown agent {agent!r}, use one of: {', '.join(fanout.workflows)}."
+    subtasks = list(dict.fromkeys(subtask.strip() for subtask in subtasks if subtask and subtask.strip()))
+    if not subtasks:
+        return "No subtasks given."
+    dropped = subtasks[MAX_SUBTASKS:]
+    subtasks = subtasks[:MAX_SUBTASKS]
+
+    focus = get_focus()
+    results = await fanout.run(subtasks, agent, request=focus.query if focus is not None else "")
+    sections = []
+    for index, (subtask, result) in enumerate(zip(subtasks, results), 1):
+        if isinstance(result, Exception):
+            result = f"This part failed: {result}"
+        sections.append(f"## Part {index}: {subtask}\n\n{result}")
+    if dropped:
+        sections.append(f"(Only the first {MAX_SUBTASKS} parts were run; still to do: {'; '.join(dropped)})")
+    return "\n\n---\n\n".join(sections)
+
+
+def __getattr__(name):
+    # The LlamaIndex tool is built lazily, importing this module stays cheap
+    if name == "parallel_product_hunt_tool":
+        from src.tools.registry import get_tool
+
+        return get_tool("parallel_product_hunt")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,218 @@
+import re
+import inspect
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Optional
+
+from src.agents.budget import CHARS_PER_TOKEN
+
+
+# Estimated tokens of history sent with each turn (summary + recent turns)
+MEMORY_TOKEN_BUDGET = 2000
+# Turns always kept verbatim, even over budget
+MIN_RECENT_TURNS = 2
+# Cap on the rolling summary; its oldest lines are dropped past this
+SUMMARY_TOKEN_BUDGET = 400
+# Characters of each side of a turn kept by the extractive summarizer
+SUMMARY_LINE_CHARS = 160
+
+LOCATION_PATTERN = re.compile(r"\b(?:live in|living in|located in|based in|ship to|deliver to)\s+"
+                              r"([A-Z][a-z]+(?:\s[A-Z][a-z]+)?)")
+NOT_LOCATIONS = {"I", "EGP", "USD", "English", "Arabic"}
+# A bare "in X" / "from X" ("from Amazon", "in Stock") only pins a place it names
+KNOWN_PLACES = (
+    "Egypt", "Cairo", "Giza", "Alexandria", "Mansoura", "Tanta", "Zagazig", "Ismailia", "Port Said", "Suez",
+    "Hurghada", "Sharm El Sheikh", "Luxor", "Aswan", "Assiut", "Minya", "Sohag", "Damietta", "New Cairo",
+    "Saudi Arabia", "Riyadh", "Jeddah", "Dammam", "UAE", "Dubai", "Abu Dhabi", "Sharjah", "Kuwait", "Qatar",
+    "Doha", "Bahrain", "Oman", "Muscat", "Jordan", "Amman", "Lebanon", "Beirut", "Morocco", "Tunisia",
+    "Algeria", "Iraq", "Libya", "Sudan", "Turkey", "USA", "UK", "Germany", "France", "Canada",
+)
+PLACE_PATTERN = re.compile(r"\b(?:in|from)\s+(" + "|".join(re.escape(place) for place in KNOWN_PLACES) + r")\b")
+CHOICE_PATTERN = re.compile(
+    r"\bi(?:'ll| will)?\s+(?:take|go with|choose|pick|order)\s+(?:the\s+)?([^.,!?\n]{3,80})"
+    r"|\bi\s+(?:chose|picked|ordered|bought)\s+(?:the\s+)?([^.,!?\n]{3,80})",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def extract_facts(text: str) -> dict:
+    """
+    Pulls shopping facts out of a user message.
+
+    The budget is read by the same parser filter_by_budget uses
+    (src/tools/prices.py), from messages that name a currency.
+
+    Returns:
+        dict: Any of "budget" (float, the target amount), "currency",
+            "budget_range" (the bounds filter_by_budget enforces),
+            "location" and "chosen_products" (list) that the message states.
+    """
+    # Imported here, the price tools load numpy
+    from src.tools.prices import CURRENCY_PATTERN, parse_budget
+
+    facts: dict[str, Any] = {}
+    bounds = parse_budget(text) if CURRENCY_PATTERN.search(text) else None
+    if bounds is not None:
+        low, high, target, currency = bounds
+        facts["budget"] = round(target, 2)
+        facts["currency"] = currency
+        facts["budget_range"] = f"{low:g}-{high:g} {currency}"
+    locations = [(match.start(), match.group(1)) for match in LOCATION_PATTERN.finditer(text)
+                 if match.group(1) not in NOT_LOCATIONS]
+    locations += [(match.start(), match.group(1)) for match in PLACE_PATTERN.finditer(text)]
+    if locations:
+        facts["location"] = max(locations)[1]
+    choices = [(a or b).strip() for a, b in CHOICE_PATTERN.findall(text)]
+    if choices:
+        facts["chosen_products"] = choices
+    return facts
+
+
+def extractive_summary(summary: str, user: str, assistant: str) -> str:
+    """Default summarizer: one line per folded turn, no LLM call."""
+    def clip(text):
+        text = " ".join(text.split())
+        return text if len(text) <= SUMMARY_LINE_CHARS else text[:SUMMARY_LINE_CHARS] + "..."
+
+    line = f"- User asked: {clip(user)} | Assistant answered: {clip(assistant)}"
+    return f"{summary}\n{line}" if summary else line
+
+
+def llm_summarizer(llm) -> Callable:
+    """Builds a summarizer that asks `llm` to fold a turn into the summary (one extra call per fold)."""
+    async def summarize(summary: str, user: str, assistant: str) -> str:
+        prompt = (
+            "Update the running summary of a shopping conversation with the new turn. "
+            f"Keep it under {int(SUMMARY_TOKEN_BUDGET * 0.75)} words and keep every "
+            "product, price, store and link the user may refer back to.\n\n"
+            f"Summary so far:\n{summary or '(empty)'}\n\nUser: {user}\n\nAssistant: {assistant}\n\nUpdated summary:"
+        )
+        return str(await llm.acomplete(prompt)).strip()
+
+    return summarize
+
+
+@dataclass
+class Turn:
+    user: str
+    assistant: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.user) + estimate_tokens(self.assistant)
+
+
+@dataclass
+class ConversationMemory:
+    """
+    Token-bounded chat memory for one conversation.
+
+    The most recent turns are kept verbatim. Once they exceed
+    `token_budget`, the oldest ones are folded into a rolling summary by
+    `summarizer` (extractive by default, see `llm_summarizer`). Facts the
+    user states (budget, currency, location, chosen products) are pinned and
+    sent with every turn however old they are, so each turn costs about the
+    same however long the conversation gets.
+    """
+
+    token_budget: int = MEMORY_TOKEN_BUDGET
+    min_recent_turns: int = MIN_RECENT_TURNS
+    summary_token_budget: int = SUMMARY_TOKEN_BUDGET
+    summarizer: Optional[Callable] = field(default=None, repr=False)
+    summary: str = ""
+    facts: dict = field(default_factory=dict)
+    turns: deque = field(default_factory=deque)
+    folded_turns: int = 0
+
+    def remember_facts(self, text: str) -> None:
+        for name, value in extract_facts(text).items():
+            if name == "chosen_products":
+                chosen = self.facts.setdefault(name, [])
+                chosen.extend(product for product in value if product not in chosen)
+            else:
+                self.facts[name] = value
+
+    def tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(turn.tokens for turn in self.turns)
+
+    async def add_turn(self, user: str, assistant: str) -> None:
+        """Records a finished turn and folds old turns into the summary while over budget."""
+        self.remember_facts(user)
+        self.turns.append(Turn(user, assistant))
+        summarizer = self.summarizer or extractive_summary
+        while len(self.turns) > self.min_recent_turns and self.tokens() > self.token_budget:
+            turn = self.turns.popleft()
+            summary = summarizer(self.summary, turn.user, turn.assistant)
+            self.summary = await summary if inspect.isawaitable(summary) else summary
+            self.folded_turns += 1
+        # Keep the summary itself bounded by dropping its oldest lines
+        while estimate_tokens(self.summary) > self.summary_token_budget and "\n" in self.summary:
+            self.summary = self.summary.split("\n", 1)[1]
+
+    def context_text(self) -> str:
+        """The summary and pinned facts as one block, empty when there are none."""
+        parts = []
+        if self.facts:
+            facts = "; ".join(
+                f"{name.replace('_', ' ')}: {', '.join(value) if isinstance(value, list) else value}"
+                for name, value in self.facts.items()
+            )
+            parts.append(f"Known facts about the user: {facts}.")
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+        return "\n\n".join(parts)
+
+    def messages(self, prompt: Optional[str] = None) -> list:
+        """
+        The chat history to send with the next turn.
+
+        Args:
+            prompt (str): The new user message; its facts are pinned first
+                so they are already visible on this turn.
+
+        Returns:
+            list[ChatMessage]: A system message with facts and summary (if
+                any), then the recent turns.
+        """
+        from llama_index.core.llms import ChatMessage
+
+        if prompt:
+            self.remember_facts(prompt)
+        history = []
+        context = self.context_text()
+        if context:
+            history.append(ChatMessage(role="system", content=context))
+        for turn in self.turns:
+            history.append(ChatMessage(role="user", content=turn.user))
+            history.append(ChatMessage(role="assistant", content=turn.assistant))
+        return history
+
+    def as_dicts(self) -> list[dict]:
+        """Recent turns as role/content dicts, the old `chat_history` format."""
+        return [
+            message
+            for turn in self.turns
+            for message in ({"role": "user", "content": turn.user},
+                            {"role": "assistant", "content": turn.assistant})
+        ]
+
+    def to_dict(self) -> dict:
+        return {
+            "summary": self.summary,
+            "facts": self.facts,
+            "turns": [asdict(turn) for turn in self.turns],
+            "folded_turns": self.folded_turns,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, **settings: Any) -> "ConversationMemory":
+        memory = cls(**settings)
+        memory.summary = data.get("summary", "")
+        memory.facts = dict(data.get("facts", {}))
+        memory.turns = deque(Turn(**turn) for turn in data.get("turns", []))
+        memory.folded_turns = data.get("folded_turns", 0)
+        return memory
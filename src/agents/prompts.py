@@ -0,0 +1,189 @@
+import os
+import hashlib
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Optional, Sequence
+
+import yaml
+from pydantic import Field
+
+from src.agents.budget import CHARS_PER_TOKEN
+
+
+PROMPTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts.yaml")
+# Set on the system message holding an agent's static prefix: the id of the
+# exact prefix text, so the LLM layer can tell a repeated prefix from a new one
+PREFIX_ID_KEY = "prefix_id"
+PREFIX_TOKENS_KEY = "prefix_tokens"
+# Rendered headers kept per process (agents x tool sets)
+MAX_COMPILED_HEADERS = 256
+
+
+@dataclass(frozen=True)
+class AgentPrompt:
+    """The static part of one agent's configuration in prompts.yaml."""
+
+    key: str
+    name: str
+    description: str
+    system_prompt: str
+    model: Optional[str] = None
+
+
+@lru_cache(maxsize=8)
+def load_prompts(path: str = PROMPTS_PATH) -> MappingProxyType:
+    """
+    Parses prompts.yaml once per process.
+
+    Returns:
+        MappingProxyType: Agent key -> AgentPrompt, for every entry with a
+            system prompt (read-only).
+    """
+    with open(path, encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    return MappingProxyType({
+        key: AgentPrompt(key=key, name=entry["name"], description=entry["description"],
+                         system_prompt=entry["system_prompt"], model=entry.get("model"))
+        for key, entry in config.items()
+        if isinstance(entry, dict) and "system_prompt" in entry
+    })
+
+
+# (name, description, argument names) -> rendered description
+_tool_descriptions: dict[tuple, str] = {}
+
+
+def tool_descriptions(tools: Sequence[Any]) -> list[str]:
+    """
+    The ReAct descriptions of `tools`, each rendered once per process.
+
+    Rendering dumps the tool's pydantic JSON schema, which is slow to redo on
+    every step; the handoff tool is even rebuilt (with a new schema class)
+    for every step, so tools are keyed by name, description and argument names.
+    """
+    descriptions = []
+    for tool in tools:
+        metadata = tool.metadata
+        key = (metadata.name, metadata.description, tuple(getattr(metadata.fn_schema, "model_fields", ())))
+        description = _tool_descriptions.get(key)
+        if description is None:
+            description = _tool_descriptions[key] = (
+                f"> Tool Name: {metadata.name}\n"
+                f"Tool Description: {metadata.description}\n"
+                f"Tool Args: {metadata.fn_schema_str}\n"
+            )
+        descriptions.append(description)
+    return descriptions
+
+
+@dataclass(frozen=True)
+class CompiledHeader:
+    """An agent's rendered system header for one set of tools, and its prefix id."""
+
+    text: str
+    prefix_id: str
+    tokens: int
+
+
+@lru_cache(maxsize=MAX_COMPILED_HEADERS)
+def compile_header(system_header: str, context: str, tools_key: tuple, descriptions: tuple) -> CompiledHeader:
+    format_args = {"tool_desc": "\n".join(descriptions), "tool_names": ", ".join(name for name, _ in tools_key)}
+    if context:
+        format_args["context"] = context
+    text = system_header.format(**format_args)
+    return CompiledHeader(text=text, prefix_id=hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest(),
+                          tokens=len(text) // CHARS_PER_TOKEN)
+
+
+class PromptStats:
+    """Static (prefix) and dynamic (history, reasoning) tokens of every formatted LLM input, per agent."""
+
+    def __init__(self):
+        self.agents: dict[str, dict] = {}
+
+    def record(self, agent: str, static_tokens: int, dynamic_tokens: int) -> None:
+        counters = self.agents.setdefault(agent, {"calls": 0, "static_tokens": 0, "dynamic_tokens": 0})
+        counters["calls"] += 1
+        counters["static_tokens"] += static_tokens
+        counters["dynamic_tokens"] += dynamic_tokens
+
+    def snapshot(self) -> dict:
+        return {
+            agent: dict(counters, static_share=round(
+                counters["static_tokens"] / max(1, counters["static_tokens"] + counters["dynamic_tokens"]), 3))
+            for agent, counters in self.agents.items()
+        }
+
+
+_prompt_stats: Optional[PromptStats] = None
+
+
+def get_prompt_stats() -> PromptStats:
+    """Returns the process-wide prompt token counters."""
+    global _prompt_stats
+    if _prompt_stats is None:
+        _prompt_stats = PromptStats()
+    return _prompt_stats
+
+
+def message_tokens(message: Any) -> int:
+    return len(str(message.content or "")) // CHARS_PER_TOKEN
+
+
+def split_tokens(messages: Sequence[Any]) -> tuple[int, int]:
+    """
+    Static and dynamic tokens of an LLM input.
+
+    Returns:
+        tuple: (tokens of the marked prefix message, tokens of everything else).
+    """
+    static = dynamic = 0
+    for message in messages:
+        tokens = message_tokens(message)
+        if PREFIX_ID_KEY in (message.additional_kwargs or {}):
+            static += tokens
+        else:
+            dynamic += tokens
+    return static, dynamic
+
+
+@lru_cache(maxsize=1)
+def _formatter_class():
+    from llama_index.core.agent.react.formatter import ReActChatFormatter
+    from llama_index.core.agent.react.types import ObservationReasoningStep
+    from llama_index.core.base.llms.types import ChatMessage, MessageRole
+
+    class CompiledReActFormatter(ReActChatFormatter):
+        """
+        ReAct formatter whose system header is rendered once per tool set.
+
+        The stock formatter re-renders the header, with every tool's JSON
+        schema, on every reasoning step. This one reuses the compiled header
+        byte for byte and marks it as the call's static prefix.
+        """
+
+        agent: str = Field(default="", description="Agent name the token counts are recorded under.")
+
+        def format(self, tools, chat_history, current_reasoning=None):
+            tools_key = tuple((tool.metadata.name, tool.metadata.description) for tool in tools)
+            header = compile_header(self.system_header, self.context, tools_key, tuple(tool_descriptions(tools)))
+            messages = [ChatMessage(role=MessageRole.SYSTEM, content=header.text,
+                                    additional_kwargs={PREFIX_ID_KEY: header.prefix_id,
+                                                       PREFIX_TOKENS_KEY: header.tokens})]
+            messages.extend(chat_history)
+            for step in current_reasoning or []:
+                role = self.observation_role if isinstance(step, ObservationReasoningStep) else MessageRole.ASSISTANT
+                messages.append(ChatMessage(role=role, content=step.get_content()))
+            get_prompt_stats().record(self.agent, header.tokens,
+                                      sum(message_tokens(message) for message in messages[1:]))
+            return messages
+
+    return CompiledReActFormatter
+
+
+def compiled_formatter(prompt: AgentPrompt):
+    """A ReAct formatter for `prompt` that reuses its compiled header (see CompiledReActFormatter)."""
+    formatter = _formatter_class().from_defaults(context=prompt.system_prompt)
+    formatter.agent = prompt.name
+    return formatter
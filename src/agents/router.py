@@ -0,0 +1,167 @@
+import re
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+
+MANAGER_AGENT = "manager_agent"
+# Request kind -> the agent that starts the workflow for it
+ROUTES = {
+    "product_hunt": "product_hunter_agent",
+    "research": "shopping_researcher_agent",
+    "lookup": "trivial_search_agent",
+}
+# Below these the request goes to the manager as before
+ROUTER_MIN_SCORE = 3
+ROUTER_MIN_CONFIDENCE = 0.6
+
+# (pattern, {kind: weight}); every matching rule adds its weights once
+RULES = [
+    # Shopping intent and budgets say "not a lookup", not which kind of shopping
+    (r"\b(i want|i need|i'm looking for|looking for|buy|purchase|order|get me|find me|shop for)\b"
+     r"|عايز|أريد|اريد|محتاج", {"product_hunt": 1, "research": 1}),
+    (r"\b(under|below|less than|max(imum)?|budget|around|about|range of|up to)\b[^.?!]*\d"
+     r"|\d[\d,.]*\s*k?\s*(egp|le|usd|eur|\$|€)|[$€]\s*\d|في حدود|جنيه", {"product_hunt": 1, "research": 1}),
+    # One product with constraints: the hunter goes straight to stores
+    (r"\b(cheapest|best (value|price|deal)|in stock|where (can i|to) buy|link to buy|deal on)\b",
+     {"product_hunt": 2}),
+    # Systems of several parts, or choosing between options, need planning first
+    # ("system", "kit" and "parts" alone also name single products: "air
+    # conditioner system", "keyboard and mouse kit")
+    (r"\b(build|pc build|setup|set up|bundle|components|shopping list"
+     r"|(pc|computer|gaming|complete|full|whole|entire|home theat(er|re)|sound|surround|streaming|starter)"
+     r" (system|kit|parts)|(pc|computer) parts|all the parts)\b|تجميعة",
+     {"research": 3}),
+    (r"\b(compare|comparison|vs\.?|versus|difference between|which (one )?is better|pros and cons|compatib\w*)\b",
+     {"research": 3}),
+    # Questions about what people say or about a known product
+    (r"^\s*(what|who|when|how|is|are|does|do|can|which|why)\b[^\n]*\?\s*$", {"lookup": 2}),
+    (r"\b(what is|what's|release date|specs|specifications|reviews?|reddit|youtube|worth it|opinions?|prebuilt|pre-built)\b",
+     {"lookup": 2}),
+]
+
+
+# Two products sold as one ("keyboard and mouse kit") count as one category
+COMBO_PATTERN = re.compile(r"\b\w+ (and|&|\+) \w+ (kit|combo|set|bundle)\b", re.IGNORECASE)
+
+
+@dataclass
+class Route:
+    """Where a request starts: `agent` is None when the manager should decide."""
+
+    agent: Optional[str]
+    kind: Optional[str]
+    confidence: float
+    scores: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {"agent": self.agent, "kind": self.kind, "confidence": round(self.confidence, 2),
+                "scores": self.scores}
+
+
+class RuleRouter:
+    """
+    Classifies a request with weighted regex rules, no LLM call.
+
+    Each kind's score is the sum of the weights of the rules that match;
+    one product category in the request (or two sold as one kit) adds to
+    "product_hunt", several add to "research". The confidence is the winner's share of all scores, and
+    the request is only routed when the winner scores at least `min_score`
+    with at least `min_confidence`.
+
+    Any object with a `route(prompt) -> Route` method can replace it (see
+    `ShoppingAgent(router=...)`).
+    """
+
+    def __init__(self, rules: list = RULES, routes: dict = ROUTES,
+                 min_score: float = ROUTER_MIN_SCORE, min_confidence: float = ROUTER_MIN_CONFIDENCE):
+        self.rules = [(re.compile(pattern, re.IGNORECASE | re.MULTILINE), weights) for pattern, weights in rules]
+        self.routes = routes
+        self.min_score = min_score
+        self.min_confidence = min_confidence
+
+    def scores(self, prompt: str) -> Counter:
+        from src.tools.catalog import CATEGORY_KEYWORDS
+
+        scores: Counter = Counter({kind: 0 for kind in self.routes})
+        for pattern, weights in self.rules:
+            if pattern.search(prompt):
+                scores.update(weights)
+        text = prompt.lower()
+        categories = {
+            category for category, keywords in CATEGORY_KEYWORDS
+            if any(re.search(rf"\b{re.escape(keyword)}", text) for keyword in keywords)
+        }
+        if len(categories) == 1 or (len(categories) == 2 and COMBO_PATTERN.search(prompt)):
+            scores["product_hunt"] += 2
+        elif len(categories) > 1:
+            scores["research"] += 3
+        return scores
+
+    def route(self, prompt: str) -> Route:
+        scores = self.scores(prompt)
+        kind, top = scores.most_common(1)[0]
+        total = sum(scores.values())
+        confidence = top / total if total else 0.0
+        if top < self.min_score or confidence < self.min_confidence:
+            return Route(None, None, confidence, dict(scores))
+        return Route(self.routes[kind], kind, confidence, dict(scores))
+
+
+class RouterStats:
+    """
+    Hit rate of the router, and the manager round trips it saved.
+
+    A turn the router sends to the manager is timed until the manager hands
+    off (`watch`); each routed turn is credited with the average of those.
+    """
+
+    def __init__(self, samples: int = 100):
+        self.decisions = 0
+        self.routed: Counter = Counter()
+        self.router_seconds = 0.0
+        self.manager_seconds: deque = deque(maxlen=samples)
+
+    def record(self, route: Route, seconds: float) -> None:
+        self.decisions += 1
+        self.router_seconds += seconds
+        if route.agent is not None:
+            self.routed[route.agent] += 1
+
+    def watch(self) -> "ManagerTimer":
+        return ManagerTimer(self)
+
+    def snapshot(self) -> dict:
+        routed = sum(self.routed.values())
+        manager = (sum(self.manager_seconds) / len(self.manager_seconds)) if self.manager_seconds else None
+        return {
+            "decisions": self.decisions,
+            "routed": routed,
+            "fallbacks": self.decisions - routed,
+            "hit_rate": round(routed / self.decisions, 3) if self.decisions else None,
+            "by_agent": dict(self.routed),
+            "router_ms_avg": round(1000 * self.router_seconds / self.decisions, 3) if self.decisions else None,
+            "manager_handoff_seconds_avg": round(manager, 3) if manager is not None else None,
+            "estimated_seconds_saved": round(routed * manager, 3) if manager is not None else None,
+        }
+
+
+class ManagerTimer:
+    """Follows one turn's events and records how long the manager took to hand off."""
+
+    def __init__(self, stats: RouterStats):
+        self.stats = stats
+        self.started = time.perf_counter()
+        self.in_manager = False
+        self.done = False
+
+    def observe(self, ev: Any) -> None:
+        if self.done or type(ev).__name__ != "AgentInput":
+            return
+        if ev.current_agent_name == MANAGER_AGENT:
+            self.in_manager = True
+            return
+        if self.in_manager:
+            self.stats.manager_seconds.append(time.perf_counter() - self.started)
+        self.done = True
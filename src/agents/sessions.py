@@ -0,0 +1,316 @@
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+
+# Defaults for one worker process
+MAX_SESSIONS = 1000
+MAX_CONCURRENT_RUNS = 32
+SESSION_IDLE_TTL = 30 * 60  # seconds
+REAP_INTERVAL = 60  # seconds
+
+
+class SessionLimitError(RuntimeError):
+    """Raised when a new session is needed but every slot holds a busy session."""
+
+
+@dataclass
+class Session:
+    """One conversation: its own workflow Context and memory, nothing else."""
+
+    id: str
+    ctx: Any
+    memory: Any
+    created: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    turns: int = 0
+    handler: Any = None
+    last_route: Any = None
+    # References to the tool results of the conversation (src/agents/snapshots.py)
+    tool_refs: list = field(default_factory=list)
+    # Snapshot version the session was last saved or restored at
+    version: Optional[int] = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+
+class SessionManager:
+    """
+    Serves many concurrent conversations from one built ShoppingAgent.
+
+    The agents, the workflow definition, the tools and the LLM client are
+    built once and shared; each session only owns a `Context` and its
+    ConversationMemory. A session runs one turn at a time (its lock), and
+    every turn waits for one of `max_concurrent_runs` slots. asyncio's semaphore wakes
+    waiters in FIFO order and a session never holds more than one slot, so
+    turns from different sessions are scheduled round-robin and one chatty
+    user cannot starve the others.
+
+    Sessions idle for longer than `idle_ttl` are evicted, and when
+    `max_sessions` is reached the least recently used idle session makes room.
+    With a `store`, every turn ends with a snapshot of the session (a delta
+    against the previous one), and a session that is not in memory (evicted,
+    or saved by another worker) is restored from it on its next request, so
+    its research is not redone. A session in memory is reloaded when the
+    store holds a newer version of it (another worker ran a turn), and a
+    turn whose snapshot would overwrite such a version is not saved: the
+    session is dropped so its next request loads the newer one. Store calls
+    run in a worker thread, off the event loop.
+
+    Usage:
+        manager = SessionManager(ShoppingAgent())
+        session_id = manager.create()
+        resp = await manager.query(session_id, "A wired gaming headset under 1000 EGP")
+    """
+
+    def __init__(
+        self,
+        agent: Any,
+        max_sessions: int = MAX_SESSIONS,
+        max_concurrent_runs: int = MAX_CONCURRENT_RUNS,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        store: Any = None,
+    ):
+        """
+        Args:
+            agent (ShoppingAgent): The shared agent; built on first use.
+            max_sessions (int): Sessions kept in memory at once.
+            max_concurrent_runs (int): Turns running at the same time.
+            idle_ttl (float): Seconds without a turn before a session is evicted.
+            store (SessionStore): Where sessions are snapshotted after each
+                turn and restored from, none by default.
+        """
+        self.agent = agent
+        self.max_sessions = max_sessions
+        self.max_concurrent_runs = max_concurrent_runs
+        self.idle_ttl = idle_ttl
+        self.store = store
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.slots = asyncio.Semaphore(max_concurrent_runs)
+        self.stats = {"created": 0, "evicted": 0, "turns": 0, "running": 0, "waiting": 0,
+                      "restored": 0, "restore_seconds": 0.0, "conflicts": 0}
+        self._reaper: Optional[asyncio.Task] = None
+
+    # Session lifecycle
+
+    def create(self, session_id: Optional[str] = None) -> str:
+        """
+        Opens a session, evicting idle ones if the manager is full.
+
+        Args:
+            session_id (str): The id to use, a random one by default.
+
+        Returns:
+            str: The session id.
+        """
+        from llama_index.core.workflow import Context
+        from src.agents.memory import ConversationMemory
+
+        self.evict_idle()
+        if len(self.sessions) >= self.max_sessions:
+            self._evict_lru()
+        session_id = session_id or uuid.uuid4().hex
+        workflow = self.agent.build()
+        self.sessions[session_id] = Session(id=session_id, ctx=Context(workflow), memory=ConversationMemory())
+        self.stats["created"] += 1
+        return session_id
+
+    async def aget(self, session_id: str, create: bool = True) -> Session:
+        """
+        Returns a session, restoring it from the store when it is not in memory.
+
+        A session found nowhere is opened when `create` is set.
+        """
+        session = self.sessions.get(session_id)
+        if session is not None and await self._outdated(session) and self.sessions.get(session_id) is session:
+            del self.sessions[session_id]
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = await self._arestore(session_id)
+        if session is None:
+            if not create:
+                raise KeyError(f"Unknown session {session_id!r}")
+            self.create(session_id)
+            session = self.sessions[session_id]
+        self.sessions.move_to_end(session_id)
+        return session
+
+    async def close(self, session_id: str) -> None:
+        if self.sessions.pop(session_id, None) is not None:
+            self._ended(session_id)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.delete, session_id)
+
+    def _ended(self, session_id: str) -> None:
+        # Pages still being prefetched for the session are no longer wanted
+        from src.tools.prefetch import get_prefetcher
+
+        get_prefetcher().cancel(session_id)
+        if self.store is not None:
+            self.store.forget(session_id)
+
+    # Snapshots
+
+    def _state(self, session: Session) -> dict:
+        return {
+            "ctx": session.ctx.to_dict(),
+            "memory": session.memory.to_dict(),
+            "turns": session.turns,
+            "tool_refs": session.tool_refs,
+        }
+
+    async def _outdated(self, session: Session) -> bool:
+        """True when the store holds a newer version of an idle session (saved by another worker)."""
+        if self.store is None or session.busy:
+            return False
+        # SQLite calls block, keep them off the event loop
+        version = await asyncio.to_thread(self.store.version, session.id)
+        return version is not None and version != session.version and not session.busy
+
+    async def _arestore(self, session_id: str) -> Optional[Session]:
+        from llama_index.core.workflow import Context
+        from src.agents.memory import ConversationMemory
+
+        if self.store is None:
+            return None
+        started = time.perf_counter()
+        state = await asyncio.to_thread(self.store.load, session_id)
+        if state is None:
+            return None
+        # Another request may have restored or opened the session meanwhile
+        if session_id in self.sessions:
+            return self.sessions[session_id]
+        self.evict_idle()
+        if len(self.sessions) >= self.max_sessions:
+            self._evict_lru()
+        workflow = self.agent.build()
+        # The workflow's chat memory is not part of the snapshot: each turn
+        # sets it from the ConversationMemory (see ShoppingAgent.run_turn)
+        session = self.sessions[session_id] = Session(
+            id=session_id,
+            ctx=Context.from_dict(workflow, state["ctx"]),
+            memory=ConversationMemory.from_dict(state["memory"]),
+            turns=state.get("turns", 0),
+            tool_refs=state.get("tool_refs", []),
+            version=self.store.seen(session_id),
+        )
+        self.stats["restored"] += 1
+        self.stats["restore_seconds"] += time.perf_counter() - started
+        return session
+
+    def _record_tool_results(self, session: Session, on_event: Optional[Callable[[Any], None]]) -> Callable:
+        from src.agents.snapshots import MAX_TOOL_REFS, tool_ref
+
+        def observe(ev: Any) -> None:
+            if type(ev).__name__ == "ToolCallResult":
+                session.tool_refs.append(tool_ref(ev))
+                del session.tool_refs[:-MAX_TOOL_REFS]
+            if on_event is not None:
+                on_event(ev)
+
+        return observe
+
+    def _evict_lru(self) -> None:
+        for session_id, session in self.sessions.items():
+            if not session.busy:
+                del self.sessions[session_id]
+                self._ended(session_id)
+                self.stats["evicted"] += 1
+                return
+        raise SessionLimitError(f"All {self.max_sessions} sessions are busy")
+
+    def evict_idle(self) -> int:
+        """Drops sessions idle for longer than `idle_ttl`; returns how many."""
+        deadline = time.monotonic() - self.idle_ttl
+        expired = [
+            session_id for session_id, session in self.sessions.items()
+            if session.last_used < deadline and not session.busy
+        ]
+        for session_id in expired:
+            del self.sessions[session_id]
+            self._ended(session_id)
+        self.stats["evicted"] += len(expired)
+        return len(expired)
+
+    # Turns
+
+    async def query(self, session_id: str, prompt: str, on_event: Optional[Callable[[Any], None]] = None) -> Any:
+        """
+        Runs one turn of a session, waiting for its previous turn and for a free slot.
+
+        Args:
+            session_id (str): The session, created if it does not exist.
+            prompt (str): The user's message.
+            on_event: Called with every workflow event of the turn.
+
+        Returns:
+            The workflow's response for this turn.
+        """
+        session = await self.aget(session_id)
+        async with session.lock:
+            self.stats["waiting"] += 1
+            try:
+                await self.slots.acquire()
+            finally:
+                self.stats["waiting"] -= 1
+            self.stats["running"] += 1
+            try:
+                if self.store is not None:
+                    on_event = self._record_tool_results(session, on_event)
+                resp = await self.agent.run_turn(prompt, session.ctx, session.memory, owner=session,
+                                                 on_event=on_event)
+            finally:
+                self.stats["running"] -= 1
+                self.slots.release()
+                session.last_used = time.monotonic()
+            session.turns += 1
+            self.stats["turns"] += 1
+            if self.store is not None:
+                await self._asave(session)
+            return resp
+
+    async def _asave(self, session: Session) -> None:
+        from src.agents.snapshots import SnapshotConflictError
+
+        try:
+            session.version = await asyncio.to_thread(self.store.save, session.id, self._state(session))
+        except SnapshotConflictError:
+            # Another worker ran a turn of this session meanwhile; its
+            # version wins and is loaded on the session's next request
+            self.stats["conflicts"] += 1
+            if self.sessions.get(session.id) is session:
+                del self.sessions[session.id]
+            self.store.forget(session.id)
+
+    # Background eviction
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+            self.evict_idle()
+            if self.store is not None:
+                await asyncio.to_thread(self.store.prune)
+
+    def start(self) -> None:
+        """Starts evicting idle sessions in the background (call from a running loop)."""
+        if self._reaper is None:
+            self._reaper = asyncio.get_running_loop().create_task(self._reap())
+
+    async def aclose(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for session_id in list(self.sessions):
+            self._ended(session_id)
+        self.sessions.clear()
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, sessions=len(self.sessions),
+                    busy=sum(session.busy for session in self.sessions.values()),
+                    store=self.store.snapshot() if self.store is not None else None)
@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Optional
+
+
+CACHE_DIR = os.getenv("SHOPPING_AGENT_CACHE_DIR", ".cache")
+# Deltas written after a full snapshot before the next full one
+SNAPSHOT_COMPACT_EVERY = 8
+# Snapshots of sessions idle for longer than this are dropped
+SNAPSHOT_TTL = float(os.getenv("SESSION_SNAPSHOT_TTL", 7 * 24 * 60 * 60))
+# Tool results referenced per session (the newest are kept)
+MAX_TOOL_REFS = 100
+
+# Markers inside a delta; plain JSON values replace what was there
+_APPEND = "$append"
+_DELETE = "$delete"
+
+
+def make_delta(old: Any, new: Any) -> Any:
+    """
+    The changes turning `old` into `new`, as a compact nested patch.
+
+    Dicts are diffed key by key (unchanged keys are left out, removed ones
+    become {"$delete": 1}) and a list that only grew becomes
+    {"$append": [new items]}; anything else is replaced whole.
+
+    Returns:
+        The patch for `apply_delta`, or None when nothing changed.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        patch = {}
+        for key, value in new.items():
+            if key not in old:
+                patch[key] = value
+            elif old[key] != value:
+                patch[key] = make_delta(old[key], value)
+        for key in old.keys() - new.keys():
+            patch[key] = {_DELETE: 1}
+        return patch or None
+    if isinstance(old, list) and isinstance(new, list) and len(new) > len(old) and new[:len(old)] == old:
+        return {_APPEND: new[len(old):]}
+    return new
+
+
+def apply_delta(base: Any, patch: Any) -> Any:
+    """Applies a `make_delta` patch to `base` (modified in place when it is a dict)."""
+    if patch is None:
+        return base
+    if isinstance(patch, dict) and _APPEND in patch and isinstance(base, list):
+        return base + patch[_APPEND]
+    if isinstance(patch, dict) and isinstance(base, dict):
+        for key, value in patch.items():
+            if isinstance(value, dict) and _DELETE in value:
+                base.pop(key, None)
+            else:
+                base[key] = apply_delta(base.get(key), value)
+        return base
+    return patch
+
+
+def _pack(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def tool_ref(ev: Any) -> dict:
+    """
+    A reference to a tool result instead of the result itself.
+
+    The pages and searches behind it stay in the page and search caches,
+    and the agents already have the output in their chat history.
+    """
+    output = str(getattr(ev.tool_output, "content", ev.tool_output))
+    return {
+        "tool": ev.tool_name,
+        "kwargs": json.loads(json.dumps(ev.tool_kwargs, default=str)),
+        "chars": len(output),
+        "digest": hashlib.blake2b(output.encode("utf-8"), digest_size=8).hexdigest(),
+    }
+
+
+class SnapshotConflictError(RuntimeError):
+    """Raised when another store wrote a session since this store last saved or loaded it."""
+
+
+class SessionStore:
+    """
+    Local SQLite store of session snapshots: a full snapshot, then one delta per turn.
+
+    `save` writes only what changed since the previous save of the session
+    (kept in memory, so diffing costs no read), and every
+    `compact_every` deltas a new full snapshot replaces the chain. `load`
+    applies the deltas to the latest full snapshot. States are compressed
+    JSON, typically a few KB per session.
+
+    Several stores (workers) may share one file. A session's version is the
+    seq of its newest snapshot: `save` refuses to write on top of a version
+    it has not seen (SnapshotConflictError), and callers holding a session
+    reload it when `version` is newer than theirs.
+    """
+
+    def __init__(self, path: Optional[str] = None, compact_every: int = SNAPSHOT_COMPACT_EVERY,
+                 ttl: float = SNAPSHOT_TTL):
+        self.path = path or os.path.join(CACHE_DIR, "sessions.sqlite")
+        self.compact_every = compact_every
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS snapshots (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                full INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            )
+            """
+        )
+        self.db.commit()
+        self.lock = threading.Lock()
+        # Session id -> (last saved state, its seq, deltas since the full snapshot)
+        self.last: dict[str, tuple[dict, int, int]] = {}
+        self.counters = {"full": 0, "deltas": 0, "bytes_written": 0, "loads": 0, "misses": 0, "conflicts": 0}
+
+    def save(self, session_id: str, state: dict) -> int:
+        """
+        Stores the state of a session, as a delta against its previous save when possible.
+
+        Returns:
+            int: The session's version after the save.
+
+        Raises:
+            SnapshotConflictError: Another store saved the session since this
+                one last saved or loaded it; nothing is written.
+        """
+        previous = self.last.get(session_id)
+        delta = None
+        if previous is not None and previous[2] < self.compact_every:
+            delta = make_delta(previous[0], state)
+            if delta is None:
+                return previous[1]
+        with self.lock:
+            # The write lock is taken before reading the version, so no other
+            # store can write between the check and the insert
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                latest = self.db.execute("SELECT MAX(seq) FROM snapshots WHERE session_id = ?",
+                                         (session_id,)).fetchone()[0]
+                seen = previous[1] if previous is not None else None
+                if latest is not None and latest != seen:
+                    self.counters["conflicts"] += 1
+                    raise SnapshotConflictError(
+                        f"Session {session_id!r} is at version {latest}, this store last saw {seen}")
+                seq = previous[1] + 1 if previous is not None else 0
+                # Without the chain on disk (pruned or deleted) a delta has no base
+                full = delta is None or latest is None
+                data, deltas = (state, 0) if full else (delta, previous[2] + 1)
+                blob = _pack(data)
+                if full:
+                    # A full snapshot makes the older chain useless
+                    self.db.execute("DELETE FROM snapshots WHERE session_id = ?", (session_id,))
+                self.db.execute("INSERT INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                                (session_id, seq, int(full), blob, time.time()))
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                raise
+        # The next delta is computed against a copy, as the caller keeps mutating its state
+        self.last[session_id] = (json.loads(json.dumps(state)), seq, deltas)
+        self.counters["full" if full else "deltas"] += 1
+        self.counters["bytes_written"] += len(blob)
+        return seq
+
+    def seen(self, session_id: str) -> Optional[int]:
+        """The version this store last saved or loaded of the session."""
+        previous = self.last.get(session_id)
+        return previous[1] if previous is not None else None
+
+    def version(self, session_id: str) -> Optional[int]:
+        """The seq of the session's newest snapshot on disk, or None when it has none."""
+        with self.lock:
+            return self.db.execute("SELECT MAX(seq) FROM snapshots WHERE session_id = ?",
+                                   (session_id,)).fetchone()[0]
+
+    def load(self, session_id: str) -> Optional[dict]:
+        """Rebuilds the latest state of a session, or None when it has no snapshot."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT seq, full, data, created FROM snapshots WHERE session_id = ? AND seq >= "
+                "(SELECT MAX(seq) FROM snapshots WHERE session_id = ? AND full = 1) ORDER BY seq",
+                (session_id, session_id),
+            ).fetchall()
+        if not rows or time.time() - rows[-1][3] > self.ttl:
+            self.counters["misses"] += 1
+            return None
+        state = _unpack(rows[0][2])
+        for _, _, data, _ in rows[1:]:
+            state = apply_delta(state, _unpack(data))
+        self.last[session_id] = (json.loads(json.dumps(state)), rows[-1][0], len(rows) - 1)
+        self.counters["loads"] += 1
+        return state
+
+    def delete(self, session_id: str) -> None:
+        self.last.pop(session_id, None)
+        with self.lock:
+            self.db.execute("DELETE FROM snapshots WHERE session_id = ?", (session_id,))
+            self.db.commit()
+
+    def forget(self, session_id: str) -> None:
+        """Drops the in-memory copy of a session's last state; its snapshots stay on disk."""
+        self.last.pop(session_id, None)
+
+    def prune(self) -> int:
+        """Deletes the snapshots of sessions idle for longer than `ttl`; returns how many sessions."""
+        deadline = time.time() - self.ttl
+        with self.lock:
+            expired = [row[0] for row in self.db.execute(
+                "SELECT session_id FROM snapshots GROUP BY session_id HAVING MAX(created) < ?", (deadline,),
+            )]
+            self.db.executemany("DELETE FROM snapshots WHERE session_id = ?", [(sid,) for sid in expired])
+            self.db.commit()
+        for session_id in expired:
+            self.last.pop(session_id, None)
+        return len(expired)
+
+    def snapshot(self) -> dict:
+        return dict(self.counters, cached=len(self.last))
@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import bisect
+import weakref
+import functools
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Optional
+
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Finished spans kept for export; older ones only live on in the histograms
+MAX_SPANS = 10_000
+
+_DISABLED = nullcontext()
+
+
+@dataclass
+class Span:
+    kind: str  # "llm", "tool", "handoff", "http", "throttle", ...
+    name: str
+    agent: Optional[str]
+    start: float
+    end: Optional[float] = None
+    attributes: dict = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with exact count, sum, min and max."""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Estimates a percentile by interpolating inside the bucket it falls in."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = self.buckets[index - 1] if index else 0.0
+                high = self.buckets[index] if index < len(self.buckets) else self.max
+                estimate = low + (high - low) * (rank - seen) / count
+                return min(max(estimate, self.min), self.max)
+            seen += count
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p90": self.percentile(0.90),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+            "buckets": {
+                (f"<={bound}" if index < len(self.buckets) else f">{self.buckets[-1]}"): count
+                for index, (bound, count) in enumerate(zip(self.buckets + (None,), self.counts))
+                if count
+            },
+        }
+
+
+class RunSpans:
+    """The spans one workflow run has open, and the agent it is currently running."""
+
+    def __init__(self):
+        self.open: dict[Any, Span] = {}
+        self.current_agent: Optional[str] = None
+
+
+# Set per workflow run (see Tracer.begin_run), so concurrent runs, and the
+# sub-runs of a fan-out, keep their open spans and current agent apart
+_run_spans: ContextVar[Optional[RunSpans]] = ContextVar("run_spans", default=None)
+
+
+class Tracer:
+    """
+    Span-based tracing of LLM calls, tool calls, handoffs and HTTP requests.
+
+    Feed it the workflow's events with `observe()` and wrap other work in
+    `span()`. Every finished span lands in a latency histogram per kind,
+    per (kind, agent) and per (kind, name). When disabled, `observe()` and
+    `span()` return immediately, so leaving the calls in costs nothing.
+
+    The spans a run has open live in a `RunSpans` bound to the run's
+    context by `begin_run()`, so one tracer serves concurrent runs.
+    """
+
+    def __init__(self, enabled: bool = False, max_spans: int = MAX_SPANS):
+        self.enabled = enabled
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+        self.histograms: dict[tuple[str, str, str], LatencyHistogram] = {}
+        self.runs: "weakref.WeakSet[RunSpans]" = weakref.WeakSet()
+        self.started = time.perf_counter()
+
+    def reset(self) -> None:
+        self.spans.clear()
+        self.histograms.clear()
+        for run in list(self.runs):
+            run.open.clear()
+        self.started = time.perf_counter()
+
+    def begin_run(self) -> RunSpans:
+        """
+        Starts the span state of a workflow run in the current context.
+
+        Call it before `workflow.run()`, so the run's tool calls (which copy
+        the context) are attributed to the run's current agent.
+        """
+        run = RunSpans()
+        _run_spans.set(run)
+        self.runs.add(run)
+        return run
+
+    # Recording
+
+    def start(self, kind: str, name: str, agent: Optional[str] = None, **attributes) -> Span:
+        if agent is None:
+            run = _run_spans.get()
+            agent = run.current_agent if run is not None else None
+        return Span(kind, name, agent, time.perf_counter(), attributes=attributes)
+
+    def finish(self, span: Span, **attributes) -> None:
+        span.end = time.perf_counter()
+        span.attributes.update(attributes)
+        self.spans.append(span)
+        duration = span.end - span.start
+        for key in ((span.kind, "", ""), (span.kind, "agent", span.agent or "unknown"), (span.kind, "name", span.name)):
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(duration)
+
+    def span(self, kind: str, name: str, agent: Optional[str] = None, **attributes):
+        """Context manager timing a block as one span; a no-op when disabled."""
+        if not self.enabled:
+            return _DISABLED
+        return self._span(kind, name, agent, attributes)
+
+    @contextmanager
+    def _span(self, kind, name, agent, attributes):
+        span = self.start(kind, name, agent, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            self.finish(span)
+
+    def observe(self, ev: Any) -> None:
+        """
+        Turns workflow events into spans.
+
+        AgentInput/AgentOutput bracket an LLM call, and a handoff lasts from
+        the "handoff" tool call to the next agent's first LLM call. Tool calls
+        are timed where they run (see `traced()`), because the stream delivers
+        their events late when a tool blocks the event loop; they are
+        attributed to the agent whose LLM call requested them.
+        """
+        if not self.enabled:
+            return
+        run = _run_spans.get() or self.begin_run()
+        kind = type(ev).__name__
+        if kind == "AgentInput":
+            run.current_agent = ev.current_agent_name
+            handoff = run.open.pop("handoff", None)
+            if handoff is not None:
+                self.finish(handoff)
+            run.open[("llm", run.current_agent)] = self.start("llm", "llm", run.current_agent)
+        elif kind == "AgentStream":
+            run.current_agent = ev.current_agent_name
+            span = run.open.get(("llm", run.current_agent))
+            if span is not None and "first_token_seconds" not in span.attributes and ev.delta:
+                span.attributes["first_token_seconds"] = time.perf_counter() - span.start
+        elif kind == "AgentOutput":
+            run.current_agent = ev.current_agent_name
+            span = run.open.pop(("llm", run.current_agent), None)
+            if span is not None:
+                self.finish(span, tool_calls=len(ev.tool_calls or []))
+        elif kind == "ToolCall" and ev.tool_name == "handoff":
+            target = ev.tool_kwargs.get("to_agent", "unknown")
+            run.open["handoff"] = self.start("handoff", f"to:{target}", run.current_agent)
+
+    # Reporting
+
+    def snapshot(self) -> dict:
+        """
+        Where the session's wall-clock time went.
+
+        Returns:
+            dict: Wall-clock seconds since the last reset, total seconds per
+                span kind, and latency histograms per kind, per agent and per
+                tool. Concurrent spans overlap, so the totals can add up to
+                more than the wall clock.
+        """
+        wall = time.perf_counter() - self.started
+        by_kind, by_agent, by_name = {}, {}, {}
+        for (kind, axis, value), histogram in sorted(self.histograms.items()):
+            if axis == "":
+                by_kind[kind] = histogram.to_dict()
+            elif axis == "agent":
+                by_agent.setdefault(kind, {})[value] = histogram.to_dict()
+            else:
+                by_name.setdefault(kind, {})[value] = histogram.to_dict()
+        return {
+            "wall_seconds": wall,
+            "time_by_kind": {
+                kind: {"seconds": h["total_seconds"], "share_of_wall": h["total_seconds"] / wall if wall else 0.0}
+                for kind, h in by_kind.items()
+            },
+            "by_kind": by_kind,
+            "by_agent": by_agent,
+            "by_name": by_name,
+            "open_spans": sum(len(run.open) for run in list(self.runs)),
+        }
+
+    def summary(self) -> str:
+        """A short human-readable breakdown of `snapshot()`."""
+        snapshot = self.snapshot()
+        lines = [f"Wall clock: {snapshot['wall_seconds']:.2f}s"]
+        for kind, share in snapshot["time_by_kind"].items():
+            lines.append(f"  {kind}: {share['seconds']:.2f}s ({share['share_of_wall']:.0%})")
+            for axis in ("by_agent", "by_name"):
+                for value, h in snapshot[axis].get(kind, {}).items():
+                    if axis == "by_name" and value == kind:
+                        continue
+                    lines.append(
+                        f"    {value}: n={h['count']} total={h['total_seconds']:.2f}s "
+                        f"p50={h['p50']:.3f}s p90={h['p90']:.3f}s max={h['max']:.3f}s"
+                    )
+        return "\n".join(lines)
+
+    def export(self, path: str) -> None:
+        """Writes the snapshot and the recorded spans (times relative to the session start) as JSON."""
+        spans = []
+        for span in self.spans:
+            data = asdict(span)
+            data["start"] = span.start - self.started
+            data["end"] = span.end - self.started
+            data["duration"] = span.end - span.start
+            spans.append(data)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"snapshot": self.snapshot(), "spans": spans}, f, indent=2, default=str)
+
+
+def traced(kind: str, name: str, fn):
+    """Wraps an async function so every call is one span of the process tracer."""
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        with tracer.span(kind, name):
+            return await fn(*args, **kwargs)
+
+    return wrapper
+
+
+tracer = Tracer(enabled=os.getenv("SHOPPING_AGENT_TRACE", "0").lower() in ("1", "true", "yes"))
+
+
+def get_tracer() -> Tracer:
+    """Returns the process-wide tracer; enable it with SHOPPING_AGENT_TRACE=1 or `tracer.enabled = True`."""
+    return tracer
@@ -0,0 +1,363 @@
+import os
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+from pydantic import Field, PrivateAttr
+from llama_index.core.llms import (
+    LLM,
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+
+
+CACHE_DIR = os.getenv("SHOPPING_AGENT_CACHE_DIR", ".cache")
+LLM_CACHE_MODES = ("off", "cache", "record", "replay")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 24 * 60 * 60))
+LLM_CACHE_MEMORY_ENTRIES = 256
+
+
+class ReplayMissError(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class CompletionStore:
+    """SQLite table of recorded completions, keyed by request hash."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, model TEXT, request TEXT, response TEXT NOT NULL, "
+            "created REAL NOT NULL)"
+        )
+        self.db.commit()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple[dict, float]]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT response, created FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, key: str, model: str, request: dict, response: dict) -> None:
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)",
+                (key, model, json.dumps(request, ensure_ascii=False),
+                 json.dumps(response, ensure_ascii=False), time.time()),
+            )
+            self.db.commit()
+
+
+def _message_to_dict(message: ChatMessage) -> dict:
+    data = {"role": str(getattr(message.role, "value", message.role)), "content": message.content or ""}
+    if message.additional_kwargs:
+        # Tool calls and tool results of function-calling agents live here
+        data["additional_kwargs"] = _key_value(message.additional_kwargs)
+    return data
+
+
+def _jsonable(value: Any) -> Any:
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return None
+
+
+def _key_value(value: Any) -> Any:
+    """
+    A stable JSON form of a request argument, for the cache key.
+
+    Tool schemas reach the provider as SDK objects (pydantic models, protos)
+    that json cannot encode; they are dumped instead of dropped, so requests
+    offering different tools never share a key.
+    """
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {str(key): _key_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_key_value(item) for item in value]
+        return sorted(items, key=json.dumps) if isinstance(value, (set, frozenset)) else items
+    metadata = getattr(value, "metadata", None)
+    if callable(getattr(metadata, "to_openai_tool", None)):
+        # A LlamaIndex tool: its name, description and argument schema
+        return _key_value(metadata.to_openai_tool())
+    for dump in ("model_dump", "to_dict", "to_proto", "dict"):
+        method = getattr(value, dump, None)
+        if callable(method):
+            try:
+                return _key_value(method())
+            except Exception:
+                pass
+    if isinstance(value, type):
+        return _key_value(getattr(value, "model_json_schema", lambda: value.__qualname__)())
+    # Reprs of plain objects embed their address, which changes every run
+    return re.sub(r" at 0x[0-9a-f]+", "", repr(value))
+
+
+class CachingLLM(LLM):
+    """
+    Wraps an LLM with a prompt-keyed response cache and a record/replay mode.
+
+    Requests are keyed on model, messages (with their additional kwargs, e.g.
+    tool calls) and parameters, including the tool schemas offered. Modes:
+      - "off": always call the wrapped LLM.
+      - "cache": serve from memory, then disk (within `ttl`), else call and store.
+      - "record": always call the wrapped LLM and write every completion to disk.
+      - "replay": serve only from disk; a miss raises ReplayMissError.
+
+    The async methods read the memory tier on the event loop and reach the
+    SQLite store through `asyncio.to_thread`.
+    """
+
+    llm: Any = Field(description="The wrapped LLM.")
+    mode: str = Field(default="cache", description="One of off, cache, record, replay.")
+    cache_path: str = Field(default=os.path.join(CACHE_DIR, "llm.sqlite"))
+    ttl: float = Field(default=LLM_CACHE_TTL)
+    memory_entries: int = Field(default=LLM_CACHE_MEMORY_ENTRIES)
+
+    _memory: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    # The memory tier is also used from the threads of the async methods
+    _memory_lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _store: Optional[CompletionStore] = PrivateAttr(default=None)
+    _stats: dict = PrivateAttr(default_factory=lambda: {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+
+    def __init__(self, **data: Any):
+        super().__init__(**data)
+        if self.mode not in LLM_CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode {self.mode!r}, expected one of {LLM_CACHE_MODES}")
+        if self.mode != "off":
+            self._store = CompletionStore(self.cache_path)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachingLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self.llm.metadata
+
+    def stats(self) -> dict:
+        return dict(self._stats, memory_entries=len(self._memory), mode=self.mode)
+
+    # Keys and lookups
+
+    def _request(self, kind: str, payload: Any, kwargs: dict) -> dict:
+        # Sampling parameters live on the provider's LLM, under any wrappers
+        base = self.llm
+        while isinstance(getattr(base, "llm", None), LLM):
+            base = base.llm
+        params = {
+            name: getattr(base, name, None)
+            for name in ("temperature", "max_tokens", "top_p")
+        }
+        params.update({name: _key_value(value) for name, value in kwargs.items()})
+        return {"model": self.metadata.model_name, "kind": kind, "input": payload, "params": params}
+
+    @staticmethod
+    def _key(request: dict) -> str:
+        encoded = json.dumps(request, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _remember(self, key: str, response: dict) -> None:
+        with self._memory_lock:
+            self._memory[key] = (time.time(), response)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _peek(self, key: str) -> Optional[dict]:
+        """The memory tier only: no disk access, safe to call on the event loop."""
+        if self.mode in ("off", "record"):
+            return None
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is not None and (self.mode == "replay" or time.time() - entry[0] < self.ttl):
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[1]
+        return None
+
+    def _lookup(self, key: str) -> Optional[dict]:
+        if self.mode in ("off", "record"):
+            return None
+        cached = self._peek(key)
+        if cached is not None:
+            return cached
+        stored = self._store.get(key)
+        if stored is not None and (self.mode == "replay" or time.time() - stored[1] < self.ttl):
+            self._remember(key, stored[0])
+            self._stats["disk_hits"] += 1
+            return stored[0]
+        self._stats["misses"] += 1
+        if self.mode == "replay":
+            raise ReplayMissError(f"No recorded completion for request {key[:12]}")
+        return None
+
+    async def _alookup(self, key: str) -> Optional[dict]:
+        if self.mode in ("off", "record"):
+            return None
+        cached = self._peek(key)
+        if cached is not None:
+            return cached
+        # SQLite calls block, keep them off the event loop
+        return await asyncio.to_thread(self._lookup, key)
+
+    def _save(self, key: str, request: dict, response: dict) -> None:
+        if self.mode == "off":
+            return
+        self._remember(key, response)
+        self._store.put(key, request["model"], request, response)
+
+    async def _asave(self, key: str, request: dict, response: dict) -> None:
+        if self.mode != "off":
+            await asyncio.to_thread(self._save, key, request, response)
+
+    # Conversions
+
+    def _chat_request(self, messages: Sequence[ChatMessage], kwargs: dict) -> tuple[str, dict]:
+        request = self._request("chat", [_message_to_dict(m) for m in messages], kwargs)
+        return self._key(request), request
+
+    def _complete_request(self, prompt: str, formatted: bool, kwargs: dict) -> tuple[str, dict]:
+        request = self._request("complete", {"prompt": prompt, "formatted": formatted}, kwargs)
+        return self._key(request), request
+
+    @staticmethod
+    def _chat_to_dict(response: ChatResponse) -> dict:
+        return {
+            "role": str(getattr(response.message.role, "value", response.message.role)),
+            "content": response.message.content or "",
+            "additional_kwargs": _jsonable(response.message.additional_kwargs) or {},
+        }
+
+    @staticmethod
+    def _dict_to_chat(data: dict, stream: bool = False) -> ChatResponse:
+        message = ChatMessage(
+            role=data["role"], content=data["content"],
+            additional_kwargs=data.get("additional_kwargs") or {},
+        )
+        return ChatResponse(message=message, delta=data["content"] if stream else None)
+
+    # Chat
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        key, request = self._chat_request(messages, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return self._dict_to_chat(cached)
+        response = self.llm.chat(messages, **kwargs)
+        self._save(key, request, self._chat_to_dict(response))
+        return response
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        key, request = self._chat_request(messages, kwargs)
+        cached = await self._alookup(key)
+        if cached is not None:
+            return self._dict_to_chat(cached)
+        response = await self.llm.achat(messages, **kwargs)
+        await self._asave(key, request, self._chat_to_dict(response))
+        return response
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        key, request = self._chat_request(messages, kwargs)
+        cached = self._lookup(key)
+
+        def gen() -> ChatResponseGen:
+            if cached is not None:
+                yield self._dict_to_chat(cached, stream=True)
+                return
+            last = None
+            for last in self.llm.stream_chat(messages, **kwargs):
+                yield last
+            if last is not None:
+                self._save(key, request, self._chat_to_dict(last))
+
+        return gen()
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        key, request = self._chat_request(messages, kwargs)
+        cached = await self._alookup(key)
+        stream = None if cached is not None else await self.llm.astream_chat(messages, **kwargs)
+
+        async def gen() -> ChatResponseAsyncGen:
+            if cached is not None:
+                yield self._dict_to_chat(cached, stream=True)
+                return
+            last = None
+            async for last in stream:
+                yield last
+            if last is not None:
+                await self._asave(key, request, self._chat_to_dict(last))
+
+        return gen()
+
+    # Completion
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        key, request = self._complete_request(prompt, formatted, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return CompletionResponse(text=cached["content"])
+        response = self.llm.complete(prompt, formatted=formatted, **kwargs)
+        self._save(key, request, {"role": "assistant", "content": response.text})
+        return response
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        key, request = self._complete_request(prompt, formatted, kwargs)
+        cached = await self._alookup(key)
+        if cached is not None:
+            return CompletionResponse(text=cached["content"])
+        response = await self.llm.acomplete(prompt, formatted=formatted, **kwargs)
+        await self._asave(key, request, {"role": "assistant", "content": response.text})
+        return response
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        key, request = self._complete_request(prompt, formatted, kwargs)
+        cached = self._lookup(key)
+
+        def gen() -> CompletionResponseGen:
+            if cached is not None:
+                yield CompletionResponse(text=cached["content"], delta=cached["content"])
+                return
+            last = None
+            for last in self.llm.stream_complete(prompt, formatted=formatted, **kwargs):
+                yield last
+            if last is not None:
+                self._save(key, request, {"role": "assistant", "content": last.text})
+
+        return gen()
+
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseAsyncGen:
+        key, request = self._complete_request(prompt, formatted, kwargs)
+        cached = await self._alookup(key)
+        stream = None if cached is not None else await self.llm.astream_complete(prompt, formatted=formatted, **kwargs)
+
+        async def gen() -> CompletionResponseAsyncGen:
+            if cached is not None:
+                yield CompletionResponse(text=cached["content"], delta=cached["content"])
+                return
+            last = None
+            async for last in stream:
+                yield last
+            if last is not None:
+                await self._asave(key, request, {"role": "assistant", "content": last.text})
+
+        return gen()
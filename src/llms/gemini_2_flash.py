@@ -1,4 +1,35 @@
-from llama_index.llms.gemini import Gemini
+import os
 
-def create_gemini():
-    return Gemini(model="models/gemini-2.0-flash")
\ No newline at end of file
+
+DEFAULT_MODEL = "models/gemini-2.0-flash"
+
+
+def create_gemini(cache_mode=None, model=DEFAULT_MODEL, pooled=True):
+    """
+    Create the Gemini client used by the agents.
+
+    Args:
+        cache_mode (str): "off", "cache", "record" or "replay" (see
+            src/llms/cached_llm.py). Defaults to the LLM_CACHE_MODE
+            environment variable, or "off": responses are only cached or
+            replayed when asked for, e.g. by the benchmarks.
+        model (str): The Gemini model, e.g. "models/gemini-2.0-flash-lite".
+        pooled (bool): Calls that miss the cache go through the model's
+            adaptive concurrency limit and retries (see src/llms/pool.py).
+    """
+    # Imported here, the Gemini SDK alone takes seconds to import
+    from llama_index.llms.gemini import Gemini
+
+    llm = Gemini(model=model)
+    if pooled:
+        from src.llms.pool import PooledLLM
+
+        llm = PooledLLM(llm=llm, model=model)
+
+    cache_mode = cache_mode or os.getenv("LLM_CACHE_MODE", "off")
+    if cache_mode == "off":
+        return llm
+
+    from src.llms.cached_llm import CachingLLM
+
+    return CachingLLM(llm=llm, mode=cache_mode)
@@ -0,0 +1,386 @@
+import os
+import time
+import random
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Optional, Sequence
+from pydantic import Field, PrivateAttr
+from llama_index.core.llms import (
+    LLM,
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+
+from src.agents.tracing import LatencyHistogram
+
+
+# Concurrent calls per model: where the limit starts and the range it adapts in
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", 8))
+LLM_MIN_CONCURRENCY = 1
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 64))
+# After an overload signal the limit is multiplied by this, and not cut
+# again for this many seconds (the calls already in flight fail together)
+LLM_DECREASE_FACTOR = 0.5
+LLM_DECREASE_COOLDOWN = 2.0
+# Retries of a rate-limited or failed call, with full-jitter backoff
+LLM_MAX_RETRIES = 4
+LLM_BACKOFF_BASE = 0.5
+LLM_BACKOFF_CAP = 20.0
+# A static prefix (see src/agents/prompts.py) sent again within this many
+# seconds is counted as a repeat. Only the repetition is measured: whether
+# the provider actually served it from a prompt cache is not known here
+PREFIX_CACHE_TTL = 5 * 60
+PREFIX_CACHE_ENTRIES = 256
+
+# Rate limit, and provider errors worth trying again
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+OVERLOAD_STATUS = {429, 503}
+RETRYABLE_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "GatewayTimeout", "BadGateway", "RateLimitError",
+    "TimeoutException", "ConnectError", "ReadError", "RemoteProtocolError",
+}
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    """The HTTP status of a provider error, from whichever attribute its SDK uses."""
+    for value in (getattr(exc, "code", None), getattr(exc, "status_code", None),
+                  getattr(getattr(exc, "response", None), "status_code", None)):
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = error_status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if type(exc).__name__ in RETRYABLE_NAMES:
+        return True
+    text = str(exc)
+    return "429" in text or "RESOURCE_EXHAUSTED" in text or "UNAVAILABLE" in text
+
+
+def is_overload(exc: BaseException) -> bool:
+    """True for errors that mean "send less": rate limits and unavailability."""
+    status = error_status(exc)
+    if status is not None:
+        return status in OVERLOAD_STATUS
+    return type(exc).__name__ in ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "RateLimitError")
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds the provider asked to wait (a Retry-After header), if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = LLM_BACKOFF_BASE, cap: float = LLM_BACKOFF_CAP) -> float:
+    """Full jitter: uniform in [0, min(cap, base * 2**attempt)], so retries do not arrive in waves."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one model.
+
+    Every successful call raises the limit by 1/limit, i.e. by one slot once
+    a full window of calls went through; a rate limit or overload halves it,
+    at most once per `cooldown` seconds since the calls in flight tend to
+    fail together. Waiters are served in arrival order.
+    """
+
+    def __init__(self, initial: int = LLM_INITIAL_CONCURRENCY, minimum: int = LLM_MIN_CONCURRENCY,
+                 maximum: int = LLM_MAX_CONCURRENCY, decrease: float = LLM_DECREASE_FACTOR,
+                 cooldown: float = LLM_DECREASE_COOLDOWN):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.decreased_at = 0.0
+        self.waiters: deque = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self.waiters)
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the waiter gave up
+                self.release()
+            else:
+                self.waiters.remove(future)
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self.waiters and self.in_flight < int(self.limit):
+            future = self.waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def on_success(self) -> None:
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self._wake()
+
+    def on_overload(self) -> None:
+        now = time.monotonic()
+        if now - self.decreased_at < self.cooldown:
+            return
+        self.decreased_at = now
+        self.limit = max(self.minimum, self.limit * self.decrease)
+
+
+class ModelLane:
+    """The concurrency limiter and the metrics shared by every call to one model."""
+
+    def __init__(self, model: str, limiter: Optional[AdaptiveLimiter] = None):
+        self.model = model
+        self.limiter = limiter or AdaptiveLimiter()
+        self.counters = {"calls": 0, "succeeded": 0, "failed": 0, "retries": 0, "rate_limited": 0,
+                         "static_tokens": 0, "dynamic_tokens": 0, "prefix_repeats": 0, "prefix_new": 0}
+        self.queue_wait = LatencyHistogram()
+        self.latency = LatencyHistogram()
+        # Prefix id -> when it was last sent to this model
+        self.prefixes: OrderedDict = OrderedDict()
+
+    def observe_input(self, messages: Sequence[ChatMessage]) -> None:
+        """Counts the static and dynamic tokens of a call, and whether its prefix repeats a recent one."""
+        from src.agents.prompts import PREFIX_ID_KEY, split_tokens
+
+        static, dynamic = split_tokens(messages)
+        self.counters["static_tokens"] += static
+        self.counters["dynamic_tokens"] += dynamic
+        prefix_id = next((message.additional_kwargs[PREFIX_ID_KEY] for message in messages
+                          if PREFIX_ID_KEY in (message.additional_kwargs or {})), None)
+        if prefix_id is None:
+            return
+        now = time.monotonic()
+        last = self.prefixes.pop(prefix_id, None)
+        self.counters["prefix_repeats" if last is not None and now - last < PREFIX_CACHE_TTL else "prefix_new"] += 1
+        self.prefixes[prefix_id] = now
+        while len(self.prefixes) > PREFIX_CACHE_ENTRIES:
+            self.prefixes.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        return dict(
+            self.counters,
+            limit=round(self.limiter.limit, 2),
+            in_flight=self.limiter.in_flight,
+            queued=self.limiter.waiting,
+            queue_wait_seconds=self.queue_wait.to_dict(),
+            latency_seconds=self.latency.to_dict(),
+        )
+
+
+class PooledLLM(LLM):
+    """
+    Wraps an LLM with its model's adaptive concurrency limit and retries.
+
+    Async calls wait for a slot of the model's `ModelLane`, shared by every
+    agent and session using the model. A rate-limited or failed call gives
+    its slot back, sleeps with jittered exponential backoff (or as long as
+    the provider asked) and tries again, up to `max_retries` times. A stream
+    is only retried before its first chunk; once tokens were handed to the
+    agent an error is raised as is.
+    """
+
+    llm: Any = Field(description="The wrapped LLM.")
+    model: str = Field(description="Name of the model lane the calls are counted in.")
+    max_retries: int = Field(default=LLM_MAX_RETRIES)
+
+    _lane: ModelLane = PrivateAttr()
+
+    def __init__(self, lane: Optional[ModelLane] = None, **data: Any):
+        super().__init__(**data)
+        self._lane = lane or get_llm_pool().lane(self.model)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "PooledLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self.llm.metadata
+
+    @property
+    def lane(self) -> ModelLane:
+        return self._lane
+
+    async def _slot(self) -> float:
+        started = time.perf_counter()
+        await self._lane.limiter.acquire()
+        self._lane.queue_wait.record(time.perf_counter() - started)
+        return time.perf_counter()
+
+    async def _failed(self, exc: Exception, attempt: int) -> None:
+        """Raises `exc` unless it is worth retrying, otherwise waits before the next attempt."""
+        lane = self._lane
+        if not is_retryable(exc) or attempt >= self.max_retries:
+            lane.counters["failed"] += 1
+            raise exc
+        if is_overload(exc):
+            lane.counters["rate_limited"] += 1
+            lane.limiter.on_overload()
+        lane.counters["retries"] += 1
+        await asyncio.sleep(retry_after(exc) or backoff_delay(attempt))
+
+    def _succeeded(self, started: float) -> None:
+        self._lane.counters["succeeded"] += 1
+        self._lane.latency.record(time.perf_counter() - started)
+        self._lane.limiter.on_success()
+
+    async def _call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self._lane.counters["calls"] += 1
+        attempt = 0
+        while True:
+            started = await self._slot()
+            try:
+                result = await fn()
+            except Exception as e:
+                self._lane.limiter.release()
+                await self._failed(e, attempt)
+                attempt += 1
+                continue
+            except BaseException:
+                self._lane.limiter.release()
+                raise
+            self._succeeded(started)
+            self._lane.limiter.release()
+            return result
+
+    async def _stream(self, start: Callable[[], Awaitable[Any]]):
+        self._lane.counters["calls"] += 1
+        attempt = 0
+        while True:
+            started = await self._slot()
+            try:
+                stream = await start()
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                self._succeeded(started)
+                self._lane.limiter.release()
+                return
+            except Exception as e:
+                self._lane.limiter.release()
+                await self._failed(e, attempt)
+                attempt += 1
+                continue
+            except BaseException:
+                self._lane.limiter.release()
+                raise
+            break
+        # The slot is held until the stream is drained or abandoned
+        try:
+            yield first
+            async for chunk in stream:
+                yield chunk
+            self._succeeded(started)
+        except Exception:
+            self._lane.counters["failed"] += 1
+            raise
+        finally:
+            self._lane.limiter.release()
+
+    # Chat
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return self.llm.chat(messages, **kwargs)
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        self._lane.observe_input(messages)
+        return await self._call(lambda: self.llm.achat(messages, **kwargs))
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        return self.llm.stream_chat(messages, **kwargs)
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        self._lane.observe_input(messages)
+        return self._stream(lambda: self.llm.astream_chat(messages, **kwargs))
+
+    # Completion
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return self.llm.complete(prompt, formatted=formatted, **kwargs)
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return await self._call(lambda: self.llm.acomplete(prompt, formatted=formatted, **kwargs))
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        return self.llm.stream_complete(prompt, formatted=formatted, **kwargs)
+
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseAsyncGen:
+        return self._stream(lambda: self.llm.astream_complete(prompt, formatted=formatted, **kwargs))
+
+
+class LLMPool:
+    """
+    One client per model for the whole process, and one lane per model.
+
+    Agents, sessions and fan-out sub-agents asking for the same model share
+    its client (and the SDK's connection pool) and its concurrency limit,
+    so a load spike queues here instead of turning into a burst of 429s.
+    """
+
+    def __init__(self, factory: Optional[Callable[[str], Any]] = None):
+        """
+        Args:
+            factory: Builds the LLM of a model name, defaults to `create_gemini(model=...)`.
+        """
+        self.factory = factory
+        self.lanes: dict[str, ModelLane] = {}
+        self.llms: dict[str, Any] = {}
+
+    def lane(self, model: str) -> ModelLane:
+        lane = self.lanes.get(model)
+        if lane is None:
+            lane = self.lanes[model] = ModelLane(model)
+        return lane
+
+    def llm(self, model: Optional[str] = None) -> Any:
+        """Returns the shared LLM of `model`, building it on first use."""
+        from src.llms.gemini_2_flash import DEFAULT_MODEL, create_gemini
+
+        model = model or DEFAULT_MODEL
+        llm = self.llms.get(model)
+        if llm is None:
+            factory = self.factory or (lambda name: create_gemini(model=name))
+            llm = self.llms[model] = factory(model)
+        return llm
+
+    def snapshot(self) -> dict:
+        return {model: lane.snapshot() for model, lane in self.lanes.items()}
+
+
+_llm_pool: Optional[LLMPool] = None
+
+
+def get_llm_pool() -> LLMPool:
+    """Returns the process-wide LLM pool."""
+    global _llm_pool
+    if _llm_pool is None:
+        _llm_pool = LLMPool()
+    return _llm_pool
@@ -0,0 +1,112 @@
+import json
+import asyncio
+from typing import Any, Awaitable, Callable
+from src.tools.visit_webpage import fetch_markdown
+from src.tools.web_search import duck_search_tool
+from src.tools.query_on_url import extract_product_info, describe_error
+from src.tools.ranking import shrink_pages
+from src.tools.dedupe import already_seen
+
+
+# Upper bound on the requests one batch call has in flight
+BATCH_CONCURRENCY = 5
+MAX_BATCH_SIZE = 10
+# Tokens of page content one visit_webpages call returns, shared by its pages
+MAX_BATCH_CONTENT_TOKENS = 6000
+
+
+async def gather_bounded(items: list, fn: Callable[[Any], Awaitable[Any]],
+                         limit: int = BATCH_CONCURRENCY) -> list:
+    """
+    Runs `fn` on every item concurrently, at most `limit` at a time.
+
+    Returns the results in input order; an item that raised gets its
+    exception in place of a result.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore:
+            return await fn(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+
+
+def _dedupe(items: list[str]) -> tuple[list[str], list[str]]:
+    """Distinct non-empty items, split into the first MAX_BATCH_SIZE and the ones past it."""
+    items = list(dict.fromkeys(item.strip() for item in items if item and item.strip()))
+    return items[:MAX_BATCH_SIZE], items[MAX_BATCH_SIZE:]
+
+
+def _skipped_note(skipped: list[str]) -> str:
+    return f"Only the first {MAX_BATCH_SIZE} were processed; skipped: {', '.join(skipped)}"
+
+
+async def visit_webpages(urls: list[str]) -> str:
+    """
+    Visits several webpages concurrently and reads each one as markdown.
+
+    Args:
+        urls (list[str]): The urls of the webpages to visit (up to 10, the rest are skipped).
+
+    Returns:
+        str: One markdown section per url, in the order given.
+    """
+    urls, skipped = _dedupe(urls)
+    results = await gather_bounded(urls, fetch_markdown)
+    # The pages share one budget, ranked together against the request
+    pages = shrink_pages(
+        {url: result for url, result in zip(urls, results) if not isinstance(result, Exception)},
+        MAX_BATCH_CONTENT_TOKENS,
+    )
+    sections = []
+    for url, result in zip(urls, results):
+        content = describe_error(result) if isinstance(result, Exception) else pages[url]
+        content = already_seen(url, content) or content
+        sections.append(f"## {url}\n\n{content}")
+    if skipped:
+        sections.append(f"({_skipped_note(skipped)})")
+    return "\n\n---\n\n".join(sections)
+
+
+async def multi_search(queries: list[str]) -> str:
+    """
+    Runs several DuckDuckGo searches concurrently.
+
+    Args:
+        queries (list[str]): The queries to search with (up to 10, the rest are skipped).
+
+    Returns:
+        str: A JSON object mapping every query to its results or an error.
+    """
+    queries, skipped = _dedupe(queries)
+    results = await gather_bounded(queries, duck_search_tool)
+    output = {}
+    for query, result in zip(queries, results):
+        output[query] = {"error": describe_error(result)} if isinstance(result, Exception) else result
+    if skipped:
+        output["skipped"] = _skipped_note(skipped)
+    return json.dumps(output, ensure_ascii=False)
+
+
+async def get_product_info_batch(urls: list[str]) -> str:
+    """
+    Extracts the product attributes of several product pages concurrently.
+
+    Args:
+        urls (list[str]): The product page urls (up to 10, the rest are skipped).
+
+    Returns:
+        str: A JSON object mapping every url to its product records or an error.
+    """
+    urls, skipped = _dedupe(urls)
+    results = await gather_bounded(urls, extract_product_info)
+    output = {}
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            output[url] = {"error": describe_error(result)}
+        else:
+            output[url] = result or {"error": "No structured product data found."}
+    if skipped:
+        output["skipped"] = _skipped_note(skipped)
+    return json.dumps(output, ensure_ascii=False)
@@ -0,0 +1,282 @@
+import os
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Any, Optional
+from src.tools.urls import canonicalize_url
+from src.tools.http_client import domain_of
+from src.tools.page_cache import CACHE_DIR
+
+
+# Records older than this are stale: catalog_search skips them and the
+# agent goes back to the web
+CATALOG_TTL = float(os.getenv("CATALOG_TTL", 24 * 60 * 60))
+CATALOG_SEARCH_LIMIT = 20
+# Words of a shopping request that say nothing about the product itself
+# (budgets, currencies, filler); they are dropped from full-text queries
+SEARCH_STOP_WORDS = frozenset((
+    "a", "an", "and", "the", "for", "with", "of", "in", "to", "or", "my", "me", "i", "need", "want",
+    "under", "below", "over", "above", "around", "about", "less", "more", "than", "max", "maximum",
+    "budget", "cheap", "cheapest", "best", "good", "price", "between", "up",
+    "egp", "le", "pound", "pounds", "usd", "dollar", "dollars", "eur", "euro", "euros", "k",
+))
+
+# Title keyword -> category, first match wins
+CATEGORY_KEYWORDS = [
+    ("headset", ("headset", "headphone", "earphone", "earbud")),
+    ("graphics card", ("rtx", "gtx", "radeon", "graphics card", "gpu")),
+    ("processor", ("ryzen", "intel core", "core i3", "core i5", "core i7", "core i9", "processor", "cpu")),
+    ("memory", ("ddr4", "ddr5", "ram")),
+    ("storage", ("ssd", "nvme", "hard drive", "hdd")),
+    ("motherboard", ("motherboard", "b550", "b650", "b760", "z790")),
+    ("power supply", ("power supply", "psu")),
+    ("monitor", ("monitor",)),
+    ("keyboard", ("keyboard",)),
+    ("mouse", ("mouse",)),
+    ("laptop", ("laptop", "notebook")),
+    ("phone", ("smartphone", "iphone", "galaxy", "phone")),
+    ("suit", ("suit", "tuxedo", "blazer")),
+    ("dress", ("dress", "gown")),
+    ("shoes", ("shoe", "sneaker", "boot")),
+]
+
+
+def guess_category(title: str) -> Optional[str]:
+    title = title.lower()
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(re.search(rf"\b{re.escape(keyword)}", title) for keyword in keywords):
+            return category
+    return None
+
+
+def title_key(title: str) -> str:
+    """Title normalized for deduplication: lowercase words only."""
+    return " ".join(re.findall(r"\w+", title.lower()))
+
+
+class ProductCatalog:
+    """
+    Local catalog of every product the tools have seen, in SQLite.
+
+    Products are deduplicated by canonical url, and by normalized title
+    within a store; records without a url of their own are keyed on the
+    page they came from and their title. Titles and categories are indexed with FTS5, prices and
+    categories with B-tree indexes, and every row keeps when it was last
+    confirmed so searches can ignore stale prices.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = CATALOG_TTL):
+        self.path = path or os.path.join(CACHE_DIR, "catalog.sqlite")
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS products (
+                id INTEGER PRIMARY KEY,
+                url_key TEXT NOT NULL UNIQUE,
+                url TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                title TEXT NOT NULL,
+                title_key TEXT NOT NULL,
+                category TEXT,
+                price REAL,
+                currency TEXT,
+                availability TEXT,
+                rating REAL,
+                source_url TEXT,
+                first_seen REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS products_title ON products (domain, title_key);
+            CREATE INDEX IF NOT EXISTS products_price ON products (currency, price);
+            CREATE INDEX IF NOT EXISTS products_category ON products (category, price);
+            CREATE INDEX IF NOT EXISTS products_updated ON products (updated);
+            CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                title, category, content='products', content_rowid='id'
+            );
+            CREATE TRIGGER IF NOT EXISTS products_ai AFTER INSERT ON products BEGIN
+                INSERT INTO products_fts (rowid, title, category) VALUES (new.id, new.title, new.category);
+            END;
+            CREATE TRIGGER IF NOT EXISTS products_ad AFTER DELETE ON products BEGIN
+                INSERT INTO products_fts (products_fts, rowid, title, category)
+                VALUES ('delete', old.id, old.title, old.category);
+            END;
+            CREATE TRIGGER IF NOT EXISTS products_au AFTER UPDATE ON products BEGIN
+                INSERT INTO products_fts (products_fts, rowid, title, category)
+                VALUES ('delete', old.id, old.title, old.category);
+                INSERT INTO products_fts (rowid, title, category) VALUES (new.id, new.title, new.category);
+            END;
+            """
+        )
+        self.db.commit()
+        self.lock = threading.Lock()
+
+    def add(self, records: list, source_url: Optional[str] = None) -> int:
+        """
+        Stores product records, updating the existing row for the same product.
+
+        Args:
+            records (list): ProductRecord objects or their dicts; records
+                without a name are skipped.
+            source_url (str): The page the records were extracted from,
+                used as the url of records that have none (keyed together
+                with their title, so the products of one listing page stay
+                apart).
+
+        Returns:
+            int: How many records were stored.
+        """
+        now = time.time()
+        stored = 0
+        with self.lock:
+            for record in records:
+                record = record.to_dict() if hasattr(record, "to_dict") else dict(record)
+                title = (record.get("name") or "").strip()
+                url = record.get("url") or source_url
+                if not title or not url:
+                    continue
+                key = title_key(title)
+                url_key = canonicalize_url(url)
+                if not record.get("url"):
+                    url_key = f"{url_key}#{key}"
+                domain = domain_of(url)
+                row = self.db.execute(
+                    "SELECT id FROM products WHERE url_key = ? "
+                    "UNION ALL SELECT id FROM products WHERE domain = ? AND title_key = ? LIMIT 1",
+                    (url_key, domain, key),
+                ).fetchone()
+                values = (title, key, guess_category(title), record.get("price"), record.get("currency"),
+                          record.get("availability"), record.get("rating"), source_url, now)
+                if row is None:
+                    self.db.execute(
+                        "INSERT INTO products (url_key, url, domain, title, title_key, category, price, "
+                        "currency, availability, rating, source_url, updated, first_seen) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (url_key, url, domain) + values + (now,),
+                    )
+                else:
+                    self.db.execute(
+                        "UPDATE products SET title = ?, title_key = ?, category = COALESCE(?, category), "
+                        "price = COALESCE(?, price), currency = COALESCE(?, currency), "
+                        "availability = COALESCE(?, availability), rating = COALESCE(?, rating), "
+                        "source_url = COALESCE(?, source_url), updated = ? WHERE id = ?",
+                        values + (row[0],),
+                    )
+                stored += 1
+            self.db.commit()
+        return stored
+
+    def search(self, query: str = "", max_price: Optional[float] = None, min_price: Optional[float] = None,
+               currency: Optional[str] = None, category: Optional[str] = None,
+               max_age: Optional[float] = None, limit: int = CATALOG_SEARCH_LIMIT) -> list[dict]:
+        """
+        Full-text search over fresh products, filtered by price and category.
+
+        Args:
+            query (str): Product words; any of them may match the title or
+                category, and products matching more of them rank first.
+                Budget and filler words (SEARCH_STOP_WORDS) and numbers
+                are ignored.
+            max_price (float): Upper price bound.
+            min_price (float): Lower price bound.
+            currency (str): Only prices in this currency, e.g. "EGP".
+            category (str): Only this category (see CATEGORY_KEYWORDS).
+            max_age (float): Seconds since the product was last seen,
+                defaults to the catalog's ttl.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list[dict]: Matching products, best text match first, then cheapest.
+        """
+        where = ["p.updated >= ?"]
+        params: list[Any] = [time.time() - (self.ttl if max_age is None else max_age)]
+        terms = [term for term in re.findall(r"\w+", query.lower())
+                 if term not in SEARCH_STOP_WORDS and not term.isdigit()]
+        if terms:
+            where.append("products_fts MATCH ?")
+            params.append(" OR ".join(f'"{term}"*' for term in terms))
+        for clause, value in (("p.price <= ?", max_price), ("p.price >= ?", min_price),
+                              ("p.currency = ?", currency and currency.upper()), ("p.category = ?", category)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        source = "products p JOIN products_fts ON products_fts.rowid = p.id" if terms else "products p"
+        order = "bm25(products_fts), p.price" if terms else "p.price"
+        sql = (
+            "SELECT p.title, p.price, p.currency, p.availability, p.rating, p.url, p.category, p.updated "
+            f"FROM {source} WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ?"
+        )
+        with self.lock:
+            rows = self.db.execute(sql, params + [limit]).fetchall()
+        now = time.time()
+        return [
+            {
+                key: value
+                for key, value in zip(("name", "price", "currency", "availability", "rating", "url", "category"), row)
+                if value is not None
+            } | {"age_hours": round((now - row[7]) / 3600, 1)}
+            for row in rows
+        ]
+
+    def stats(self) -> dict:
+        with self.lock:
+            total, fresh = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(updated >= ?), 0) FROM products", (time.time() - self.ttl,)
+            ).fetchone()
+        return {"products": total, "fresh": fresh}
+
+    def clear(self) -> None:
+        with self.lock:
+            self.db.execute("DELETE FROM products")
+            self.db.commit()
+
+
+_catalog: Optional[ProductCatalog] = None
+
+
+def get_catalog() -> ProductCatalog:
+    """Returns the process-wide product catalog, opening it on first use."""
+    global _catalog
+    if _catalog is None:
+        _catalog = ProductCatalog()
+    return _catalog
+
+
+async def catalog_search(query: str, max_price: Optional[float] = None, currency: Optional[str] = None,
+                         max_age_hours: float = 24) -> str:
+    """
+    Searches the local catalog of products already seen on the web.
+
+    Args:
+        query (str): Product words, e.g. "wired gaming headset".
+        max_price (float): Optional upper price bound.
+        currency (str): Optional currency of `max_price`, e.g. "EGP".
+        max_age_hours (float): Only products confirmed within this many hours.
+
+    Returns:
+        str: A JSON list of matching products, or a note to search the web.
+    """
+    try:
+        # SQLite calls block, keep them off the event loop
+        products = await asyncio.to_thread(
+            get_catalog().search, query, max_price=max_price, currency=currency, max_age=max_age_hours * 3600,
+        )
+    except sqlite3.Error as e:
+        return f"The local catalog could not be searched ({e}), search the web instead."
+    if not products:
+        return "No fresh matches in the local catalog, search the web instead."
+    return json.dumps(products, ensure_ascii=False)
+
+
+def __getattr__(name):
+    # The LlamaIndex tool is built lazily, importing this module stays cheap
+    if name == "catalog_search_tool":
+        from src.tools.registry import get_tool
+
+        return get_tool("catalog_search")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
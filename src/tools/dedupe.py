@@ -0,0 +1,104 @@
+import hashlib
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from src.tools.ranking import tokenize
+from src.tools.urls import canonicalize_url
+
+
+# Words per shingle hashed into the fingerprint
+SHINGLE_WORDS = 3
+# Fingerprints this many bits apart or closer are the same page
+NEAR_DUPLICATE_BITS = 3
+# Shorter outputs (errors, empty pages) are always passed through
+MIN_FINGERPRINT_CHARS = 500
+
+_BITS = np.arange(64, dtype=np.uint64)
+
+
+def simhash(text: str) -> Optional[int]:
+    """
+    64-bit SimHash of a text over its word shingles.
+
+    Pages differing only in navigation, tracking parameters or a few
+    changed lines get fingerprints a few bits apart.
+
+    Returns:
+        int: The fingerprint, or None when the text has no words.
+    """
+    words = tokenize(text)
+    if not words:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little") for shingle in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    # Every shingle votes on every bit; the fingerprint keeps the majority
+    votes = ((hashes[:, None] >> _BITS) & np.uint64(1)).sum(axis=0, dtype=np.int64)
+    return int(np.sum((votes * 2 > len(hashes)).astype(np.uint64) << _BITS))
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+@dataclass
+class SeenPages:
+    """Fingerprints of the page contents already handed to the agents of one run."""
+
+    pages: list = field(default_factory=list)
+    suppressed: int = 0
+
+    def check(self, url: str, text: str) -> Optional[str]:
+        """
+        Records `text` as given for `url`, unless a near-identical text was given before.
+
+        Returns:
+            str: The url the same content was already given for, or None
+                when the text is new (and is now recorded).
+        """
+        if len(text) < MIN_FINGERPRINT_CHARS:
+            return None
+        fingerprint = simhash(text)
+        if fingerprint is None:
+            return None
+        for seen_fingerprint, seen_url in self.pages:
+            if hamming(fingerprint, seen_fingerprint) <= NEAR_DUPLICATE_BITS:
+                self.suppressed += 1
+                return seen_url
+        self.pages.append((fingerprint, url))
+        return None
+
+
+# Set per workflow run: its agents share one chat history, so anything one
+# of them was given is already in front of the others
+_seen: ContextVar[Optional[SeenPages]] = ContextVar("seen_pages", default=None)
+
+
+def reset_seen() -> SeenPages:
+    """Starts tracking the pages given to the agents in the current context."""
+    seen = SeenPages()
+    _seen.set(seen)
+    return seen
+
+
+def already_seen(url: str, text: str) -> Optional[str]:
+    """
+    Returns a short reference instead of `text` when the current run was already given the same page.
+
+    Outside a workflow run nothing is tracked and None is returned.
+    """
+    seen = _seen.get()
+    if seen is None:
+        return None
+    previous = seen.check(url, text)
+    if previous is None:
+        return None
+    if canonicalize_url(previous) == canonicalize_url(url):
+        return f"(already seen: {url} shows the same content you were given earlier in this conversation)"
+    return (f"(already seen: {url} is nearly identical to {previous}, which you were given earlier "
+            "in this conversation; use that content)")
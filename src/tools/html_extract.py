@@ -0,0 +1,224 @@
+import re
+from html.parser import HTMLParser
+from typing import Optional
+from urllib.parse import urljoin
+
+
+# Elements that never hold main content
+SKIP_TAGS = {
+    "script", "style", "noscript", "svg", "template", "iframe", "canvas",
+    "nav", "footer", "aside", "select", "dialog",
+}
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+}
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "ul", "ol", "table", "tr",
+    "blockquote", "pre", "dl", "dt", "dd", "figure", "figcaption",
+}
+# Elements a following sibling closes implicitly: <li>a<li>b
+IMPLIED_END_TAGS = {
+    "li": {"li"}, "p": {"p"}, "dt": {"dt", "dd"}, "dd": {"dt", "dd"},
+    "tr": {"tr"}, "td": {"td", "th"}, "th": {"td", "th"}, "option": {"option"},
+}
+HEADING_TAGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "search", "dialog", "menu", "menubar"}
+# Matched against whole id and class tokens, so "card-header" or
+# "nav-item" are kept while "header" or "nav" are dropped
+BOILERPLATE_PATTERN = re.compile(
+    r"^(nav|navbar|menu|header|footer|breadcrumbs?|cookies?|sidebar|"
+    r"newsletter|login|signup|account|profile|social|share|popup|modal|banner)$",
+    re.IGNORECASE,
+)
+
+# Rough characters per token for the budget
+CHARS_PER_TOKEN = 4
+
+
+class StreamingMarkdownExtractor(HTMLParser):
+    """
+    Incremental HTML to markdown converter that keeps only the main content.
+
+    Feed it chunks as they arrive; boilerplate (navigation, footers, banners,
+    menus, scripts) is dropped, and once `max_chars` of text has been produced
+    `done` becomes True so the caller can stop downloading.
+    """
+
+    def __init__(self, max_chars: int = 10000, max_tokens: Optional[int] = None,
+                 base_url: Optional[str] = None):
+        super().__init__(convert_charrefs=True)
+        if max_tokens is not None:
+            max_chars = min(max_chars, max_tokens * CHARS_PER_TOKEN)
+        self.max_chars = max_chars
+        self.base_url = base_url
+        self.title = ""
+        self.parts: list[str] = []
+        self.length = 0
+        self.done = False
+        self.in_title = False
+        self.seen_main = False
+        # Elements opened and not closed yet; a skipped element ends when
+        # the stack drops below its depth, even if it was never closed itself
+        self.open_tags: list[str] = []
+        self.skip_depth: Optional[int] = None
+        self.link_href: Optional[str] = None
+        self.link_text: list[str] = []
+        # Level of a heading inside the link (a product tile's title), written
+        # in front of the link once its text is complete
+        self.link_heading: Optional[int] = None
+
+    def _is_boilerplate(self, tag: str, attrs: dict) -> bool:
+        if tag in SKIP_TAGS:
+            return True
+        if attrs.get("aria-hidden") == "true" or "hidden" in attrs:
+            return True
+        if (attrs.get("role") or "").lower() in BOILERPLATE_ROLES:
+            return True
+        marker = f"{attrs.get('id') or ''} {attrs.get('class') or ''}"
+        return any(BOILERPLATE_PATTERN.match(token) for token in marker.split())
+
+    def _emit(self, text: str) -> None:
+        if self.done or not text:
+            return
+        remaining = self.max_chars - self.length
+        if len(text) >= remaining:
+            text = text[:remaining]
+            self.done = True
+        self.parts.append(text)
+        self.length += len(text)
+
+    def _newline(self, count: int = 1) -> None:
+        self._emit("\n" * count)
+
+    def _close(self, index: int) -> None:
+        """Closes the open element at `index` and everything opened after it."""
+        del self.open_tags[index:]
+        if self.skip_depth is not None and len(self.open_tags) < self.skip_depth:
+            self.skip_depth = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if self.open_tags and self.open_tags[-1] in IMPLIED_END_TAGS.get(tag, ()):
+            self._close(len(self.open_tags) - 1)
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+        if self.skip_depth is not None:
+            return
+
+        attrs = {name: value for name, value in attrs}
+        if tag == "title":
+            self.in_title = True
+            return
+        if tag not in VOID_TAGS and tag not in ("html", "body", "main") and self._is_boilerplate(tag, attrs):
+            self.skip_depth = len(self.open_tags)
+            return
+
+        if (tag == "main" or attrs.get("role") == "main") and not self.seen_main:
+            # Everything before the main landmark is page chrome
+            self.seen_main = True
+            self.parts, self.length = [], 0
+
+        if self.link_href is not None and tag != "img":
+            # Block markup inside a link only separates words of its text
+            if tag in HEADING_TAGS and self.link_heading is None:
+                self.link_heading = HEADING_TAGS[tag]
+            elif tag in HEADING_TAGS or tag in BLOCK_TAGS or tag in ("li", "td", "th", "br"):
+                self.link_text.append(" ")
+            return
+        if tag in HEADING_TAGS:
+            self._newline(2)
+            self._emit("#" * HEADING_TAGS[tag] + " ")
+        elif tag == "li":
+            self._newline()
+            self._emit("* ")
+        elif tag in ("td", "th"):
+            self._emit(" | ")
+        elif tag == "br":
+            self._newline()
+        elif tag in BLOCK_TAGS:
+            self._newline(2)
+        elif tag == "a":
+            href = attrs.get("href") or ""
+            if href and not href.startswith(("javascript:", "#", "mailto:", "tel:")):
+                self.link_href = urljoin(self.base_url, href) if self.base_url else href
+                self.link_text = []
+                self.link_heading = None
+        elif tag == "img" and self.link_href is not None and attrs.get("alt"):
+            self.link_text.append(attrs["alt"])
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag in self.open_tags:
+            # Closing an element also closes the ones left open inside it
+            # (an unclosed <li> ends with its list)
+            self._close(len(self.open_tags) - 1 - self.open_tags[::-1].index(tag))
+        elif tag not in VOID_TAGS:
+            # A stray end tag closes nothing
+            return
+        if self.skip_depth is not None:
+            return
+
+        if tag == "title":
+            self.in_title = False
+        elif tag == "a" and self.link_href is not None:
+            text = " ".join("".join(self.link_text).split())
+            if text and self.link_heading is not None:
+                self._newline(2)
+                self._emit(f"{'#' * self.link_heading} [{text}]({self.link_href})")
+                self._newline()
+            elif text:
+                self._emit(f"[{text}]({self.link_href})")
+            self.link_href = None
+        elif self.link_href is not None:
+            if tag in HEADING_TAGS or tag in BLOCK_TAGS:
+                self.link_text.append(" ")
+        elif tag in HEADING_TAGS or tag in BLOCK_TAGS:
+            self._newline()
+
+    def handle_data(self, data):
+        if self.done or self.skip_depth is not None:
+            return
+        if self.in_title:
+            self.title += data
+            return
+        text = re.sub(r"\s+", " ", data)
+        if not text.strip():
+            if self.parts and not self.parts[-1].endswith((" ", "\n")):
+                self._emit(" ")
+            return
+        if self.link_href is not None:
+            self.link_text.append(text)
+        else:
+            self._emit(text)
+
+    def markdown(self) -> str:
+        """Returns the markdown produced so far."""
+        body = "".join(self.parts)
+        body = re.sub(r"[ \t]+\n", "\n", body)
+        body = re.sub(r"\n[ \t]+", "\n", body)
+        body = re.sub(r"\n{3,}", "\n\n", body).strip()
+        title = " ".join(self.title.split())
+        return f"{title}\n\n{body}" if title else body
+
+
+def extract_markdown(html: str, max_chars: int = 10000, max_tokens: Optional[int] = None,
+                     base_url: Optional[str] = None) -> str:
+    """
+    Converts a complete HTML document to main-content markdown.
+
+    Args:
+        html (str): The HTML document.
+        max_chars (int): The maximum number of characters to keep.
+        max_tokens (Optional[int]): An optional token budget, approximated from characters.
+        base_url (Optional[str]): Used to resolve relative links.
+
+    Returns:
+        str: The extracted markdown.
+    """
+    extractor = StreamingMarkdownExtractor(max_chars=max_chars, max_tokens=max_tokens, base_url=base_url)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.markdown()
@@ -0,0 +1,173 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.agents.tracing import get_tracer
+
+
+# Connection pool shared by every tool in the process
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = 20.0
+
+# Per-domain throttling, replaces the old fixed `time.sleep(3)` before each call
+DEFAULT_RATE = 1 / 3  # tokens per second, i.e. one request every 3 seconds
+DEFAULT_BURST = 2
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9,ar;q=0.8",
+}
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # The lock keeps waiters in FIFO order so one host cannot starve itself
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DomainRateLimiter:
+    """
+    Schedules requests per host: calls to different hosts run concurrently,
+    calls to the same host are throttled by that host's token bucket.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.overrides: dict[str, tuple[float, int]] = {}
+        self.buckets: dict[str, TokenBucket] = {}
+
+    def configure(self, domain: str, rate: float, burst: int = 1) -> None:
+        """Set a specific rate for one domain (e.g. a search API with stricter limits)."""
+        self.overrides[domain] = (rate, burst)
+        self.buckets.pop(domain, None)
+
+    def bucket_for(self, domain: str) -> TokenBucket:
+        bucket = self.buckets.get(domain)
+        if bucket is None:
+            rate, burst = self.overrides.get(domain, (self.rate, self.burst))
+            bucket = self.buckets[domain] = TokenBucket(rate, burst)
+        return bucket
+
+    async def acquire(self, domain: str) -> None:
+        await self.bucket_for(domain).acquire()
+
+
+def domain_of(url: str) -> str:
+    """Returns the lowercased host of a url, without a leading "www."."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+_client: Optional[httpx.AsyncClient] = None
+rate_limiter = DomainRateLimiter()
+
+# Process-wide transfer counters, read by the benchmarks
+transfer_stats = {"requests": 0, "bytes": 0}
+
+
+def get_client() -> httpx.AsyncClient:
+    """Returns the process-wide keep-alive HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=DEFAULT_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Closes the shared client; the next `get_client()` call opens a new pool."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@asynccontextmanager
+async def throttled(url_or_domain: str):
+    """Waits for the host's rate limiter before entering the block."""
+    domain = domain_of(url_or_domain) if "://" in url_or_domain else url_or_domain
+    await rate_limiter.acquire(domain)
+    yield
+
+
+async def fetch(url: str, **kwargs) -> httpx.Response:
+    """
+    GETs a url through the shared pool, after waiting for its host's rate limiter.
+
+    Args:
+        url (str): The url to fetch.
+        **kwargs: Extra arguments passed to `httpx.AsyncClient.get`.
+
+    Returns:
+        httpx.Response: The response, with the body already read.
+    """
+    tracer = get_tracer()
+    domain = domain_of(url)
+    with tracer.span("throttle", domain):
+        await rate_limiter.acquire(domain)
+    client = get_client()
+    with tracer.span("http", domain):
+        response = await client.get(url, **kwargs)
+    transfer_stats["requests"] += 1
+    transfer_stats["bytes"] += response.num_bytes_downloaded
+    return response
+
+
+@asynccontextmanager
+async def stream(url: str, **kwargs):
+    """
+    Opens a streamed GET through the shared pool, after waiting for its host's
+    rate limiter. The body is read lazily so the caller can stop early.
+
+    Args:
+        url (str): The url to fetch.
+        **kwargs: Extra arguments passed to `httpx.AsyncClient.stream`.
+
+    Yields:
+        httpx.Response: The response, with the body not yet read.
+    """
+    tracer = get_tracer()
+    domain = domain_of(url)
+    with tracer.span("throttle", domain):
+        await rate_limiter.acquire(domain)
+    client = get_client()
+    with tracer.span("http", domain):
+        async with client.stream("GET", url, **kwargs) as response:
+            try:
+                yield response
+            finally:
+                transfer_stats["requests"] += 1
+                transfer_stats["bytes"] += response.num_bytes_downloaded
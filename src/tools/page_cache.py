@@ -0,0 +1,215 @@
+import os
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from src.tools.urls import canonicalize_url
+
+
+CACHE_DIR = os.getenv("SHOPPING_AGENT_CACHE_DIR", ".cache")
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", 6 * 60 * 60))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Hits only move an entry's access time; these are kept in memory and
+# written in one batch every this many hits or seconds
+PAGE_CACHE_FLUSH_HITS = 64
+PAGE_CACHE_FLUSH_SECONDS = 5.0
+
+
+@dataclass
+class CachedPage:
+    url: str
+    content: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    raw_size: int
+
+
+class PageCache:
+    """
+    On-disk cache of processed webpages, keyed by canonical url.
+
+    Entries younger than `ttl` are served directly, older ones are revalidated
+    with ETag / Last-Modified before being downloaded again. The total size of
+    the stored markdown is bounded by `max_bytes`, least recently used first out.
+
+    Every method runs blocking SQLite calls; async callers go through
+    `asyncio.to_thread`. Hits are bookkept in memory and flushed in batches,
+    so serving one costs no write.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = PAGE_CACHE_TTL,
+                 max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.path = path or os.path.join(CACHE_DIR, "pages.sqlite")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                content TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL
+            )
+            """
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS pages_lru ON pages (last_access)")
+        self.db.commit()
+        self.lock = threading.Lock()
+        self.pending_lock = threading.Lock()
+        # Canonical url -> (last access, new fetched_at or None) not written yet
+        self.pending: dict[str, tuple[float, Optional[float]]] = {}
+        self.flushed_at = time.monotonic()
+        self.counters = {
+            "hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "evictions": 0,
+            "bytes_served": 0,
+            "bytes_saved": 0,
+            "bytes_downloaded": 0,
+            "miss_seconds": 0.0,
+        }
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Returns the cached entry for a url, fresh or stale, or None."""
+        key = canonicalize_url(url)
+        with self.lock:
+            if (len(self.pending) >= PAGE_CACHE_FLUSH_HITS
+                    or (self.pending and time.monotonic() - self.flushed_at >= PAGE_CACHE_FLUSH_SECONDS)):
+                self._flush()
+                self.db.commit()
+            row = self.db.execute(
+                "SELECT url, content, etag, last_modified, fetched_at, raw_size "
+                "FROM pages WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        page = CachedPage(*row)
+        with self.pending_lock:
+            pending = self.pending.get(key)
+        if pending is not None and pending[1] is not None:
+            # Revalidated, but not written yet
+            page.fetched_at = pending[1]
+        return page
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return time.time() - page.fetched_at < self.ttl
+
+    def validators(self, page: Optional[CachedPage]) -> dict:
+        """Conditional request headers for revalidating a stale entry."""
+        headers = {}
+        if page is not None:
+            if page.etag:
+                headers["If-None-Match"] = page.etag
+            if page.last_modified:
+                headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def record_hit(self, page: CachedPage, revalidated: bool = False) -> None:
+        """Counts a served entry and marks it as recently used; nothing is written until the next flush."""
+        now = time.time()
+        key = canonicalize_url(page.url)
+        with self.pending_lock:
+            # The server confirmed our copy of a revalidated entry, restart its TTL
+            fetched_at = now if revalidated else self.pending.get(key, (0, None))[1]
+            self.pending[key] = (now, fetched_at)
+            self.counters["revalidated" if revalidated else "hits"] += 1
+            self.counters["bytes_served"] += len(page.content.encode("utf-8"))
+            # A 304 still costs a round trip but not the body
+            self.counters["bytes_saved"] += page.raw_size
+
+    def flush(self) -> None:
+        """Writes the access times of the hits served since the last flush."""
+        with self.lock:
+            self._flush()
+            self.db.commit()
+
+    def _flush(self) -> None:
+        with self.pending_lock:
+            pending, self.pending = self.pending, {}
+        self.flushed_at = time.monotonic()
+        if pending:
+            self.db.executemany(
+                "UPDATE pages SET last_access = ?, fetched_at = COALESCE(?, fetched_at) WHERE key = ?",
+                [(last_access, fetched_at, key) for key, (last_access, fetched_at) in pending.items()],
+            )
+
+    def put(self, url: str, content: str, etag: Optional[str] = None,
+            last_modified: Optional[str] = None, raw_size: int = 0,
+            fetch_seconds: float = 0.0) -> None:
+        """Stores a freshly downloaded page and evicts old entries if over budget."""
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self.lock:
+            self._flush()
+            self.db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (canonicalize_url(url), url, content, etag, last_modified,
+                 now, now, size, raw_size),
+            )
+            self.counters["misses"] += 1
+            self.counters["bytes_downloaded"] += raw_size
+            self.counters["miss_seconds"] += fetch_seconds
+            self._evict()
+            self.db.commit()
+
+    def _evict(self) -> None:
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute(
+            "SELECT key, size FROM pages ORDER BY last_access"
+        ).fetchall():
+            self.db.execute("DELETE FROM pages WHERE key = ?", (key,))
+            self.counters["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        """Hit/miss and byte counters, plus an estimate of the time saved."""
+        with self.lock:
+            self._flush()
+            self.db.commit()
+            stats = dict(self.counters)
+            entries, size = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+        lookups = stats["hits"] + stats["revalidated"] + stats["misses"]
+        avg_miss = stats["miss_seconds"] / stats["misses"] if stats["misses"] else 0.0
+        stats.update(
+            entries=entries,
+            size_bytes=size,
+            hit_rate=(stats["hits"] + stats["revalidated"]) / lookups if lookups else 0.0,
+            estimated_seconds_saved=stats["hits"] * avg_miss,
+        )
+        return stats
+
+    def clear(self) -> None:
+        with self.lock:
+            with self.pending_lock:
+                self.pending.clear()
+            self.db.execute("DELETE FROM pages")
+            self.db.commit()
+
+
+_page_cache: Optional[PageCache] = None
+
+
+def get_page_cache() -> PageCache:
+    """Returns the process-wide page cache, opening it on first use."""
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = PageCache()
+    return _page_cache
@@ -0,0 +1,191 @@
+import os
+import re
+import asyncio
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Optional
+from src.tools.http_client import domain_of
+from src.tools.urls import canonicalize_url
+
+
+PREFETCH_ENABLED = os.getenv("SHOPPING_AGENT_PREFETCH", "0").lower() in ("1", "true", "yes")
+# Pages fetched ahead per search, and at the same time overall
+PREFETCH_TOP_K = int(os.getenv("PREFETCH_TOP_K", 3))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", 4))
+# Prefetches waiting or running at once; searches past this prefetch nothing
+MAX_PENDING_PREFETCHES = 32
+# Finished prefetches remembered for the "used" counter
+MAX_READY_URLS = 1024
+
+# Stores the agents usually end up buying from, ranked first
+RETAILER_DOMAINS = (
+    "amazon.eg", "amazon.com", "amazon.ae", "amazon.sa", "noon.com", "jumia.com.eg", "btech.com",
+    "2b.com.eg", "sigma-computer.com", "compumarts.com", "elbadrgroupeg.store", "raneen.com",
+    "ebay.com", "newegg.com", "aliexpress.com",
+)
+# Never worth fetching ahead: no product data, or blocked for bots
+SKIP_DOMAINS = (
+    "youtube.com", "facebook.com", "instagram.com", "tiktok.com", "twitter.com", "x.com",
+    "pinterest.com", "reddit.com", "quora.com", "wikipedia.org", "linkedin.com",
+)
+PRODUCT_PATH = re.compile(r"/(dp|gp/product|product|products|p|item|itm)/|\d{4,}", re.IGNORECASE)
+
+
+def _matches(domain: str, domains: tuple) -> bool:
+    return any(domain == known or domain.endswith("." + known) for known in domains)
+
+
+def rank_urls(results: Any, top_k: int = PREFETCH_TOP_K) -> list[str]:
+    """
+    Picks the search results the agent is most likely to visit next.
+
+    Retailer domains come first, then product-looking paths, then the search
+    engine's order. Known-useless domains and non-html links are skipped and
+    at most one url per domain is kept, so the prefetches spread over hosts
+    instead of queueing on one host's rate limiter.
+
+    Args:
+        results: The search results, dicts with an "href".
+        top_k (int): How many urls to return.
+
+    Returns:
+        list[str]: Up to `top_k` urls, most likely first.
+    """
+    if not isinstance(results, list):
+        return []
+    candidates = []
+    for position, result in enumerate(results):
+        url = result.get("href") if isinstance(result, dict) else None
+        if not url or not url.startswith(("http://", "https://")) or url.lower().endswith(".pdf"):
+            continue
+        domain = domain_of(url)
+        if _matches(domain, SKIP_DOMAINS):
+            continue
+        score = 2 * _matches(domain, RETAILER_DOMAINS) + bool(PRODUCT_PATH.search(url))
+        candidates.append((-score, position, domain, url))
+
+    urls, domains = [], set()
+    for _, _, domain, url in sorted(candidates):
+        if domain not in domains:
+            domains.add(domain)
+            urls.append(url)
+    return urls[:top_k]
+
+
+# Set per workflow run to the session id, so a session's prefetches can be
+# cancelled when it ends
+_scope: ContextVar[Optional[str]] = ContextVar("prefetch_scope", default=None)
+
+
+def set_scope(scope: Optional[str]) -> None:
+    _scope.set(scope)
+
+
+class Prefetcher:
+    """
+    Fetches the likely next pages into the page cache while the LLM is thinking.
+
+    After a search, the top results (see `rank_urls`) are downloaded and
+    processed in the background through `fetch_markdown`, at most
+    `concurrency` at a time. A `visit_webpage` on a url being prefetched
+    joins that download instead of starting its own (see
+    src/tools/singleflight.py), and one on a finished prefetch is a page
+    cache hit.
+
+    Prefetches belong to the session that searched and are cancelled when
+    it ends (`cancel`); `cancel_all` drops every session's.
+    """
+
+    def __init__(self, enabled: bool = PREFETCH_ENABLED, top_k: int = PREFETCH_TOP_K,
+                 concurrency: int = PREFETCH_CONCURRENCY, max_pending: int = MAX_PENDING_PREFETCHES):
+        self.enabled = enabled
+        self.top_k = top_k
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        # Canonical url -> (scope, task) of the prefetches in flight
+        self.tasks: dict[str, tuple[Optional[str], asyncio.Task]] = {}
+        # Canonical urls prefetched and not visited yet
+        self.ready: "OrderedDict[str, None]" = OrderedDict()
+        self.counters = {"scheduled": 0, "completed": 0, "cached": 0, "failed": 0, "cancelled": 0, "used": 0}
+
+    def schedule(self, results: Any) -> list[str]:
+        """
+        Starts prefetching the best urls of a search result in the background.
+
+        Returns:
+            list[str]: The urls scheduled, empty when disabled.
+        """
+        if not self.enabled:
+            return []
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        scheduled = []
+        for url in rank_urls(results, self.top_k):
+            key = canonicalize_url(url)
+            if key in self.tasks or len(self.tasks) >= self.max_pending:
+                continue
+            task = asyncio.get_running_loop().create_task(self._prefetch(url))
+            self.tasks[key] = (_scope.get(), task)
+            task.add_done_callback(lambda task, key=key: self._done(key, task))
+            self.counters["scheduled"] += 1
+            scheduled.append(url)
+        return scheduled
+
+    async def _prefetch(self, url: str) -> bool:
+        from src.tools.page_cache import get_page_cache
+        from src.tools.visit_webpage import fetch_markdown
+
+        # Pages already fresh in the cache are not fetched again
+        cache = get_page_cache()
+        cached = await asyncio.to_thread(cache.get, url)
+        if cached is not None and cache.is_fresh(cached):
+            return False
+        async with self.semaphore:
+            await fetch_markdown(url)
+        return True
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        self.tasks.pop(key, None)
+        if task.cancelled():
+            self.counters["cancelled"] += 1
+        elif task.exception() is not None:
+            self.counters["failed"] += 1
+        elif not task.result():
+            self.counters["cached"] += 1
+        else:
+            self.counters["completed"] += 1
+            self.ready[key] = None
+            if len(self.ready) > MAX_READY_URLS:
+                self.ready.popitem(last=False)
+
+    def note_visit(self, url: str) -> None:
+        """Counts visits to pages prefetched or being prefetched."""
+        key = canonicalize_url(url)
+        entry = self.tasks.get(key)
+        if self.ready.pop(key, 0) is None or (entry is not None and entry[1] is not asyncio.current_task()):
+            self.counters["used"] += 1
+
+    def cancel(self, scope: Optional[str]) -> int:
+        """Cancels the prefetches of one session and returns how many; unscoped ones are left to `cancel_all`."""
+        if scope is None:
+            return 0
+        return sum(task.cancel() for owner, task in list(self.tasks.values()) if owner == scope)
+
+    def cancel_all(self) -> int:
+        """Cancels every session's prefetches; returns how many."""
+        return sum(task.cancel() for _, task in list(self.tasks.values()))
+
+    def snapshot(self) -> dict:
+        return dict(self.counters, pending=len(self.tasks))
+
+
+_prefetcher: Optional[Prefetcher] = None
+
+
+def get_prefetcher() -> Prefetcher:
+    """Returns the process-wide prefetcher; enable it with SHOPPING_AGENT_PREFETCH=1 or `enabled = True`."""
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = Prefetcher()
+    return _prefetcher
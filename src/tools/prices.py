@@ -0,0 +1,303 @@
+import os
+import re
+import json
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+
+
+# Approximate conversion rates to EGP; override with PRICE_RATES='{"USD": 50}'
+EXCHANGE_RATES = {"EGP": 1.0, "USD": 48.5, "EUR": 52.5, "GBP": 61.0, "SAR": 12.9, "AED": 13.2}
+EXCHANGE_RATES.update(json.loads(os.getenv("PRICE_RATES", "{}")))
+DEFAULT_CURRENCY = "EGP"
+# "around 1000" accepts this much either way
+AROUND_TOLERANCE = 0.15
+MAX_RESULTS = 20
+
+CURRENCY_ALIASES = {
+    "egp": "EGP", "le": "EGP", "l.e": "EGP", "l.e.": "EGP", "pounds": "EGP", "pound": "EGP",
+    "ج.م": "EGP", "جم": "EGP", "جنيه": "EGP", "جنيها": "EGP", "جنيهات": "EGP",
+    "usd": "USD", "$": "USD", "us$": "USD", "dollar": "USD", "dollars": "USD", "دولار": "USD",
+    "eur": "EUR", "€": "EUR", "euro": "EUR", "euros": "EUR", "يورو": "EUR",
+    "gbp": "GBP", "£": "GBP", "sar": "SAR", "ريال": "SAR", "aed": "AED", "درهم": "AED",
+}
+# Word aliases must not touch other letters ("le" in "sale"), digits are fine ("1000EGP")
+CURRENCY_PATTERN = re.compile(
+    "|".join(
+        rf"(?<![^\W\d]){re.escape(alias)}(?![^\W\d])" if alias[0].isalpha() else re.escape(alias)
+        for alias in sorted(CURRENCY_ALIASES, key=len, reverse=True)
+    ),
+    re.IGNORECASE,
+)
+# Arabic-Indic and Persian digits, Arabic decimal and thousands separators
+ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹٫٬", "01234567890123456789.,")
+# Thousands are grouped with commas anywhere, with spaces only right next to
+# a currency ("1 299 EGP"): elsewhere "1000 2000" are two numbers
+NUMBER_PATTERN = re.compile(r"(\d+(?:,\d{3})*(?:\.\d+)?)(?:\s*([kK](?![a-zA-Z])|ألف|الف))?")
+SPACED_NUMBER_PATTERN = re.compile(r"(\d{1,3}(?:[ \u00a0\u202f]\d{3})+(?:\.\d+)?)(?:\s*([kK](?![a-zA-Z])|ألف|الف))?")
+# "1.299,00": dots group thousands and a comma starts the decimals (European style)
+EU_NUMBER_PATTERN = re.compile(r"(?<![\d.,])(\d{1,3}(?:\.\d{3})+),(\d{2})(?!\d)")
+# A number followed by one of these counts something other than money ("12 months", "16 GB")
+UNIT_PATTERN = re.compile(
+    r"^\s*(?:(?:months?|mo|years?|yrs?|weeks?|days?|hours?|hrs?|gb|tb|mb|mah|w|watts?|hz|mm|cm|inch(?:es)?"
+    r"|pcs|pieces?|items?|units?|x)\b|[\"”]|شهر|شهور|أشهر|سنة|سنوات|قطعة)",
+    re.IGNORECASE,
+)
+RANGE_SEPARATOR = re.compile(r"^\s*(?:-|–|—|to|till|until|and|&|إلى|الى|ل|و)\s*$", re.IGNORECASE)
+# Words before a crossed-out price ("Was 1,500 EGP") and before the price to pay ("now 1,299 EGP")
+OLD_PRICE_MARKER = re.compile(
+    r"\b(?:was|before|old price|instead of|originally|list price|regular price)\b|بدلا من|بدلاً من|قبل|كان",
+    re.IGNORECASE,
+)
+NEW_PRICE_MARKER = re.compile(r"\b(?:now|after|only|sale price|offer price)\b|الآن|الان|بعد", re.IGNORECASE)
+
+
+@dataclass
+class ParsedPrice:
+    low: float
+    high: float
+    currency: Optional[str]
+
+
+@dataclass
+class _Number:
+    value: float
+    start: int
+    end: int
+    suffixed: bool
+    # Currency written right before or after the number
+    currency: Optional[str]
+    # The words since the previous number mark it as the old or the new price
+    old: bool = False
+    new: bool = False
+
+
+def _adjacent_currency(text: str, start: int, end: int, currencies: list) -> Optional[str]:
+    for currency_start, currency_end, code in currencies:
+        if (currency_end <= start and not text[currency_end:start].strip()) or \
+                (currency_start >= end and not text[end:currency_start].strip()):
+            return code
+    return None
+
+
+def _numbers(text: str) -> list[_Number]:
+    """The numbers of a price text in order, with the currency next to each and its was/now marker."""
+    currencies = [(match.start(), match.end(), CURRENCY_ALIASES[match.group().lower()])
+                  for match in CURRENCY_PATTERN.finditer(text)]
+    matches = [match for match in SPACED_NUMBER_PATTERN.finditer(text)
+               if _adjacent_currency(text, match.start(), match.end(), currencies)]
+    matches += [match for match in NUMBER_PATTERN.finditer(text)
+                if not any(spaced.start() <= match.start() < spaced.end() for spaced in matches)]
+    numbers = []
+    previous_end = 0
+    for match in sorted(matches, key=lambda match: match.start()):
+        value = float(re.sub(r"[,\s]", "", match.group(1)))
+        if match.group(2):
+            value *= 1000
+        before = text[previous_end:match.start()]
+        numbers.append(_Number(value, match.start(), match.end(), bool(match.group(2)),
+                               _adjacent_currency(text, match.start(), match.end(), currencies),
+                               old=bool(OLD_PRICE_MARKER.search(before)), new=bool(NEW_PRICE_MARKER.search(before))))
+        previous_end = match.end()
+    return numbers
+
+
+def parse_price(text: Any, default_currency: Optional[str] = None) -> Optional[ParsedPrice]:
+    """
+    Parses a price string into a normalized (low, high, currency).
+
+    Handles "1,299 EGP", "EGP 1299.00", "1 299 EGP", "1.299,00 EGP", "$500", "50k",
+    "١٢٩٩ ج.م", ranges like "1000-1500 EGP", "from 900 to 1200" or
+    "between 1000 and 1500 EGP", and plain numbers. When the text holds
+    several numbers, the price marked as current ("now 1,299 EGP") wins
+    over a crossed-out one ("was 1,500 EGP"), and a number written next to
+    a currency over one that is not ("12 months warranty 1,299 EGP").
+
+    Args:
+        text: The price, a string or a number.
+        default_currency (str): Used when the text names no currency.
+
+    Returns:
+        ParsedPrice: The parsed price (low == high for single prices), or
+            None when the text contains no number.
+    """
+    if isinstance(text, (int, float)) and not isinstance(text, bool):
+        return ParsedPrice(float(text), float(text), default_currency)
+    if not text:
+        return None
+    text = str(text).translate(ARABIC_DIGITS)
+    text = EU_NUMBER_PATTERN.sub(lambda match: f"{match.group(1).replace('.', '')}.{match.group(2)}", text)
+    numbers = _numbers(text)
+    if not numbers:
+        return None
+    currency = CURRENCY_PATTERN.search(text)
+    currency = CURRENCY_ALIASES[currency.group().lower()] if currency else default_currency
+
+    # Two numbers joined by a range separator form a range, when they are
+    # in order and the second is an amount; "1,299 - 12 months" and
+    # "1500 - 1000" keep their first number instead
+    for first, second in zip(numbers, numbers[1:]):
+        if first.old or second.old or \
+                not RANGE_SEPARATOR.match(CURRENCY_PATTERN.sub("", text[first.end:second.start])):
+            continue
+        low, high = first.value, second.value
+        # "1-1.5k": the suffix applies to both ends
+        if second.suffixed and not first.suffixed and low * 1000 <= high:
+            low *= 1000
+        if low > high or UNIT_PATTERN.match(text[second.end:]):
+            return ParsedPrice(first.value, first.value, first.currency or currency)
+        return ParsedPrice(low, high, second.currency or first.currency or currency)
+
+    # Otherwise the last price marked as current, else the first one next to
+    # a currency, else the first number; crossed-out prices only as a last resort
+    candidates = [number for number in numbers if not number.old] or numbers
+    marked = [number for number in candidates if number.new]
+    if marked:
+        price = marked[-1]
+    else:
+        price = next((number for number in candidates if number.currency), candidates[0])
+    return ParsedPrice(price.value, price.value, price.currency or currency)
+
+
+def parse_budget(text: str, default_currency: str = DEFAULT_CURRENCY,
+                 tolerance: float = AROUND_TOLERANCE) -> Optional[tuple[float, float, float, str]]:
+    """
+    Turns a budget phrase into bounds.
+
+    "under/max/below X" -> [0, X], "around/about/range of X" -> X +- tolerance,
+    "X-Y" -> [X, Y], a bare "X" -> [0, X + tolerance].
+
+    Returns:
+        tuple: (low, high, target, currency), or None when there is no number.
+    """
+    price = parse_price(text, default_currency)
+    if price is None:
+        return None
+    lowered = text.lower()
+    if price.high > price.low:
+        low, high, target = price.low, price.high, (price.low + price.high) / 2
+    elif re.search(r"\b(under|below|max|maximum|at most|less than|up to|no more than)\b|حد أقصى|أقل من", lowered):
+        low, high, target = 0.0, price.high, price.high
+    elif re.search(r"\b(around|about|approx\w*|range of|roughly|close to|near)\b|حوالي|في حدود", lowered):
+        low, high, target = price.low * (1 - tolerance), price.high * (1 + tolerance), price.low
+    else:
+        low, high, target = 0.0, price.high * (1 + tolerance), price.high
+    return low, high, target, price.currency or default_currency
+
+
+def _rating(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def convert(amounts: np.ndarray, currencies: list[str], target: str) -> np.ndarray:
+    """Converts amounts in mixed currencies to `target` in one pass; unknown currencies become NaN."""
+    codes = sorted(EXCHANGE_RATES)
+    index = {code: i for i, code in enumerate(codes)}
+    rates = np.array([EXCHANGE_RATES[code] for code in codes] + [np.nan])
+    positions = np.fromiter((index.get(currency, len(codes)) for currency in currencies),
+                            dtype=np.intp, count=len(currencies))
+    return amounts * rates[positions] / EXCHANGE_RATES[target]
+
+
+def filter_candidates(candidates: list[dict], low: float, high: float, target: float,
+                      currency: str = DEFAULT_CURRENCY, limit: int = MAX_RESULTS) -> dict:
+    """
+    Keeps the candidates priced within [low, high] (in `currency`) and ranks them.
+
+    Prices are parsed once into columnar arrays; conversion, the budget
+    mask and the ranking are then single vectorized passes, so thousands of
+    candidates cost about as much as a handful.
+
+    Ranking puts prices closest to `target` first, with a small bonus for
+    rating and a penalty for being out of stock.
+
+    Returns:
+        dict: "kept" (the ranked candidates with a normalized `price_<currency>`),
+            "dropped_over_budget", "dropped_under_budget" and "unpriced" counts.
+    """
+    parsed = [parse_price(candidate.get("price"), candidate.get("currency")) for candidate in candidates]
+    count = len(candidates)
+    lows = np.fromiter((p.low if p else np.nan for p in parsed), dtype=float, count=count)
+    highs = np.fromiter((p.high if p else np.nan for p in parsed), dtype=float, count=count)
+    codes = [(p.currency if p and p.currency else currency) for p in parsed]
+    ratings = np.fromiter((_rating(c.get("rating")) for c in candidates), dtype=float, count=count)
+    in_stock = np.fromiter(
+        ("outofstock" not in str(c.get("availability", "")).lower().replace(" ", "") for c in candidates),
+        dtype=bool, count=count,
+    )
+
+    lows = convert(lows, codes, currency)
+    highs = convert(highs, codes, currency)
+    priced = ~np.isnan(lows)
+    # A candidate with a price range fits if any part of it is in budget
+    with np.errstate(invalid="ignore"):
+        over = priced & (lows > high)
+        under = priced & (highs < low)
+    fits = priced & ~over & ~under
+
+    prices = np.where(np.isnan(highs), lows, (lows + highs) / 2)
+    distance = np.abs(prices - target) / (target or 1)
+    score = -distance + 0.05 * np.clip(ratings, 0, 5) - 0.5 * ~in_stock
+    order = np.flatnonzero(fits)
+    order = order[np.argsort(-score[order], kind="stable")][:limit]
+
+    key = f"price_{currency.lower()}"
+    kept = [dict(candidates[i], **{key: round(float(prices[i]), 2)}) for i in order]
+    return {
+        "kept": kept,
+        "dropped_over_budget": int(over.sum()),
+        "dropped_under_budget": int(under.sum()),
+        "unpriced": int((~priced).sum()),
+    }
+
+
+async def filter_by_budget(budget: str, candidates: Optional[list[dict]] = None,
+                           catalog_query: Optional[str] = None, limit: int = MAX_RESULTS) -> str:
+    """
+    Filters and ranks candidate products against the user's budget, deterministically.
+
+    Args:
+        budget (str): The budget as the user said it, e.g. "around 50k EGP",
+            "under $500" or "1000-1500 EGP".
+        candidates (list[dict]): Products with at least "name" and "price"
+            (any format, e.g. "1,299 EGP"), optionally "currency", "rating",
+            "availability" and "url".
+        catalog_query (str): Also consider products from the local catalog
+            matching these words.
+        limit (int): Maximum number of products returned.
+
+    Returns:
+        str: A JSON object with the products within budget, best first, and
+            how many were dropped.
+    """
+    bounds = parse_budget(budget)
+    if bounds is None:
+        return f"Could not read a budget from {budget!r}, give an amount such as 'under 1000 EGP'."
+    low, high, target, currency = bounds
+
+    candidates = list(candidates or [])
+    if catalog_query:
+        from src.tools.catalog import get_catalog
+
+        # SQLite calls block, keep them off the event loop
+        candidates += await asyncio.to_thread(get_catalog().search, catalog_query, limit=1000)
+    if not candidates:
+        return "No candidates given, pass candidates or a catalog_query."
+
+    result = filter_candidates(candidates, low, high, target, currency, limit)
+    result["budget"] = {"low": round(low, 2), "high": round(high, 2), "currency": currency}
+    return json.dumps(result, ensure_ascii=False)
+
+
+def __getattr__(name):
+    # The LlamaIndex tool is built lazily, importing this module stays cheap
+    if name == "filter_by_budget_tool":
+        from src.tools.registry import get_tool
+
+        return get_tool("filter_by_budget")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
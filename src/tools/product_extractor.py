@@ -0,0 +1,254 @@
+import json
+import re
+from dataclasses import asdict, dataclass
+from html.parser import HTMLParser
+from typing import Any, Optional
+from urllib.parse import urljoin
+from src.tools.html_extract import VOID_TAGS
+
+
+OPENGRAPH_FIELDS = {
+    "og:title": "name",
+    "og:url": "url",
+    "product:price:amount": "price",
+    "og:price:amount": "price",
+    "product:price:currency": "currency",
+    "og:price:currency": "currency",
+    "product:availability": "availability",
+    "og:availability": "availability",
+}
+
+
+@dataclass
+class ProductRecord:
+    name: Optional[str] = None
+    price: Optional[float] = None
+    currency: Optional[str] = None
+    availability: Optional[str] = None
+    rating: Optional[float] = None
+    url: Optional[str] = None
+
+    def merge(self, other: "ProductRecord") -> None:
+        """Fills missing fields from another record describing the same product."""
+        for field, value in asdict(other).items():
+            if getattr(self, field) is None and value is not None:
+                setattr(self, field, value)
+
+    def to_dict(self) -> dict:
+        return {field: value for field, value in asdict(self).items() if value is not None}
+
+
+def _to_float(value: Any) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).replace(",", "").strip()
+    match = re.search(r"\d+(?:\.\d+)?", text)
+    return float(match.group()) if match else None
+
+
+def _availability(value: Any) -> Optional[str]:
+    # "https://schema.org/InStock" -> "InStock"
+    if not value:
+        return None
+    return str(value).rstrip("/").rsplit("/", 1)[-1]
+
+
+def _has_type(node: dict, name: str) -> bool:
+    types = node.get("@type") or node.get("type") or []
+    if isinstance(types, str):
+        types = [types]
+    return any(str(t).rsplit("/", 1)[-1] == name for t in types)
+
+
+def _first(value: Any) -> Any:
+    return value[0] if isinstance(value, list) and value else value
+
+
+def _product_from_jsonld(node: dict, page_url: str) -> ProductRecord:
+    record = ProductRecord(name=_first(node.get("name")), url=node.get("url") or node.get("@id"))
+    offers = node.get("offers")
+    for offer in offers if isinstance(offers, list) else [offers]:
+        if not isinstance(offer, dict):
+            continue
+        price = offer.get("price", offer.get("lowPrice"))
+        if price is None and isinstance(offer.get("priceSpecification"), dict):
+            price = offer["priceSpecification"].get("price")
+        record.merge(ProductRecord(
+            price=_to_float(price),
+            currency=offer.get("priceCurrency"),
+            availability=_availability(offer.get("availability")),
+            url=offer.get("url"),
+        ))
+    rating = node.get("aggregateRating")
+    if isinstance(rating, dict):
+        record.rating = _to_float(rating.get("ratingValue"))
+    if record.url:
+        record.url = urljoin(page_url, str(record.url))
+    return record
+
+
+def _walk_jsonld(node: Any, page_url: str, found: list) -> None:
+    if isinstance(node, list):
+        for item in node:
+            _walk_jsonld(item, page_url, found)
+    elif isinstance(node, dict):
+        if _has_type(node, "Product"):
+            found.append(_product_from_jsonld(node, page_url))
+            return
+        for key in ("@graph", "itemListElement", "item", "mainEntity"):
+            if key in node:
+                _walk_jsonld(node[key], page_url, found)
+
+
+class ProductMetadataParser(HTMLParser):
+    """Collects JSON-LD blocks, schema.org microdata and OpenGraph tags from a page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.jsonld: list[str] = []
+        self.opengraph: dict[str, str] = {}
+        self.items: list[dict] = []
+        self.stack: list[tuple[str, Optional[dict], Optional[str]]] = []
+        self.scopes: list[dict] = []
+        self.in_jsonld = False
+        self.buffer: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+        if tag == "script" and "ld+json" in attrs.get("type", ""):
+            self.in_jsonld, self.buffer = True, []
+            return
+        if tag == "meta":
+            key = attrs.get("property") or attrs.get("name") or ""
+            if key in OPENGRAPH_FIELDS and attrs.get("content"):
+                self.opengraph.setdefault(OPENGRAPH_FIELDS[key], attrs["content"])
+
+        prop = attrs.get("itemprop")
+        scope = None
+        if "itemscope" in attrs:
+            scope = {"type": attrs.get("itemtype", ""), "props": {}, "prop": prop}
+            if tag in VOID_TAGS:
+                # No end tag will close it (<link itemprop="offers" itemscope>)
+                self._close_scope(scope)
+                return
+            self.scopes.append(scope)
+        elif prop and self.scopes:
+            value = attrs.get("content") or attrs.get("href") or attrs.get("src")
+            if value or tag in VOID_TAGS:
+                self.scopes[-1]["props"].setdefault(prop, value)
+                prop = None
+            else:
+                self.buffer = []
+
+        if tag not in VOID_TAGS:
+            self.stack.append((tag, scope, prop if scope is None else None))
+
+    def _close_scope(self, scope: dict) -> None:
+        """Attaches a finished item to the item around it, or to the top-level items."""
+        if self.scopes and scope["prop"]:
+            self.scopes[-1]["props"].setdefault(scope["prop"], scope)
+        else:
+            self.items.append(scope)
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self.in_jsonld:
+            self.jsonld.append("".join(self.buffer))
+            self.in_jsonld = False
+            return
+        # Tolerate unclosed tags by popping up to the matching one
+        if not any(open_tag == tag for open_tag, _, _ in self.stack):
+            return
+        while self.stack:
+            open_tag, scope, prop = self.stack.pop()
+            if scope is not None:
+                self.scopes.pop()
+                self._close_scope(scope)
+            elif prop and self.scopes:
+                text = " ".join("".join(self.buffer).split())
+                self.scopes[-1]["props"].setdefault(prop, text)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.in_jsonld or any(prop for _, _, prop in self.stack):
+            self.buffer.append(data)
+
+
+def _product_from_microdata(item: dict, page_url: str) -> ProductRecord:
+    props = item["props"]
+    record = ProductRecord(name=props.get("name"), url=props.get("url"))
+    offers = props.get("offers")
+    offer_props = offers["props"] if isinstance(offers, dict) else props
+    record.price = _to_float(offer_props.get("price") or offer_props.get("lowPrice"))
+    record.currency = offer_props.get("priceCurrency")
+    record.availability = _availability(offer_props.get("availability"))
+    rating = props.get("aggregateRating")
+    if isinstance(rating, dict):
+        record.rating = _to_float(rating["props"].get("ratingValue"))
+    if record.url:
+        record.url = urljoin(page_url, record.url)
+    return record
+
+
+def extract_products(html: str, url: str) -> list[ProductRecord]:
+    """
+    Extracts product records from a page's structured data.
+
+    JSON-LD is preferred, then schema.org microdata, and OpenGraph product tags
+    fill in anything still missing on a single product page.
+
+    Args:
+        html (str): The page HTML.
+        url (str): The page url, used for relative links and as the default product url.
+
+    Returns:
+        list[ProductRecord]: The products found, possibly empty.
+    """
+    parser = ProductMetadataParser()
+    parser.feed(html)
+    parser.close()
+    return products_from_parser(parser, url)
+
+
+def products_from_parser(parser: ProductMetadataParser, url: str) -> list[ProductRecord]:
+    """
+    Builds product records from a parser that has already been fed a page,
+    e.g. chunk by chunk while the page was streamed.
+
+    Args:
+        parser (ProductMetadataParser): The fed (and closed) parser.
+        url (str): The page url.
+
+    Returns:
+        list[ProductRecord]: The products found, possibly empty.
+    """
+    products: list[ProductRecord] = []
+    for block in parser.jsonld:
+        try:
+            _walk_jsonld(json.loads(block), url, products)
+        except json.JSONDecodeError:
+            continue
+    if not products:
+        products = [
+            _product_from_microdata(item, url)
+            for item in parser.items
+            if item["type"].rstrip("/").endswith("Product")
+        ]
+
+    opengraph = ProductRecord(
+        name=parser.opengraph.get("name"),
+        price=_to_float(parser.opengraph.get("price")),
+        currency=parser.opengraph.get("currency"),
+        availability=_availability(parser.opengraph.get("availability")),
+        url=parser.opengraph.get("url"),
+    )
+    if len(products) <= 1 and (opengraph.price is not None or products):
+        products = products or [ProductRecord()]
+        products[0].merge(opengraph)
+
+    for product in products:
+        if product.url is None and len(products) == 1:
+            product.url = url
+    return [product for product in products if product.name or product.price is not None]
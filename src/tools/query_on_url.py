@@ -1,44 +1,88 @@
-from gradio_client import Client
-import time
-import requests
+import json
+import asyncio
+import httpx
 from typing import Any, Optional
-from llama_index.core.tools import FunctionTool
+from src.tools.http_client import stream
+from src.tools.product_extractor import extract_products
+from src.tools.catalog import get_catalog
+from src.tools.singleflight import get_singleflight
+from src.tools.urls import canonicalize_url
 
 
-client = Client("Agents-MCP-Hackathon/MCP_Server_Web2JSON")
+# Structured data lives in the head or right after the product block,
+# there is no need to download huge pages completely
+MAX_HTML_BYTES = 2 * 1024 * 1024
 
 
-def query_url_tool(url: str) -> str:
+async def fetch_html(url: str) -> str:
+    """Downloads up to MAX_HTML_BYTES of a page through the shared pool; concurrent calls share one download."""
+    return await get_singleflight().do(("html", canonicalize_url(url)), lambda: _download_html(url))
+
+
+async def _download_html(url: str) -> str:
+    chunks = []
+    size = 0
+    async with stream(url) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_text():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= MAX_HTML_BYTES:
+                break
+    return "".join(chunks)
+
+
+async def extract_product_info(url: str) -> list[dict]:
     """
-    Queries a URL and returns the content as a markdown string.
+    Fetches a product page and parses its JSON-LD, microdata and OpenGraph data.
 
     Args:
-        url (str): The URL to query.
+        url (str): The product page url.
 
     Returns:
-        str: The content of the URL in markdown format.
+        list[dict]: Compact product records with name, price, currency,
+        availability, rating and url.
     """
-    # Sleep for 3 seconds to avoid overwhelming the server
-    time.sleep(3)
-    try:
-        result = client.predict(
-            content="url",
-            is_url=True,
-            schema_name="Product",
-            api_name="/predict"
-        )
-        return result
-
-    except requests.exceptions.Timeout:
+    html = await fetch_html(url)
+    # Parsing is CPU bound, keep it off the event loop
+    products = await asyncio.to_thread(extract_products, html, url)
+    await asyncio.to_thread(get_catalog().add, products, source_url=url)
+    return [product.to_dict() for product in products]
+
+
+def describe_error(e: Exception) -> str:
+    if isinstance(e, httpx.TimeoutException):
         return "The request timed out. Please try again later or check the URL."
-    except requests.exceptions.RequestException as e:
+    if isinstance(e, httpx.HTTPError):
         return f"Error fetching the webpage: {str(e)}"
+    return f"An unexpected error occurred: {str(e)}"
+
+
+async def query_url_tool(url: str) -> str:
+    """
+    Queries a product URL and returns its attributes as a JSON string.
+
+    Args:
+        url (str): The URL to query.
+
+    Returns:
+        str: A JSON object (or a list of objects for listing pages) with the
+        product's name, price, currency, availability, rating and url.
+    """
+    try:
+        products = await extract_product_info(url)
     except Exception as e:
-        return f"An unexpected error occurred: {str(e)}"
+        return describe_error(e)
+
+    if not products:
+        return f"No structured product data found at {url}. Try visit_webpage instead."
+    return json.dumps(products[0] if len(products) == 1 else products, ensure_ascii=False)
+
 
+def __getattr__(name):
+    # The LlamaIndex tool is built lazily, importing this module stays cheap
+    if name == "Get_info_from_url_tool":
+        from src.tools.registry import get_tool
 
-Get_info_from_url_tool = FunctionTool.from_defaults(
-    name="Get_info_from_url",
-    fn=query_url_tool,
-    description="Given a product's URL, it returns a JSON object that contains all the important attributes about a product."
-)
+        return get_tool("Get_info_from_url")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,245 @@
+import re
+import math
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from src.tools.html_extract import CHARS_PER_TOKEN
+
+
+# Target size of one chunk of a page
+CHUNK_CHARS = 800
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z]+|[0-9]+|[؀-ۿ]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i in is it its me my of on or so that the "
+    "this to was we were what which will with you your can please want need should would".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+@dataclass
+class QueryFocus:
+    """What the running agent is looking for: the user's request and its latest thought."""
+
+    query: str
+    thought: str = ""
+
+    def observe(self, ev: Any) -> None:
+        """Follows the workflow's events, keeping the last reasoning text as the thought."""
+        if type(ev).__name__ == "AgentOutput" and ev.response.content:
+            self.thought = ev.response.content
+
+    def terms(self) -> list[str]:
+        return tokenize(f"{self.query}\n{self.thought}")
+
+
+# Set per workflow run; tool calls run in tasks spawned from it and see it
+_focus: ContextVar[Optional[QueryFocus]] = ContextVar("query_focus", default=None)
+
+
+def set_focus(query: str) -> QueryFocus:
+    """Starts ranking tool observations against `query` in the current context."""
+    focus = QueryFocus(query)
+    _focus.set(focus)
+    return focus
+
+
+def get_focus() -> Optional[QueryFocus]:
+    return _focus.get()
+
+
+class BM25:
+    """Okapi BM25 over a small in-memory list of documents."""
+
+    def __init__(self, documents: list[list[str]], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.counts = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.average_length = (sum(self.lengths) / len(documents)) if documents else 0.0
+        document_frequency = Counter(term for counts in self.counts for term in counts)
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def scores(self, query: list[str]) -> list[float]:
+        terms = Counter(query)
+        results = []
+        for counts, length in zip(self.counts, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+            score = 0.0
+            for term, weight in terms.items():
+                frequency = counts.get(term)
+                if frequency:
+                    score += weight * self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            results.append(score)
+        return results
+
+
+def chunk_text(text: str, max_chars: int = CHUNK_CHARS) -> list[str]:
+    """
+    Splits markdown into chunks of about `max_chars`, on blank lines and
+    headings first, then on lines for paragraphs that are still too long.
+    """
+    blocks = []
+    for block in re.split(r"\n\s*\n|\n(?=#{1,6} )", text):
+        block = block.strip()
+        while len(block) > max_chars:
+            cut = block.rfind("\n", 0, max_chars)
+            if cut <= 0:
+                cut = block.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            blocks.append(block[:cut].strip())
+            block = block[cut:].strip()
+        if block:
+            blocks.append(block)
+
+    chunks: list[str] = []
+    for block in blocks:
+        # Merge small neighbours (list items, short paragraphs) up to the target size
+        if chunks and len(chunks[-1]) + len(block) + 2 <= max_chars and not block.startswith("#"):
+            chunks[-1] += "\n\n" + block
+        else:
+            chunks.append(block)
+    return chunks
+
+
+def select_chunks(chunks: list[str], query_terms: list[str], max_tokens: int) -> list[int]:
+    """
+    Picks the best-scoring chunks that fit in `max_tokens`.
+
+    The first chunk (usually the page title and intro) is kept when it
+    matches at all, ties go to the earlier chunk, and the selection is
+    returned in document order.
+
+    Returns:
+        list[int]: Indices of the chosen chunks, ascending.
+    """
+    budget = max_tokens * CHARS_PER_TOKEN
+    scores = BM25([tokenize(chunk) for chunk in chunks]).scores(query_terms)
+    order = sorted(range(len(chunks)), key=lambda index: (-scores[index], index))
+    if chunks and scores[0] > 0:
+        order.remove(0)
+        order.insert(0, 0)
+    chosen, used = [], 0
+    for index in order:
+        if scores[index] <= 0 and chosen:
+            break
+        size = len(chunks[index]) + 2
+        if used + size <= budget:
+            chosen.append(index)
+            used += size
+    return sorted(chosen)
+
+
+def _join(chunks: list[str], chosen: list[int]) -> str:
+    parts, previous = [], -1
+    for index in chosen:
+        if index != previous + 1:
+            parts.append("[...]")
+        parts.append(chunks[index])
+        previous = index
+    if previous != len(chunks) - 1:
+        parts.append("[...]")
+    return "\n\n".join(parts)
+
+
+def shrink_text(text: str, max_tokens: int, focus: Optional[QueryFocus] = None) -> str:
+    """
+    Fits `text` into `max_tokens`, keeping the parts most relevant to the focus.
+
+    Without a focus (e.g. a tool called outside a workflow run) this falls
+    back to the plain prefix.
+
+    Args:
+        text (str): The tool output, e.g. a page as markdown.
+        max_tokens (int): The token budget.
+        focus (QueryFocus): What to rank against, defaults to the current run's.
+
+    Returns:
+        str: The text itself if it fits, otherwise the selected chunks in
+            page order with "[...]" marking the gaps.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    focus = focus or get_focus()
+    terms = focus.terms() if focus is not None else []
+    if not terms:
+        return text[:max_chars] + "... (content truncated)"
+
+    chunks = chunk_text(text)
+    chosen = select_chunks(chunks, terms, max_tokens)
+    header = f"(showing the {len(chosen)} of {len(chunks)} sections most relevant to the request)"
+    return f"{header}\n\n{_join(chunks, chosen)}"
+
+
+def shrink_pages(pages: dict[str, str], max_tokens: int, focus: Optional[QueryFocus] = None) -> dict[str, str]:
+    """
+    Fits several pages into one shared budget, ranking their chunks together.
+
+    A page full of matching products gets more of the budget than a page
+    that only mentions the request in passing.
+
+    Args:
+        pages (dict[str, str]): Url -> page markdown.
+        max_tokens (int): The budget for all pages together.
+        focus (QueryFocus): What to rank against, defaults to the current run's.
+
+    Returns:
+        dict[str, str]: Url -> the selected chunks of that page.
+    """
+    if sum(len(text) for text in pages.values()) <= max_tokens * CHARS_PER_TOKEN:
+        return dict(pages)
+    focus = focus or get_focus()
+    terms = focus.terms() if focus is not None else []
+    if not terms:
+        share = max(1, max_tokens // max(1, len(pages)))
+        return {url: shrink_text(text, share, focus) for url, text in pages.items()}
+
+    owners, chunks = [], []
+    for url, text in pages.items():
+        for chunk in chunk_text(text):
+            owners.append(url)
+            chunks.append(chunk)
+    chosen = select_chunks(chunks, terms, max_tokens)
+    chosen = set(chosen)
+    result = {}
+    for url in pages:
+        indices = [index for index, owner in enumerate(owners) if owner == url]
+        picked = [position for position, index in enumerate(indices) if index in chosen]
+        page_chunks = [chunks[index] for index in indices]
+        result[url] = _join(page_chunks, picked) if picked else "(nothing on this page matched the request)"
+    return result
+
+
+def rank_results(results: list, max_tokens: int, focus: Optional[QueryFocus] = None) -> list:
+    """
+    Keeps the search results most relevant to the focus within `max_tokens`.
+
+    Results keep their original order; the search engine's own ranking
+    breaks ties.
+    """
+    if not isinstance(results, list) or not results:
+        return results
+    texts = [" ".join(str(value) for value in result.values()) if isinstance(result, dict) else str(result)
+             for result in results]
+    if sum(len(text) for text in texts) <= max_tokens * CHARS_PER_TOKEN:
+        return results
+    focus = focus or get_focus()
+    terms = focus.terms() if focus is not None else []
+    if not terms:
+        return results
+    chosen = select_chunks(texts, terms, max_tokens)
+    return [results[index] for index in chosen]
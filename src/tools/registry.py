@@ -0,0 +1,90 @@
+import importlib
+from typing import Any
+
+
+# Tool name -> (module, function, description). Nothing here is imported
+# until a tool is first requested, so importing the registry is free.
+TOOL_SPECS = {
+    "duckduckgo_full_search": (
+        "src.tools.web_search",
+        "duck_search_tool",
+        "Make a query to DuckDuckGo search to receive a full search results.",
+    ),
+    "visit_webpage": (
+        "src.tools.visit_webpage",
+        "visit_webpage",
+        "Visits a webpage at the given url and reads its content as a markdown string. Use this to browse webpages.",
+    ),
+    "Get_info_from_url": (
+        "src.tools.query_on_url",
+        "query_url_tool",
+        "Given a product's URL, it returns a JSON object that contains all the important attributes about a product.",
+    ),
+    "visit_webpages": (
+        "src.tools.batch",
+        "visit_webpages",
+        "Visits up to 10 webpages at once and returns each one's content as markdown. "
+        "Prefer this over several visit_webpage calls when comparing pages.",
+    ),
+    "multi_search": (
+        "src.tools.batch",
+        "multi_search",
+        "Runs up to 10 DuckDuckGo searches at once and returns the results for each query.",
+    ),
+    "get_product_info_batch": (
+        "src.tools.batch",
+        "get_product_info_batch",
+        "Given up to 10 product URLs, returns the important attributes (name, price, currency, "
+        "availability, rating) of every product in one call.",
+    ),
+    "catalog_search": (
+        "src.tools.catalog",
+        "catalog_search",
+        "Searches the local catalog of products already found on the web, in milliseconds. "
+        "Try it before searching the web; fall back to the web when it finds nothing fresh.",
+    ),
+    "filter_by_budget": (
+        "src.tools.prices",
+        "filter_by_budget",
+        "Keeps only the candidate products whose price (any format or currency) fits the user's "
+        "budget and ranks them closest to it first. Use it instead of comparing prices yourself.",
+    ),
+    "parallel_product_hunt": (
+        "src.agents.fanout",
+        "parallel_product_hunt",
+        "Runs several independent parts of a request (e.g. the CPU, GPU, RAM and SSD of a PC build) "
+        "on separate product hunter agents at the same time and returns every part's answer.",
+    ),
+}
+
+_tools: dict[str, Any] = {}
+
+
+def get_tool(name: str) -> Any:
+    """
+    Returns the LlamaIndex tool registered under `name`, building it on first use.
+
+    Args:
+        name (str): The tool name, as seen by the agents.
+
+    Returns:
+        FunctionTool: The (cached) tool instance.
+    """
+    tool = _tools.get(name)
+    if tool is None:
+        from llama_index.core.tools import FunctionTool
+        from src.agents.tracing import traced
+
+        module_name, fn_name, description = TOOL_SPECS[name]
+        fn = getattr(importlib.import_module(module_name), fn_name)
+        tool = _tools[name] = FunctionTool.from_defaults(
+            name=name,
+            async_fn=traced("tool", name, fn),
+            description=description,
+        )
+    return tool
+
+
+def get_tools(names: list[str]) -> list[Any]:
+    """Returns the tools for a list of names, in order."""
+    return [get_tool(name) for name in names]
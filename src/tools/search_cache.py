@@ -0,0 +1,157 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+from src.tools.page_cache import CACHE_DIR
+from src.tools.prices import CURRENCY_ALIASES
+
+
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 24 * 60 * 60))
+SEARCH_CACHE_MEMORY_ENTRIES = int(os.getenv("SEARCH_CACHE_MEMORY_ENTRIES", 512))
+
+ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+
+# Currency words and symbols -> lowercase code, from the price parser's aliases
+QUERY_CURRENCIES = {alias: code.lower() for alias, code in CURRENCY_ALIASES.items()}
+
+NUMBER = re.compile(r"^\d+(?:\.\d+)?$")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a search query so near-identical phrasings share a cache entry.
+
+    Lowercases, collapses whitespace, expands "50k" to "50000", drops thousands
+    separators and rewrites currency tokens so that "$500", "500 USD" and
+    "usd 500" all become "500 usd".
+
+    Args:
+        query (str): The raw query.
+
+    Returns:
+        str: The normalized query.
+    """
+    text = query.lower().translate(ARABIC_DIGITS)
+    text = re.sub(r"\b(\d+(?:\.\d+)?)k\b", lambda m: f"{float(m.group(1)) * 1000:g}", text)
+    # Split numbers from glued currency codes and symbols: "1000egp", "$500"
+    text = re.sub(r"(\d)([^\d\s.,])", r"\1 \2", text)
+    text = re.sub(r"([^\d\s.,])(\d)", r"\1 \2", text)
+    text = re.sub(r"(?<=\d),(?=\d{3}\b)", "", text)
+
+    tokens = [QUERY_CURRENCIES.get(t.strip("?!,"), t.strip("?!,")) for t in text.split()]
+    tokens = [t for t in tokens if t]
+    # Currency before amount -> amount before currency
+    for i in range(len(tokens) - 1):
+        if tokens[i] in QUERY_CURRENCIES.values() and NUMBER.match(tokens[i + 1]):
+            tokens[i], tokens[i + 1] = tokens[i + 1], tokens[i]
+    return " ".join(tokens)
+
+
+class SearchCache:
+    """
+    Two tier cache for search results: an in-memory LRU in front of SQLite.
+
+    Both tiers are keyed by the normalized query and expire after `ttl` seconds.
+    `peek` only reads memory and is safe on the event loop; `get` and `put`
+    touch SQLite, so async callers run them through `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = SEARCH_CACHE_TTL,
+                 memory_entries: int = SEARCH_CACHE_MEMORY_ENTRIES):
+        self.path = path or os.path.join(CACHE_DIR, "search.sqlite")
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS searches "
+            "(key TEXT PRIMARY KEY, result TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self.db.commit()
+        # Guards the memory tier and counters; never held during disk I/O
+        self.lock = threading.Lock()
+        self.db_lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _remember(self, key: str, stored_at: float, result: Any) -> None:
+        self.memory[key] = (stored_at, result)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Returns the result for a normalized query if it is in the memory tier, or None."""
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self.memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry[1]
+        return None
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached result for a normalized query, or None."""
+        result = self.peek(key)
+        if result is not None:
+            return result
+
+        with self.db_lock:
+            row = self.db.execute(
+                "SELECT result, stored_at FROM searches WHERE key = ?", (key,)
+            ).fetchone()
+        with self.lock:
+            if row is not None and time.time() - row[1] < self.ttl:
+                result = json.loads(row[0])
+                self._remember(key, row[1], result)
+                self.counters["disk_hits"] += 1
+                return result
+
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, key: str, result: Any) -> None:
+        now = time.time()
+        with self.lock:
+            self._remember(key, now, result)
+        with self.db_lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?)",
+                (key, json.dumps(result, ensure_ascii=False), now),
+            )
+            self.db.commit()
+
+    def purge_expired(self) -> int:
+        """Deletes expired rows from disk, returns how many were removed."""
+        with self.db_lock:
+            cursor = self.db.execute(
+                "DELETE FROM searches WHERE stored_at < ?", (time.time() - self.ttl,)
+            )
+            self.db.commit()
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self.memory)
+        with self.db_lock:
+            stats["disk_entries"] = self.db.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        return stats
+
+
+_search_cache: Optional[SearchCache] = None
+
+
+def get_search_cache() -> SearchCache:
+    """Returns the process-wide search cache, opening it on first use."""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache()
+    return _search_cache
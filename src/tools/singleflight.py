@@ -0,0 +1,67 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical requests into one.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs wait for the same task and get the same result or
+    exception. The work is cancelled only when every caller waiting on it
+    has been cancelled, so one agent giving up does not fail the others.
+    Nothing is kept once the task finishes; caching is the caches' job.
+    """
+
+    def __init__(self):
+        # Key -> (task, number of callers waiting on it)
+        self.calls: dict[Hashable, list] = {}
+        self.counters = {"calls": 0, "shared": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs `fn()` for `key`, or joins the run already in flight.
+
+        Args:
+            key: What identifies the request, e.g. ("page", canonical url).
+            fn: Starts the request; called only by the first caller.
+
+        Returns:
+            The result of the shared run.
+        """
+        self.counters["calls"] += 1
+        call = self.calls.get(key)
+        if call is None:
+            task = asyncio.get_running_loop().create_task(fn())
+            call = self.calls[key] = [task, 0]
+            task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+        else:
+            self.counters["shared"] += 1
+        task = call[0]
+        call[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and call[1] == 1:
+                task.cancel()
+            raise
+        finally:
+            call[1] -= 1
+
+    def _forget(self, key: Hashable, call: list) -> None:
+        if self.calls.get(key) is call:
+            del self.calls[key]
+
+    def snapshot(self) -> dict:
+        return dict(self.counters, in_flight=len(self.calls))
+
+
+_singleflight: Optional[SingleFlight] = None
+
+
+def get_singleflight() -> SingleFlight:
+    """Returns the process-wide single-flight group shared by every tool."""
+    global _singleflight
+    if _singleflight is None:
+        _singleflight = SingleFlight()
+    return _singleflight
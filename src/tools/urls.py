@@ -0,0 +1,61 @@
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Query parameters that track the visitor, not the page
+TRACKING_PARAMS = frozenset({
+    "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "_ga", "_gl",
+    "referrer", "spm", "scm", "srsltid",
+    "pd_rd_i", "pd_rd_r", "pd_rd_w", "pd_rd_wg", "pf_rd_p", "pf_rd_r", "content-id",
+})
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_")
+# Amazon's affiliate and search-position parameters; elsewhere these names
+# can select content ("?tag=gaming", "?sr=2"), so they only go on amazon.* hosts
+AMAZON_TRACKING_PARAMS = frozenset({"tag", "ref", "ref_", "qid", "sr", "crid", "sprefix"})
+AMAZON_HOST = re.compile(r"(^|\.)amazon\.[a-z.]+$")
+# Amazon-style "/ref=sr_1_3" path suffixes
+REF_SEGMENT = re.compile(r"/ref=[^/]*$")
+
+
+def is_tracking_param(name: str, host: str = "") -> bool:
+    name = name.lower()
+    if name in AMAZON_TRACKING_PARAMS:
+        return bool(AMAZON_HOST.search(host.lower()))
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalizes a url so that trivially different spellings share one cache key.
+
+    Lowercases the scheme and host, drops "www.", default ports, fragments,
+    trailing slashes and tracking parameters (utm_*, gclid, ...), and sorts
+    the remaining query parameters. Amazon's tag, ref, qid, ... only count
+    as tracking on amazon.* hosts. Parameters that change what the page
+    shows stay: the language or locale (lang, hl, ...) and Amazon's variant
+    selectors (th, psc).
+
+    Args:
+        url (str): The url to canonicalize.
+
+    Returns:
+        str: The canonical form of the url.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    # "www." mirrors serve the same pages
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = REF_SEGMENT.sub("", parts.path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    params = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+              if not is_tracking_param(name, host)]
+    query = urlencode(sorted(params))
+    return urlunsplit((scheme, host, path, query, ""))
@@ -1,55 +1,122 @@
 import re
 import time
-import requests
-import markdownify
+import asyncio
+import httpx
 from typing import Any, Optional
-from llama_index.core.tools import FunctionTool
+from src.tools.http_client import stream
+from src.tools.html_extract import StreamingMarkdownExtractor
+from src.tools.page_cache import get_page_cache
+from src.tools.prefetch import get_prefetcher
+from src.tools.singleflight import get_singleflight
+from src.tools.dedupe import already_seen
+from src.tools.urls import canonicalize_url
+from src.tools.ranking import shrink_text
+from src.tools.catalog import get_catalog
+from src.tools.product_extractor import ProductMetadataParser, products_from_parser
 
 
-def visit_webpage(url: str) -> str:
+# Main content read from a page (and cached); the ranking stage then cuts it
+# down to the budget handed to the agent
+MAX_EXTRACT_CHARS = 60000
+MAX_CONTENT_TOKENS = 2500
+
+
+async def fetch_markdown(url: str) -> str:
     """
-    Visits a webpage at the given url and reads its content as a markdown string.
+    Reads a page's main content as markdown, through the page cache.
+
+    Concurrent reads of the same page (several agents, a batch, the
+    prefetcher) share one download.
 
     Args:
-        url (str): The url of the webpage to visit.
+        url (str): The url of the webpage to read.
 
     Returns:
-        str: The webpage content converted to markdown.
+        str: Up to MAX_EXTRACT_CHARS of markdown; errors are raised.
     """
-    try:
+    get_prefetcher().note_visit(url)
+    return await get_singleflight().do(("page", canonicalize_url(url)), lambda: _read_page(url))
+
 
-        # Sleep for 3 seconds to avoid overwhelming the server
-        time.sleep(3)
+async def _read_page(url: str) -> str:
+    cache = get_page_cache()
+    # SQLite calls block, keep them off the event loop
+    cached = await asyncio.to_thread(cache.get, url)
+    if cached is not None and cache.is_fresh(cached):
+        cache.record_hit(cached)
+        return cached.content
 
-        # Send a GET request to the URL with a 20-second timeout
-        response = requests.get(url, timeout=20)
+    # Stream the page through the shared pool, throttled per domain,
+    # asking the server whether our stale copy is still valid
+    started = time.monotonic()
+    async with stream(url, headers=cache.validators(cached)) as response:
+        if cached is not None and response.status_code == 304:
+            cache.record_hit(cached, revalidated=True)
+            return cached.content
         response.raise_for_status()  # Raise an exception for bad status codes
 
-        # Convert the HTML content to Markdown
-        markdown_content = markdownify.markdownify(response.text).strip()
+        # Convert to markdown as the body arrives and stop reading once
+        # enough main content is extracted
+        extractor = StreamingMarkdownExtractor(
+            max_chars=MAX_EXTRACT_CHARS,
+            base_url=str(response.url),
+        )
+        # Structured product data read along the way goes to the catalog
+        products = ProductMetadataParser()
+        async for chunk in response.aiter_text():
+            extractor.feed(chunk)
+            products.feed(chunk)
+            if extractor.done:
+                break
+        raw_size = response.num_bytes_downloaded
+
+    extractor.close()
+    products.close()
+    await asyncio.to_thread(get_catalog().add, products_from_parser(products, str(response.url)), source_url=url)
+    markdown_content = extractor.markdown()
+    if extractor.done:
+        markdown_content += "... (content truncated)"
+
+    await asyncio.to_thread(
+        cache.put,
+        url,
+        markdown_content,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        raw_size=raw_size,
+        fetch_seconds=time.monotonic() - started,
+    )
+    return markdown_content
 
-        # Remove multiple line breaks
-        markdown_content = re.sub(r"\n{3,}", "\n\n", markdown_content)
 
-        # Truncate to reasonable size
-        max_length = 10000
-        if len(markdown_content) > max_length:
-            markdown_content = markdown_content[:max_length] + \
-                "... (content truncated)"
+async def visit_webpage(url: str) -> str:
+    """
+    Visits a webpage at the given url and reads its content as a markdown string.
+
+    Args:
+        url (str): The url of the webpage to visit.
 
-        return markdown_content
+    Returns:
+        str: The webpage content converted to markdown.
+    """
+    try:
+        # Only the sections most relevant to the current request reach the
+        # agent, and only if this run has not been given the same page already
+        content = shrink_text(await fetch_markdown(url), MAX_CONTENT_TOKENS)
+        return already_seen(url, content) or content
 
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         return "The request timed out. Please try again later or check the URL."
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return f"Error fetching the webpage: {str(e)}"
     except Exception as e:
         return f"An unexpected error occurred: {str(e)}"
 
 
-# Create a LlamaIndex tool
-visit_webpage_tool = FunctionTool.from_defaults(
-    name="visit_webpage",
-    fn=visit_webpage,
-    description="Visits a webpage at the given url and reads its content as a markdown string. Use this to browse webpages."
-)
+def __getattr__(name):
+    # The LlamaIndex tool is built lazily, importing this module stays cheap
+    if name == "visit_webpage_tool":
+        from src.tools.registry import get_tool
+
+        return get_tool("visit_webpage")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
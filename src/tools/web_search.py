@@ -1,12 +1,47 @@
-import time
+import asyncio
 from typing import Any, Optional
-from llama_index.core.tools import FunctionTool
-from llama_index.tools.duckduckgo import DuckDuckGoSearchToolSpec
+from src.tools.http_client import throttled
+from src.tools.search_cache import get_search_cache, normalize_query
+from src.tools.ranking import rank_results
+from src.tools.prefetch import get_prefetcher
+from src.tools.singleflight import get_singleflight
 
 # print([tool for tool in search_tool])
 
+# DuckDuckGo rate limits aggressively, every search shares this bucket
+SEARCH_DOMAIN = "duckduckgo.com"
+# Tokens of search results handed to the agent per query
+MAX_SEARCH_TOKENS = 1500
 
-def duck_search_tool(query: str) -> str:
+_backend: Optional[Any] = None
+
+
+def get_search_backend() -> Any:
+    """Returns the long-lived search backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        from llama_index.tools.duckduckgo import DuckDuckGoSearchToolSpec
+
+        _backend = DuckDuckGoSearchToolSpec()
+    return _backend
+
+
+def set_search_backend(backend: Any) -> None:
+    """Replaces the search backend, anything with a `duckduckgo_full_search(query)` method."""
+    global _backend
+    _backend = backend
+
+
+async def _search(query: str, key: str) -> Any:
+    async with throttled(SEARCH_DOMAIN):
+        # The DuckDuckGo client is blocking, keep it off the event loop
+        result = await asyncio.to_thread(get_search_backend().duckduckgo_full_search, query)
+    if result:
+        await asyncio.to_thread(get_search_cache().put, key, result)
+    return result
+
+
+async def duck_search_tool(query: str) -> str:
     """
     search for a specific query on internet.
     Args:
@@ -15,17 +50,27 @@ def duck_search_tool(query: str) -> str:
     Returns:
         str: the result of searching.
     """
-    # Sleep for 3 seconds to avoid overwhelming the server
-    time.sleep(3)
-
-    tool_spec = DuckDuckGoSearchToolSpec()
-    result = tool_spec.duckduckgo_full_search(query)
+    cache = get_search_cache()
+    key = normalize_query(query)
+    # Memory hits are served inline, only the disk tier goes to a thread
+    result = cache.peek(key)
+    if result is None:
+        result = await asyncio.to_thread(cache.get, key)
+    if result is None:
+        # Agents searching the same thing at once share one request
+        result = await get_singleflight().do(("search", key), lambda: _search(query, key))
 
+    # Only the results most relevant to the current request reach the agent,
+    # and the ones it will likely visit next start downloading right away
+    result = rank_results(result, MAX_SEARCH_TOKENS)
+    get_prefetcher().schedule(result)
     return result
 
 
-search_tool = FunctionTool.from_defaults(
-    name="duckduckgo_full_search",
-    fn=duck_search_tool,
-    description="Make a query to DuckDuckGo search to receive a full search results."
-)
+def __getattr__(name):
+    # The LlamaIndex tool is built lazily, importing this module stays cheap
+    if name == "search_tool":
+        from src.tools.registry import get_tool
+
+        return get_tool("duckduckgo_full_search")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
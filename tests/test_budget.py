@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+from llama_index.core.agent.workflow import AgentInput, AgentOutput, ToolCall
+from llama_index.core.llms import ChatMessage
+from llama_index.core.tools import ToolSelection
+
+from src.agents.budget import BudgetCounters, BudgetGovernor, BudgetLimits
+
+
+def llm_input(agent="hunter"):
+    return AgentInput(input=[ChatMessage(role="user", content="x" * 40)], current_agent_name=agent)
+
+
+def llm_output(text, agent="hunter", tool_calls=()):
+    return AgentOutput(response=ChatMessage(role="assistant", content=text), current_agent_name=agent,
+                       tool_calls=list(tool_calls))
+
+
+def tool_call(name="visit_webpage"):
+    return ToolCall(tool_name=name, tool_kwargs={}, tool_id="1")
+
+
+class FakeHandler:
+    """Streams the given events, then waits until cancelled when `hang` is set."""
+
+    def __init__(self, events, hang=False, result="final answer"):
+        self.events = events
+        self.hang = hang
+        self.result = result
+        self.cancelled = asyncio.Event()
+
+    async def stream_events(self):
+        for ev in self.events:
+            yield ev
+        if self.hang:
+            await self.cancelled.wait()
+
+    async def cancel_run(self):
+        self.cancelled.set()
+
+    def __await__(self):
+        async def result():
+            return self.result
+        return result().__await__()
+
+
+def test_counts_calls_and_tokens():
+    governor = BudgetGovernor(BudgetLimits())
+    for ev in (llm_input(), llm_output("thinking", tool_calls=[ToolSelection(tool_id="1", tool_name="visit_webpage", tool_kwargs={})]), tool_call(), llm_input(),
+               llm_output("answer")):
+        assert not governor.observe(ev)
+    snapshot = governor.snapshot()
+    assert snapshot["total"]["llm_calls"] == 2
+    assert snapshot["total"]["tool_calls"] == 1
+    assert snapshot["total"]["input_tokens"] == 20
+    assert snapshot["per_agent"]["hunter"]["llm_calls"] == 2
+    assert governor.best_answer == "answer"
+
+
+def test_llm_cap_stops_before_the_extra_call():
+    governor = BudgetGovernor(BudgetLimits(max_llm_calls=1))
+    assert not governor.observe(llm_input())
+    assert governor.observe(llm_input())
+    assert governor.stopped_reason == "llm_calls"
+    assert governor.total.llm_calls == 1
+
+
+def test_per_agent_cap():
+    governor = BudgetGovernor(BudgetLimits(per_agent={"hunter": BudgetLimits(max_tool_calls=1)}))
+    governor.observe(llm_input())
+    assert not governor.observe(tool_call())
+    assert governor.observe(tool_call())
+    assert governor.stopped_reason == "hunter.tool_calls"
+
+
+def test_stopped_run_returns_the_best_answer():
+    async def main():
+        governor = BudgetGovernor(BudgetLimits(max_llm_calls=1))
+        handler = FakeHandler([llm_input(), llm_output("partial answer"), llm_input()], hang=True)
+        return await governor.run(handler), handler.cancelled.is_set()
+
+    response, cancelled = asyncio.run(main())
+    assert cancelled
+    assert str(response.response.content).startswith("partial answer")
+    assert "llm_calls budget" in response.response.content
+
+
+def test_deadline_cancels_a_hanging_run():
+    async def main():
+        governor = BudgetGovernor(BudgetLimits(max_seconds=0.05))
+        handler = FakeHandler([llm_input(), llm_output("so far")], hang=True)
+        started = time.monotonic()
+        response = await asyncio.wait_for(governor.run(handler), 2)
+        return governor, response, time.monotonic() - started
+
+    governor, response, elapsed = asyncio.run(main())
+    assert governor.stopped_reason == "seconds"
+    assert elapsed < 1
+    assert response.response.content.startswith("so far")
+
+
+def test_finished_run_returns_the_workflow_result():
+    async def main():
+        return await BudgetGovernor().run(FakeHandler([llm_input(), llm_output("done")]))
+
+    assert asyncio.run(main()) == "final answer"
+
+
+def test_child_charges_the_parent_and_gets_the_time_left():
+    parent = BudgetGovernor(BudgetLimits(max_llm_calls=3, max_seconds=10))
+    parent.started = time.monotonic() - 4
+    parent.observe(llm_input("manager"))
+    child = parent.child()
+    assert 5.5 < child.limits.max_seconds <= 6
+    assert parent.limits.max_seconds == 10
+    assert not child.observe(llm_input())
+    assert not child.observe(llm_input())
+    # The parent's cap covers the child's calls too
+    assert child.observe(llm_input())
+    assert parent.total.llm_calls == 3
+    assert parent.per_agent["hunter"] is child.per_agent["hunter"]
+    assert parent.observe(llm_input("manager"))
+
+
+def test_child_of_an_expired_run_has_no_time():
+    parent = BudgetGovernor(BudgetLimits(max_seconds=1))
+    parent.started = time.monotonic() - 5
+    assert parent.child().limits.max_seconds == 0.0
+
+
+def test_shared_counters_without_a_parent():
+    total = BudgetCounters()
+    first, second = BudgetGovernor(total=total), BudgetGovernor(total=total)
+    first.observe(llm_input())
+    second.observe(llm_input())
+    assert total.llm_calls == 2
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from llama_index.core.llms import ChatMessage
+from llama_index.core.llms.mock import MockLLM
+
+from src.llms.cached_llm import CachingLLM, ReplayMissError
+
+
+def messages(text="A wired headset under 1000 EGP"):
+    return [ChatMessage(role="user", content=text)]
+
+
+def test_async_chat_is_served_from_memory_then_disk(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+
+    async def main():
+        llm = CachingLLM(llm=MockLLM(), mode="cache", cache_path=path)
+        first = await llm.achat(messages())
+        second = await llm.achat(messages())
+        fresh = CachingLLM(llm=MockLLM(), mode="cache", cache_path=path)
+        third = await fresh.achat(messages())
+        return llm.stats(), fresh.stats(), first, second, third
+
+    stats, fresh_stats, first, second, third = asyncio.run(main())
+    assert first.message.content == second.message.content == third.message.content
+    assert stats["misses"] == 1 and stats["memory_hits"] == 1
+    assert fresh_stats["disk_hits"] == 1 and fresh_stats["misses"] == 0
+
+
+def test_async_stream_is_recorded_and_replayed(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+
+    async def main():
+        recorder = CachingLLM(llm=MockLLM(), mode="record", cache_path=path)
+        async for last in await recorder.astream_complete("Hello there"):
+            pass
+        replay = CachingLLM(llm=MockLLM(), mode="replay", cache_path=path)
+        replayed = await replay.acomplete("Hello there")
+        with pytest.raises(ReplayMissError):
+            await replay.acomplete("Never recorded")
+        return last.text, replayed.text
+
+    recorded, replayed = asyncio.run(main())
+    assert recorded == replayed
+
+
+def test_different_messages_do_not_share_a_key(tmp_path):
+    llm = CachingLLM(llm=MockLLM(), mode="cache", cache_path=str(tmp_path / "llm.sqlite"))
+    llm.chat(messages("first"))
+    llm.chat(messages("second"))
+    assert llm.stats()["misses"] == 2
@@ -0,0 +1,42 @@
+import asyncio
+
+from src.agents.event_sink import EventRecorder, JsonlEventSink, load_events, summarize_events
+
+
+def test_records_round_trip_with_merged_deltas(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+
+    async def main():
+        recorder = EventRecorder([JsonlEventSink(path)], session_id="s1")
+        recorder.log("session_start", prompt="headset")
+        for text in ("Hel", "lo"):
+            recorder._dispatch({"type": "delta", "agent": "hunter", "text": text})
+        recorder.log("session_end")
+        await recorder.aclose()
+
+    asyncio.run(main())
+    records = list(load_events(path))
+    assert [record["type"] for record in records] == ["session_start", "delta", "session_end"]
+    assert records[1]["text"] == "Hello" and records[1]["n"] == 2
+    assert summarize_events(records)["s1"]["streamed_chars"] == 5
+
+
+def test_failed_writes_are_counted_and_the_buffer_is_bounded(tmp_path, caplog):
+    path = str(tmp_path / "missing" / "events.jsonl")
+
+    async def main():
+        sink = JsonlEventSink(path, flush_interval=0.01, max_buffered=5)
+        for index in range(3):
+            sink.emit({"type": "delta", "session": "s", "agent": "a", "text": str(index)})
+        await asyncio.sleep(0.05)
+        for index in range(8):
+            sink.emit({"type": "tool_call", "session": "s", "index": index})
+        await sink.aclose()
+        return sink
+
+    sink = asyncio.run(main())
+    assert sink.write_errors == 2
+    assert sink.records_written == 0
+    # 3 records in the first failed batch, 5 in the second, 3 over the cap
+    assert sink.records_dropped == 11
+    assert "Could not write" in caplog.text
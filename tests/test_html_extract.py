@@ -0,0 +1,37 @@
+from src.tools.html_extract import StreamingMarkdownExtractor, extract_markdown
+
+
+def test_heading_inside_a_product_tile_link():
+    html = ('<main><a href="/p/1"><div class="card"><h3>Logitech G335</h3>'
+            '<span>1,299 EGP</span></div></a></main>')
+    assert extract_markdown(html, base_url="https://shop.example/") == (
+        "### [Logitech G335 1,299 EGP](https://shop.example/p/1)")
+
+
+def test_heading_around_a_link():
+    assert extract_markdown('<h2><a href="https://shop.example/y">Headsets</a></h2>') == (
+        "## [Headsets](https://shop.example/y)")
+
+
+def test_boilerplate_is_dropped_and_similar_classes_kept():
+    html = ('<nav>Home | Deals</nav><div class="header">Sign in</div>'
+            '<div class="card-header">Wired headset</div><footer>Copyright</footer>')
+    assert extract_markdown(html) == "Wired headset"
+
+
+def test_unclosed_list_items_and_skipped_elements():
+    html = '<ul><li>One<li>Two</ul><aside><p>Ad</aside><p>After'
+    assert extract_markdown(html) == "* One\n* Two\n\nAfter"
+
+
+def test_content_before_main_is_dropped():
+    assert extract_markdown("<div>Chrome</div><main><p>Body</p></main>") == "Body"
+
+
+def test_streaming_stops_at_max_chars():
+    extractor = StreamingMarkdownExtractor(max_chars=20)
+    extractor.feed("<p>" + "word " * 10)
+    assert extractor.done
+    extractor.feed("more text</p>")
+    extractor.close()
+    assert len(extractor.markdown()) <= 20
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from src.agents.memory import ConversationMemory, extract_facts
+from src.tools.prices import parse_budget
+
+
+@pytest.mark.parametrize("text", [
+    "I want a wired headset under 1000 EGP",
+    "between 1000 and 1500 جنيه",
+    "around $500 please",
+    "a 50k EGP gaming pc",
+])
+def test_budget_fact_matches_filter_by_budget(text):
+    low, high, target, currency = parse_budget(text)
+    facts = extract_facts(text)
+    assert facts["budget"] == target
+    assert facts["currency"] == currency
+    assert facts["budget_range"] == f"{low:g}-{high:g} {currency}"
+
+
+def test_numbers_without_a_currency_are_not_a_budget():
+    assert extract_facts("I need 2 monitors for 3 rooms") == {}
+
+
+@pytest.mark.parametrize("text, location", [
+    ("I live in Cairo and want a headset", "Cairo"),
+    ("Ship it to me, I'm based in Alexandria", "Alexandria"),
+    ("Is it in stock from Amazon?", None),
+    ("I ordered from Amazon, now I'm in Giza", "Giza"),
+])
+def test_location(text, location):
+    assert extract_facts(text).get("location") == location
+
+
+def test_facts_are_pinned_across_turns():
+    memory = ConversationMemory()
+    asyncio.run(memory.add_turn("A headset under 1000 EGP, I live in Cairo", "Here are three."))
+    asyncio.run(memory.add_turn("I'll take the Logitech G335", "Good choice."))
+    assert memory.facts["location"] == "Cairo"
+    assert memory.facts["chosen_products"] == ["Logitech G335"]
+    assert "budget range: 0-1000 EGP" in memory.context_text()
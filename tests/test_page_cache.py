@@ -0,0 +1,58 @@
+import time
+
+from src.tools.page_cache import PageCache
+
+
+def make_cache(tmp_path, **kwargs):
+    return PageCache(path=str(tmp_path / "pages.sqlite"), **kwargs)
+
+
+def test_lookup_by_canonical_url(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("https://www.shop.example/p/1?utm_source=x", "# Headset", etag='"v1"', raw_size=100)
+    page = cache.get("https://shop.example/p/1")
+    assert page.content == "# Headset"
+    assert cache.is_fresh(page)
+    assert cache.get("https://shop.example/p/2") is None
+
+
+def test_stale_entry_is_revalidated_with_its_validators(tmp_path):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.put("https://shop.example/p/1", "body", etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    cache.db.execute("UPDATE pages SET fetched_at = ?", (time.time() - 120,))
+    page = cache.get("https://shop.example/p/1")
+    assert not cache.is_fresh(page)
+    assert cache.validators(page) == {"If-None-Match": '"v1"',
+                                      "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert cache.validators(None) == {}
+    # A 304 restarts the entry's TTL, before and after the hits are flushed
+    cache.record_hit(page, revalidated=True)
+    assert cache.is_fresh(cache.get("https://shop.example/p/1"))
+    cache.flush()
+    assert cache.is_fresh(cache.get("https://shop.example/p/1"))
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_least_recently_used_pages_are_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=25)
+    cache.put("https://shop.example/a", "a" * 10)
+    time.sleep(0.01)
+    cache.put("https://shop.example/b", "b" * 10)
+    time.sleep(0.01)
+    # Reading "a" makes "b" the least recently used
+    cache.record_hit(cache.get("https://shop.example/a"))
+    cache.put("https://shop.example/c", "c" * 10)
+    assert cache.get("https://shop.example/b") is None
+    assert cache.get("https://shop.example/a") is not None
+    assert cache.get("https://shop.example/c") is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 2 and stats["hits"] == 1
+
+
+def test_clear(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("https://shop.example/a", "a")
+    cache.record_hit(cache.get("https://shop.example/a"))
+    cache.clear()
+    assert cache.get("https://shop.example/a") is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,43 @@
+import asyncio
+
+from src.tools import prefetch
+from src.tools.prefetch import Prefetcher
+
+
+def _scheduled(scopes):
+    """Schedules one never-ending prefetch per scope and returns the prefetcher."""
+    fetcher = Prefetcher(enabled=True, top_k=1)
+
+    async def forever(url):
+        await asyncio.Event().wait()
+
+    fetcher._prefetch = forever
+    for number, scope in enumerate(scopes):
+        prefetch.set_scope(scope)
+        fetcher.schedule([{"href": f"https://shop{number}.example/product/1"}])
+    return fetcher
+
+
+def test_cancel_only_touches_its_session():
+    async def main():
+        fetcher = _scheduled(["a", "b", None])
+        cancelled = fetcher.cancel("a")
+        await asyncio.sleep(0.01)
+        return cancelled, fetcher.snapshot()["pending"], fetcher.cancel_all()
+
+    cancelled, pending, remaining = asyncio.run(main())
+    assert cancelled == 1
+    assert pending == 2
+    assert remaining == 2
+
+
+def test_cancel_without_a_scope_cancels_nothing():
+    async def main():
+        fetcher = _scheduled(["a", None])
+        cancelled = fetcher.cancel(None)
+        await asyncio.sleep(0.01)
+        pending = fetcher.snapshot()["pending"]
+        fetcher.cancel_all()
+        return cancelled, pending
+
+    assert asyncio.run(main()) == (0, 2)
@@ -0,0 +1,63 @@
+import pytest
+
+from src.tools.prices import ParsedPrice, parse_budget, parse_price
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,299 EGP", ParsedPrice(1299, 1299, "EGP")),
+    ("EGP 1299.00", ParsedPrice(1299, 1299, "EGP")),
+    ("1 299 EGP", ParsedPrice(1299, 1299, "EGP")),
+    ("$500", ParsedPrice(500, 500, "USD")),
+    ("50k", ParsedPrice(50000, 50000, None)),
+    ("١٢٩٩ ج.م", ParsedPrice(1299, 1299, "EGP")),
+    ("1000-1500 EGP", ParsedPrice(1000, 1500, "EGP")),
+    ("from 900 to 1200", ParsedPrice(900, 1200, None)),
+    ("1-1.5k", ParsedPrice(1000, 1500, None)),
+])
+def test_parse_price_formats(text, expected):
+    assert parse_price(text) == expected
+
+
+def test_range_joined_by_and():
+    assert parse_price("between 1000 and 1500 EGP") == ParsedPrice(1000, 1500, "EGP")
+
+
+def test_range_joined_by_ampersand():
+    assert parse_price("1000 & 1500 EGP") == ParsedPrice(1000, 1500, "EGP")
+
+
+def test_space_groups_digits_only_next_to_a_currency():
+    assert parse_price("1000 2000") == ParsedPrice(1000, 1000, None)
+
+
+def test_number_next_to_a_currency_wins():
+    assert parse_price("12 months warranty 1,299 EGP") == ParsedPrice(1299, 1299, "EGP")
+
+
+def test_number_followed_by_a_unit_is_not_a_range_end():
+    assert parse_price("EGP 1,299 - 12 months warranty") == ParsedPrice(1299, 1299, "EGP")
+
+
+def test_descending_numbers_are_not_a_range():
+    assert parse_price("1500 - 1000 EGP") == ParsedPrice(1500, 1500, "EGP")
+
+
+def test_european_grouping():
+    assert parse_price("1.299,00 EGP") == ParsedPrice(1299, 1299, "EGP")
+    assert parse_price("€ 1.299,99") == ParsedPrice(1299.99, 1299.99, "EUR")
+
+
+def test_current_price_wins_over_crossed_out_one():
+    assert parse_price("Was 1,500 EGP now 1,299 EGP") == ParsedPrice(1299, 1299, "EGP")
+
+
+def test_crossed_out_price_after_the_current_one():
+    assert parse_price("1,299 EGP before 1,500 EGP") == ParsedPrice(1299, 1299, "EGP")
+
+
+def test_budget_between():
+    assert parse_budget("between 1000 and 1500 EGP") == (1000, 1500, 1250, "EGP")
+
+
+def test_budget_under():
+    assert parse_budget("headset under 1000 EGP") == (0, 1000, 1000, "EGP")
@@ -0,0 +1,48 @@
+import json
+
+from src.tools.product_extractor import ProductMetadataParser, ProductRecord, extract_products, products_from_parser
+
+PAGE = "https://shop.example/p/1"
+
+
+def test_jsonld_product_with_offer_and_rating():
+    data = {"@context": "https://schema.org", "@type": "Product", "name": "Logitech G335",
+            "offers": {"@type": "Offer", "price": "1,299.00", "priceCurrency": "EGP",
+                       "availability": "https://schema.org/InStock"},
+            "aggregateRating": {"ratingValue": "4.5"}}
+    html = f'<script type="application/ld+json">{json.dumps(data)}</script>'
+    assert extract_products(html, PAGE) == [
+        ProductRecord(name="Logitech G335", price=1299.0, currency="EGP", availability="InStock",
+                      rating=4.5, url=PAGE)]
+
+
+def test_microdata_itemscope_on_a_void_tag_does_not_swallow_later_properties():
+    html = ('<div itemscope itemtype="https://schema.org/Product">'
+            '<link itemprop="brand" itemscope itemtype="https://schema.org/Brand">'
+            '<span itemprop="name">G335</span>'
+            '<div itemprop="offers" itemscope itemtype="https://schema.org/Offer">'
+            '<meta itemprop="price" content="1299"><meta itemprop="priceCurrency" content="EGP">'
+            '</div></div>')
+    assert extract_products(html, PAGE) == [
+        ProductRecord(name="G335", price=1299.0, currency="EGP", url=PAGE)]
+
+
+def test_opengraph_fills_a_single_product():
+    html = ('<meta property="og:title" content="G335 Headset">'
+            '<meta property="product:price:amount" content="999">'
+            '<meta property="product:price:currency" content="EGP">')
+    assert extract_products(html, PAGE) == [
+        ProductRecord(name="G335 Headset", price=999.0, currency="EGP", url=PAGE)]
+
+
+def test_parser_fed_in_chunks():
+    html = '<div itemscope itemtype="https://schema.org/Product"><span itemprop="name">Split name</span></div>'
+    parser = ProductMetadataParser()
+    for start in range(0, len(html), 7):
+        parser.feed(html[start:start + 7])
+    parser.close()
+    assert [product.name for product in products_from_parser(parser, PAGE)] == ["Split name"]
+
+
+def test_page_without_structured_data():
+    assert extract_products("<p>Nothing here</p>", PAGE) == []
@@ -0,0 +1,29 @@
+import pytest
+
+from src.agents.router import RuleRouter
+
+
+@pytest.mark.parametrize("prompt, agent", [
+    ("I want a good wired headset for gaming in range of 1000EGP.", "product_hunter_agent"),
+    ("Build me a gaming PC for 50k EGP", "shopping_researcher_agent"),
+    ("I need all the parts for a gaming system around 40000 EGP", "shopping_researcher_agent"),
+    ("Compare the Logitech G335 vs the HyperX Cloud Stinger", "shopping_researcher_agent"),
+    ("I want a keyboard and mouse kit under 1500 EGP", "product_hunter_agent"),
+    ("What is the release date of the RTX 5070?", "trivial_search_agent"),
+    ("I need an air conditioner system under 30000 EGP", None),
+    ("hello", None),
+])
+def test_route(prompt, agent):
+    assert RuleRouter().route(prompt).agent == agent
+
+
+def test_unsure_route_reports_its_scores():
+    route = RuleRouter().route("hello")
+    assert route.kind is None and route.confidence == 0.0
+    assert route.to_dict()["scores"] == {"product_hunt": 0, "research": 0, "lookup": 0}
+
+
+def test_thresholds():
+    prompt = "I want a wired headset under 1000 EGP"
+    assert RuleRouter().route(prompt).agent == "product_hunter_agent"
+    assert RuleRouter(min_confidence=0.99).route(prompt).agent is None
@@ -0,0 +1,25 @@
+import pytest
+
+from src.tools.search_cache import SearchCache, normalize_query
+
+
+@pytest.mark.parametrize("query", [
+    "Headset under 1,000EGP", "headset under 1000 egp", "headset  under 1k L.E", "headset under ١٠٠٠ جنيه",
+])
+def test_currency_spellings_share_a_key(query):
+    assert normalize_query(query) == "headset under 1000 egp"
+
+
+def test_currency_before_amount():
+    assert normalize_query("$500 headset") == normalize_query("USD 500 headset") == "500 usd headset"
+
+
+def test_memory_then_disk(tmp_path):
+    path = str(tmp_path / "search.sqlite")
+    cache = SearchCache(path=path)
+    cache.put(normalize_query("Headset under 1000 EGP"), [{"href": "https://shop.example/p/1"}])
+    assert cache.peek("headset under 1000 egp") == [{"href": "https://shop.example/p/1"}]
+    fresh = SearchCache(path=path)
+    assert fresh.peek("headset under 1000 egp") is None
+    assert fresh.get("headset under 1000 egp") == [{"href": "https://shop.example/p/1"}]
+    assert fresh.counters["disk_hits"] == 1
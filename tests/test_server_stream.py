@@ -0,0 +1,49 @@
+import asyncio
+
+from server import SseStream, sse_frame
+
+
+def delta(agent, text):
+    return {"type": "delta", "agent": agent, "text": text}
+
+
+def test_slow_client_gets_merged_deltas():
+    async def main():
+        stream = SseStream()
+        for text in ("Hel", "lo", " there"):
+            stream.emit(delta("hunter", text))
+        stream.emit(delta("manager", "!"))
+        stream.emit({"type": "tool_call", "agent": "hunter", "tool": "visit_webpage"})
+        stream.close()
+        return [batch async for batch in stream.batches(heartbeat=1)]
+
+    batches = asyncio.run(main())
+    assert batches == [[delta("hunter", "Hello there"), delta("manager", "!"),
+                        {"type": "tool_call", "agent": "hunter", "tool": "visit_webpage"}]]
+
+
+def test_overflow_cancels_once_and_nothing_is_buffered_after_close():
+    overflowed = []
+    stream = SseStream(max_records=2, on_overflow=lambda: overflowed.append(True))
+    for index in range(5):
+        stream.emit({"type": "tool_call", "index": index})
+    assert stream.overflowed and overflowed == [True]
+    stream.close()
+    stream.emit({"type": "tool_call", "index": 99})
+    assert len(stream.records) == 5
+
+
+def test_heartbeat_on_silence():
+    async def main():
+        stream = SseStream()
+        batches = stream.batches(heartbeat=0.01)
+        first = await batches.__anext__()
+        stream.emit(delta("hunter", "hi"))
+        second = await batches.__anext__()
+        return first, second
+
+    assert asyncio.run(main()) == (None, [delta("hunter", "hi")])
+
+
+def test_sse_frame():
+    assert sse_frame({"type": "done"}) == b'event: done\ndata: {"type": "done"}\n\n'
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from src.tools.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_run():
+    async def main():
+        group = SingleFlight()
+        runs = 0
+
+        async def work():
+            nonlocal runs
+            runs += 1
+            await asyncio.sleep(0.01)
+            return "page"
+
+        results = await asyncio.gather(*(group.do("key", work) for _ in range(5)))
+        return results, runs, group.snapshot()
+
+    results, runs, snapshot = asyncio.run(main())
+    assert results == ["page"] * 5
+    assert runs == 1
+    assert snapshot == {"calls": 5, "shared": 4, "in_flight": 0}
+
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    async def main():
+        group = SingleFlight()
+        calls = 0
+
+        async def fail():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(group.do("key", fail), group.do("key", fail), return_exceptions=True)
+        # The failure is not cached: the next call runs again
+        with pytest.raises(ValueError):
+            await group.do("key", fail)
+        return results, calls
+
+    results, calls = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert calls == 2
+
+
+def test_one_caller_cancelling_does_not_cancel_the_others():
+    async def main():
+        group = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "done"
+
+        first = asyncio.ensure_future(group.do("key", work))
+        second = asyncio.ensure_future(group.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await second, first.cancelled()
+
+    assert asyncio.run(main()) == ("done", True)
+
+
+def test_last_waiter_cancelling_cancels_the_run():
+    async def main():
+        group = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.ensure_future(group.do("key", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        return group.snapshot()["in_flight"]
+
+    assert asyncio.run(main()) == 0
@@ -0,0 +1,82 @@
+import copy
+
+import pytest
+
+from src.agents.snapshots import SessionStore, SnapshotConflictError, apply_delta, make_delta
+
+
+@pytest.mark.parametrize("old, new", [
+    ({"a": 1, "b": {"c": [1, 2]}}, {"a": 1, "b": {"c": [1, 2, 3]}}),
+    ({"a": 1, "b": 2}, {"a": 1}),
+    ({"a": [1, 2]}, {"a": [2]}),
+    ({"a": {"b": {"c": 1}}}, {"a": {"b": {"c": 2, "d": None}}, "e": "new"}),
+    ({"a": "x"}, {"a": {"nested": True}}),
+    ({}, {"messages": []}),
+])
+def test_delta_round_trip(old, new):
+    assert apply_delta(copy.deepcopy(old), make_delta(old, new)) == new
+
+
+def test_unchanged_state_has_no_delta():
+    state = {"a": [1, {"b": 2}]}
+    assert make_delta(state, copy.deepcopy(state)) is None
+    assert apply_delta(state, None) is state
+
+
+def test_grown_list_is_an_append():
+    assert make_delta({"m": [1]}, {"m": [1, 2]}) == {"m": {"$append": [2]}}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sessions.sqlite")
+
+
+def test_save_and_load_across_compactions(path):
+    store = SessionStore(path, compact_every=2)
+    state = {"turns": 0, "messages": []}
+    for turn in range(1, 6):
+        state["turns"] = turn
+        state["messages"].append(f"turn {turn}")
+        assert store.save("s", state) == turn - 1
+    assert store.counters["full"] == 2 and store.counters["deltas"] == 3
+    assert SessionStore(path).load("s") == state
+
+
+def test_unchanged_save_writes_nothing(path):
+    store = SessionStore(path)
+    assert store.save("s", {"a": 1}) == 0
+    assert store.save("s", {"a": 1}) == 0
+    assert store.counters["full"] == 1 and store.counters["deltas"] == 0
+
+
+def test_stale_store_cannot_overwrite_a_newer_version(path):
+    a, b = SessionStore(path), SessionStore(path)
+    a.save("s", {"turns": 1})
+    state = b.load("s")
+    state["turns"] = 2
+    b.save("s", state)
+    with pytest.raises(SnapshotConflictError):
+        a.save("s", {"turns": 9})
+    assert a.counters["conflicts"] == 1
+    assert a.version("s") == 1 and a.seen("s") == 0
+    assert a.load("s") == {"turns": 2}
+    assert a.seen("s") == 1
+
+
+def test_save_after_delete_writes_a_full_snapshot(path):
+    a, b = SessionStore(path), SessionStore(path)
+    a.save("s", {"turns": 1})
+    b.delete("s")
+    a.save("s", {"turns": 2})
+    assert a.counters["full"] == 2
+    assert b.load("s") == {"turns": 2}
+
+
+def test_expired_and_missing_sessions_do_not_load(path):
+    store = SessionStore(path, ttl=-1)
+    store.save("s", {"turns": 1})
+    assert store.load("s") is None
+    assert store.load("unknown") is None
+    assert store.prune() == 1
+    assert store.version("s") is None
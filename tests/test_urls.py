@@ -0,0 +1,20 @@
+from src.tools.urls import canonicalize_url
+
+
+def test_tracking_params_are_dropped():
+    assert canonicalize_url("https://www.shop.com/p/1?utm_source=x&gclid=y&id=3") == "https://shop.com/p/1?id=3"
+
+
+def test_amazon_params_are_dropped_on_amazon_hosts():
+    assert canonicalize_url("https://www.amazon.eg/dp/B0X?tag=aff-21&ref_=nav&qid=1&th=1") == \
+        "https://amazon.eg/dp/B0X?th=1"
+    assert canonicalize_url("https://smile.amazon.co.uk/dp/B0X/ref=sr_1_3?sr=8-3") == "https://smile.amazon.co.uk/dp/B0X"
+
+
+def test_amazon_params_select_content_elsewhere():
+    assert canonicalize_url("https://blog.example.com/posts?tag=gaming&ref=home") == \
+        "https://blog.example.com/posts?ref=home&tag=gaming"
+
+
+def test_locale_is_kept():
+    assert canonicalize_url("https://noon.com/p/1?lang=ar") == "https://noon.com/p/1?lang=ar"